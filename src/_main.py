@@ -3,10 +3,12 @@
 from src.data import Data
 from src.clock import Clock
 from src.pathfinder import Pathfinder
-from src.truck import TimedTruck, DelayedTruck
+from src.truck import PlannedTruck
+from src.fleetplanner import FleetPlanner
 from src.warehouse import Warehouse
 from src.package import DeliveryStatus
 import src.timeutil as timeutil
+import sys
 
 class Main:
     def __init__(self):
@@ -14,22 +16,61 @@ class Main:
         Data(initialize=True)
         Clock(initialize=True)
         Warehouse(initialize=True)
-        Pathfinder(Data().get_locations_matrix())
+        # Use the sparse road graph if there is one, and the distance
+        # matrix otherwise
+        road_graph = Data().get_road_graph()
+        if road_graph is not None:
+            Pathfinder(graph=road_graph)
+        else:
+            Pathfinder(Data().get_locations_matrix(), cache_path="cache/")
 
-        self.truck = TimedTruck(1)
-        self.truck2 = DelayedTruck(2)
+        self.truck = PlannedTruck(1)
+        self.truck2 = PlannedTruck(2)
+        # The trucks leave on the first tick after 8:00 AM, and spend two
+        # ticks (of 20 seconds each) at each location.
+        FleetPlanner([self.truck, self.truck2], timeutil.to_seconds("8:00 AM"), service_time=40)
 
     def run(self):
         clock = Clock()
         clock.on_tick += self.truck.on_update
         clock.on_tick += self.truck2.on_update
         clock.on_stop += self.on_clock_stop
-        clock.start("8:00 AM", "11:59:59 PM", 0.01, 20)
+        clock.start("8:00 AM", "11:59:59 PM", 0.01, 20, discrete=True)
+
+    def run_headless(self):
+        """
+        Runs the whole day synchronously, without waiting between clock
+        ticks or creating any Threads.
+
+        Space: O(n) Time: O(n log n)
+
+        :return: An array of the packages (sorted by id) with their final delivery states, and the total truck mileage.
+        """
+        clock = Clock()
+        clock.on_tick += self.truck.on_update
+        clock.on_tick += self.truck2.on_update
+        clock.run_headless("8:00 AM", "11:59:59 PM", 20)
+        return [self.get_packages(), self.get_mileage()]
+
+    def get_packages(self):
+        """
+        Space: O(n) Time: O(n log n)
+
+        :return: The packages, sorted by id.
+        """
+        return list(Data().iter_packages(sort=True))
+
+    def get_mileage(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The total mileage of all the trucks.
+        """
+        return self.truck.odometer + self.truck2.odometer
 
     def on_clock_stop(self, sender, current_seconds):
         print("%s: The day has ended!" % (timeutil.to_time(current_seconds)))
-        packages = Data().get_packages().values()
-        packages = sorted(packages, key=lambda package: package.package_id)
+        packages = Data().iter_packages(sort=True)
         success_count = 0
         failed_count = 0
         for package in packages:
@@ -38,7 +79,11 @@ class Main:
             else:
                 failed_count += 1
             print(package)
-        print("Total truck mileage: %s miles\nSuccessfully delivered: %s\nFailed to deliver (late or not delivered): %s" % (self.truck.odometer + self.truck2.odometer, success_count, failed_count))
+        print("Total truck mileage: %s miles\nSuccessfully delivered: %s\nFailed to deliver (late or not delivered): %s" % (self.get_mileage(), success_count, failed_count))
 
 if __name__ == "__main__":
-    Main().run()
+    # `python -m src._main compile` compiles the .csv files into the dataset bundle
+    if sys.argv[1:] == ["compile"]:
+        print("Compiled the dataset bundle to %s" % Data(initialize=True, use_bundle=False).compile_bundle())
+    else:
+        Main().run()
@@ -0,0 +1,258 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+from array import array
+import math
+import mmap
+import os
+import struct
+from src.packagetable import PackageTable
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Bundle:
+    """
+    The packages, locations and distance matrix compiled from the .csv
+    files into one binary file (see compile()), so they can be loaded
+    without parsing anything.
+
+    The file starts with a header, then has every section one after the
+    other, each starting at a multiple of 8 bytes:
+        - Every package column, in the same order and with the same types
+          as the PackageTable columns.
+        - The package requirements of every package, as the index of the
+          first requirement of each package, then all the requirements.
+        - The id, zip code, latitude and longitude of every location (NaN
+          if there are no coordinates), then the index of its name,
+          address, city and state in the string table.
+        - The string table, as the index of the first byte of each string,
+          then the bytes of all the strings in UTF-8.
+        - The distance matrix, already filled in on both sides.
+
+    The file is memory-mapped copy-on-write, so only the pages that are
+    read are loaded, and any changes stay in this process.
+    """
+    _magic = b"PKGB"
+    # Changes whenever the layout of the file changes
+    _format_version = 2
+    # Magic, format version, and the amount of packages, package requirements, locations, strings, string bytes and nodes
+    _header = struct.Struct("<4sI6Q")
+    # The size and last change time of each .csv file the bundle was compiled from
+    _source = struct.Struct("<2q")
+    _source_count = 3
+    _location_strings = ("name", "address", "city", "state")
+
+    def __init__(self, path:str):
+        """
+        Space: O(1) Time: O(1)
+
+        :param path: The path to the bundle file.
+        """
+        with open(path, "rb") as bundle_file:
+            self.__map = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        if len(self.__map) < self._header.size:
+            raise ValueError("The dataset bundle is too small to be a bundle.")
+        magic, version, *counts = self._header.unpack_from(self.__map)
+        if magic != self._magic:
+            raise ValueError("The dataset bundle is not a bundle.")
+        if version != self._format_version:
+            raise ValueError("The dataset bundle is of version %s, but only version %s can be read." % (version, self._format_version))
+        self.__counts = counts
+        self.__sections, size = self._get_layout(*counts)
+        if len(self.__map) != size:
+            raise ValueError("The dataset bundle is %s bytes, but should be %s bytes." % (len(self.__map), size))
+
+    @classmethod
+    def _get_layout(cls, package_count, package_req_count, location_count, string_count, string_byte_count, node_amount) -> Tuple[Dict[str, Tuple[int, str, int]], int]:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The offset, array module type code and amount of values of each section by name, and the size of the whole file.
+        """
+        sections = {}
+        offset = cls._header.size + cls._source.size * cls._source_count
+
+        def add(name, type_code, count):
+            nonlocal offset
+            offset = (offset + 7) // 8 * 8
+            sections[name] = (offset, type_code, count)
+            offset += array(type_code).itemsize * count
+
+        for name, numpy_type, type_code in PackageTable._columns:
+            add(name, type_code, package_count)
+        add("package_req_starts", "q", package_count + 1)
+        add("package_reqs", "q", package_req_count)
+        add("location_id", "q", location_count)
+        add("zip_code", "q", location_count)
+        add("latitude", "d", location_count)
+        add("longitude", "d", location_count)
+        for name in cls._location_strings:
+            add(name, "i", location_count)
+        add("string_starts", "q", string_count + 1)
+        add("strings", "B", string_byte_count)
+        add("locations_matrix", "d", node_amount * node_amount)
+        return sections, offset
+
+    @classmethod
+    def get_sources(cls, paths:List[str]) -> List[Tuple[int, int]]:
+        """
+        Space: O(1) Time: O(1)
+
+        :param paths: The paths to the .csv files.
+        :return: The size and last change time of each file, or (-1, -1) if it doesn't exist.
+        """
+        sources = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                sources.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                sources.append((-1, -1))
+        return sources
+
+    def is_stale(self, paths:List[str]) -> bool:
+        """
+        Space: O(1) Time: O(1)
+
+        :param paths: The paths to the .csv files the bundle was compiled from.
+        :return: True if any of the files that still exist changed after the bundle was compiled, False otherwise.
+        """
+        offset = self._header.size
+        for source in self.get_sources(paths):
+            compiled = self._source.unpack_from(self.__map, offset)
+            offset += self._source.size
+            if source != (-1, -1) and source != compiled:
+                return True
+        return False
+
+    def get_section(self, name:str):
+        """
+        Space: O(1) with NumPy, O(n) otherwise Time: O(1) with NumPy, O(n) otherwise
+
+        :param name: The name of the section.
+        :return: The values in the section, as a NumPy array over the mapped file, or as an array from the array module.
+        """
+        offset, type_code, count = self.__sections[name]
+        size = array(type_code).itemsize * count
+        if np is not None:
+            return np.frombuffer(self.__map, dtype=np.dtype(type_code), count=count, offset=offset)
+        values = array(type_code)
+        values.frombytes(self.__map[offset:offset + size])
+        return values
+
+    def get_package_columns(self) -> dict:
+        """
+        Space: O(n) Time: O(1) with NumPy, O(n) otherwise
+
+        :return: Every package column, by name.
+        """
+        return {name: self.get_section(name) for name, numpy_type, type_code in PackageTable._columns}
+
+    def get_package_reqs(self) -> List[List[int]]:
+        """
+        Space: O(n) Time: O(n)
+
+        :return: The package requirements of every package, or None for the packages without any.
+        """
+        starts = self.get_section("package_req_starts").tolist()
+        values = self.get_section("package_reqs").tolist()
+        package_reqs = [None] * (len(starts) - 1)
+        for i in range(len(package_reqs)):
+            if starts[i] < starts[i + 1]:
+                package_reqs[i] = values[starts[i]:starts[i + 1]]
+        return package_reqs
+
+    def get_locations(self) -> List[Tuple]:
+        """
+        Space: O(n) Time: O(n)
+
+        :return: The id, name, address, city, state, zip code, latitude and longitude of every location. The coordinates are None if they're not known.
+        """
+        starts = self.get_section("string_starts").tolist()
+        offset = self.__sections["strings"][0]
+        strings = [self.__map[offset + starts[i]:offset + starts[i + 1]].decode("utf-8") for i in range(len(starts) - 1)]
+        columns = [self.get_section("location_id").tolist()]
+        columns.extend([strings[i] for i in self.get_section(name).tolist()] for name in self._location_strings)
+        columns.append(self.get_section("zip_code").tolist())
+        for name in ("latitude", "longitude"):
+            columns.append([None if math.isnan(value) else value for value in self.get_section(name).tolist()])
+        return list(zip(*columns))
+
+    def get_locations_matrix(self):
+        """
+        Space: O(1) with NumPy, O(n^2) otherwise Time: O(1) with NumPy, O(n^2) otherwise
+
+        :return: The distance matrix, as a 2D NumPy array over the mapped file, or as a 2D float array.
+        """
+        node_amount = self.__counts[5]
+        matrix = self.get_section("locations_matrix")
+        if np is not None:
+            return matrix.reshape(node_amount, node_amount)
+        return [matrix[i * node_amount:(i + 1) * node_amount].tolist() for i in range(node_amount)]
+
+    @classmethod
+    def compile(cls, path:str, sources:List[str], table:PackageTable, locations:list, locations_matrix):
+        """
+        Writes the given packages, locations and distance matrix to a
+        bundle file. The file is written under a temporary name first, so
+        nothing ever reads a partially written bundle.
+
+        Space: O(n) Time: O(n)
+
+        :param path: The path to write the bundle file to.
+        :param sources: The paths to the .csv files the data was read from.
+        :param table: The table of the packages.
+        :param locations: The locations.
+        :param locations_matrix: The distance matrix of the locations.
+        :return: N/A
+        """
+        package_reqs = [table.get_package_req(row) for row in range(len(table))]
+        package_req_starts = array("q", [0])
+        for package_req in package_reqs:
+            package_req_starts.append(package_req_starts[-1] + len(package_req))
+
+        # Every different string is only kept once
+        string_ids = {}
+        string_starts = array("q", [0])
+        string_bytes = bytearray()
+        location_strings = {name: array("i") for name in cls._location_strings}
+        for location in locations:
+            for name in cls._location_strings:
+                string = getattr(location, name)
+                if string not in string_ids:
+                    string_ids[string] = len(string_ids)
+                    string_bytes.extend(string.encode("utf-8"))
+                    string_starts.append(len(string_bytes))
+                location_strings[name].append(string_ids[string])
+
+        node_amount = len(locations_matrix)
+        counts = (len(table), package_req_starts[-1], len(locations), len(string_ids), len(string_bytes), node_amount)
+        sections, size = cls._get_layout(*counts)
+        data = {
+            "package_req_starts": package_req_starts,
+            "package_reqs": array("q", (package_id for package_req in package_reqs for package_id in package_req)),
+            "location_id": array("q", (location.location_id for location in locations)),
+            "zip_code": array("q", (location.zip_code for location in locations)),
+            "latitude": array("d", (math.nan if location.latitude is None else location.latitude for location in locations)),
+            "longitude": array("d", (math.nan if location.longitude is None else location.longitude for location in locations)),
+            "string_starts": string_starts,
+            "strings": string_bytes,
+            "locations_matrix": array("d", (float(distance) for row in locations_matrix for distance in row)),
+        }
+        data.update(location_strings)
+        for name, numpy_type, type_code in PackageTable._columns:
+            data[name] = table.get_column_bytes(name)
+
+        temp_path = "%s.%s.tmp" % (path, os.getpid())
+        with open(temp_path, "wb") as bundle_file:
+            bundle_file.write(cls._header.pack(cls._magic, cls._format_version, *counts))
+            for source in cls.get_sources(sources):
+                bundle_file.write(cls._source.pack(*source))
+            for name, (offset, type_code, count) in sections.items():
+                bundle_file.write(bytes(offset - bundle_file.tell()))
+                bundle_file.write(bytes(data[name]))
+            bundle_file.write(bytes(size - bundle_file.tell()))
+        os.replace(temp_path, path)
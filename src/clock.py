@@ -1,6 +1,8 @@
 # Mark Christian Malabanan, Student ID #001233960
 
 from src.event import Event
+import heapq
+import math
 import threading
 import src.timeutil as timeutil
 from src.borg import Borg
@@ -26,37 +28,89 @@ class Clock(Borg):
             self.interval_secs = 0
             self.time_delta = 0
             self.timer = None
+            self.running = False
+            self.discrete = False
+            self.__events = []
 
-    def start(self, start_time, end_time, interval_secs, time_delta):
+    def start(self, start_time, end_time, interval_secs, time_delta, discrete=False):
         """
         Starts the clock at the given start time, and automatically ends
         at the given end time.
 
+        In discrete mode, the clock does not tick every time_delta.
+        Instead, it jumps straight to the earliest time registered with
+        schedule(). The jumps stay on the same time_delta grid as the
+        fixed-step mode, so both modes produce the same results.
+
         Space: O(1) Time: O(1)
 
         :param start_time: The time to start the clock at.
         :param end_time: The time to end the clock at.
         :param interval_secs: The interval (in seconds) that the Thread waits before ticking.
         :param time_delta: The interval of time (in seconds) that should pass for this virtual clock every tick.
+        :param discrete: If True, the clock only ticks at the times registered with schedule().
         :return: N/A
         """
-        if self.timer is not None:
+        if self.running:
             return
 
         try:
-            start = timeutil.to_seconds(start_time)
-            end = timeutil.to_seconds(end_time)
-
-            self.start_time = start
-            self.current_time = start
-            self.end_time = end
-            self.interval_secs = interval_secs
-            self.time_delta = time_delta
+            self._reset(start_time, end_time, interval_secs, time_delta, discrete)
             self.timer = threading.Timer(interval_secs, self._tick)
             self.timer.start()
         except ValueError as e:
             print(e)
 
+    def run_headless(self, start_time, end_time, time_delta, discrete=True):
+        """
+        Runs the clock from the given start time to the given end time
+        synchronously, without waiting between ticks and without creating
+        any Threads. The on_tick and on_stop events are fired exactly like
+        they are when the clock is started with start().
+
+        Space: O(1) Time: O(n), where n is the amount of ticks
+
+        :param start_time: The time to start the clock at.
+        :param end_time: The time to end the clock at.
+        :param time_delta: The interval of time (in seconds) that should pass for this virtual clock every tick.
+        :param discrete: If True, the clock only ticks at the times registered with schedule().
+        :return: The time, in seconds, that the clock stopped at.
+        """
+        if self.running:
+            raise ValueError("The clock is already running.")
+
+        self._reset(start_time, end_time, 0, time_delta, discrete)
+        while self._advance():
+            pass
+        return self.current_time
+
+    def _reset(self, start_time, end_time, interval_secs, time_delta, discrete):
+        """
+        Sets the clock up to start running at the given start time.
+
+        Space: O(1) Time: O(1)
+
+        :param start_time: The time to start the clock at.
+        :param end_time: The time to end the clock at.
+        :param interval_secs: The interval (in seconds) that the Thread waits before ticking.
+        :param time_delta: The interval of time (in seconds) that should pass for this virtual clock every tick.
+        :param discrete: If True, the clock only ticks at the times registered with schedule().
+        :return: N/A
+        """
+        start = timeutil.to_seconds(start_time)
+        end = timeutil.to_seconds(end_time)
+
+        self.start_time = start
+        self.current_time = start
+        self.end_time = end
+        self.interval_secs = interval_secs
+        self.time_delta = time_delta
+        self.discrete = discrete
+        self.__events = []
+        self.running = True
+        # Every listener gets updated on the first tick
+        self.schedule(start)
+
     def stop(self):
         """
         Stops the timer by canceling the current Thread.
@@ -65,26 +119,102 @@ class Clock(Borg):
 
         :return: N/A
         """
+        self.running = False
         if self.timer is None:
             return
         self.timer.cancel()
         self.timer = None
 
-    def _tick(self):
+    def schedule(self, time):
         """
-        Runs every tick of the clock. This also handles the functions
-        subscribed to the on_tick event.
+        Registers a time (in seconds) that the listeners of the on_tick
+        event need to be updated at. Only used in discrete mode, where the
+        clock ticks at the first tick of the time_delta grid at or
+        after the given time.
+
+        Space: O(1) Time: O(log n)
+
+        :param time: The time, in seconds, of the next event. Infinite times are ignored.
+        :return: N/A
+        """
+        if not self.discrete or math.isinf(time):
+            return
+        heapq.heappush(self.__events, time)
+
+    def _next_time(self):
+        """
+        Gets the time of the next tick. In fixed-step mode, this is the
+        current time plus the time delta. In discrete mode, this is the
+        earliest scheduled event aligned to the time delta grid, or the
+        end time if there are no more scheduled events.
+
+        Space: O(1) Time: O(log n)
+
+        :return: The time, in seconds, of the next tick.
+        """
+        if not self.discrete:
+            return self.current_time + self.time_delta
+
+        end = self._align(self.end_time)
+        while len(self.__events) > 0:
+            next_time = self._align(heapq.heappop(self.__events))
+            if next_time > self.current_time:
+                return min(next_time, end)
+        return end
+
+    def _align(self, time):
+        """
+        Rounds the given time up to the earliest tick of the time delta
+        grid that is at or after the given time.
 
         Space: O(1) Time: O(1)
 
+        :param time: The time, in seconds, to align.
+        :return: The aligned time, in seconds.
+        """
+        ticks = max(math.ceil((time - self.start_time) / self.time_delta), 1)
+        # Guard against floating point errors rounding up one tick too many
+        if ticks > 1 and self.start_time + (ticks - 1) * self.time_delta >= time:
+            ticks -= 1
+        return self.start_time + ticks * self.time_delta
+
+    def _tick(self):
+        """
+        Runs every tick of the clock, then waits for the next tick on a
+        new Thread.
+
+        Space: O(1) Time: O(log n)
+
         :return: N/A
         """
-        self.current_time += self.time_delta
+        if not self._advance():
+            return
+
+        self.timer = threading.Timer(self.interval_secs, self._tick)
+        self.timer.start()
+
+    def _advance(self):
+        """
+        Moves the clock to the next tick. This also handles the functions
+        subscribed to the on_tick event, and the on_stop event when the
+        clock reaches the end time or there are no more listeners.
+
+        Space: O(1) Time: O(log n)
+
+        :return: True if the clock is still running after this tick, False otherwise.
+        """
+        self.current_time = self._next_time()
+        listener_count = len(self.on_tick)
         self.on_tick(self, self.current_time)
+        # A listener that unsubscribes during the event can make the
+        # next listener miss this tick, so let everyone re-run on the
+        # next tick just like the fixed-step mode would.
+        if len(self.on_tick) != listener_count:
+            self.schedule(self.current_time + 1)
+        if not self.running:
+            return False
         if len(self.on_tick) <= 0 or self.current_time >= self.end_time:
             self.on_stop(self, self.current_time)
             self.stop()
-            return
-
-        self.timer = threading.Timer(self.interval_secs, self._tick)
-        self.timer.start()
\ No newline at end of file
+            return False
+        return True
@@ -1,71 +1,146 @@
 # Mark Christian Malabanan, Student ID #001233960
 
 import csv
+import os
 from src.package import Package
 from src.location import Location
 from src.borg import Borg
 from src.hashmap import HashMap
+from src.packageindex import PackageIndex
+from src.packagetable import PackageTable
+from src.disjointset import DisjointSet
+import src.packagereader as packagereader
+from src.bundle import Bundle
+import src.distancematrix as distancematrix
+from src.roadgraph import RoadGraph
+from typing import List, Tuple
 
 class Data(Borg):
     _assets_path = "assets/"
     _packages_file = "packages.csv"
     _locations_file = "locations.csv"
     _location_weights_file = "location-weights.csv"
+    _bundle_file = "dataset.bin"
+    _roads_file = "roads.csv"
+    # What the distances calculated from coordinates are multiplied by, since roads are rarely straight
+    _road_factor = 1.0
+    # The amount of package rows read and converted at a time
+    _chunk_size = 4096
+    # The package columns that the package index and groups are made from
+    _indexed_columns = ("package_id", "address_id", "truck_req", "delivery_status", "delivery_time", "is_delayed", "has_package_req")
 
-    def __init__(self, initialize=False):
+    def __init__(self, initialize=False, use_bundle=True):
         """
-        Space: O(n^2) Time: O(n^2)
+        Space: O(n^2) Time: O(n^2), or O(n) if loaded from the dataset bundle, or O(n + m log d) with a road graph
 
         :param initialize: If True, this singleton should be initialized.
+        :param use_bundle: If True, the data is loaded from the dataset bundle instead of the .csv files, as long as the bundle is there and up to date.
         """
         Borg.__init__(self)
         if initialize:
             self.__packages = HashMap(40)
+            self.__package_table = PackageTable(40)
+            self.__package_index = PackageIndex()
+            self.__package_groups = DisjointSet()
+            self.__bad_rows = []
             self.__locations = HashMap(27)
             self.__locations_matrix = []
+            self.__bundle = None
+            self.__road_graph = None
+            if use_bundle:
+                self.__load_bundle()
             self.get_packages()
             self.get_locations()
-            self.get_locations_matrix()
+            # The distance matrix is only needed without a road graph
+            if self.get_road_graph() is None:
+                self.get_locations_matrix()
 
     def get_packages(self) -> HashMap:
         """
         Reads the packages from the .csv file (if the packages hashmap
-        is not initialized) and returns the hashmap where the packages
-        are stored.
+        is not initialized) and returns the hashmap of the row of each
+        package in the package table, by package id. The packages are
+        only stored in the table, and a Package is only made for a row
+        when it's looked up (see get_package()). The file is read and
+        converted a chunk of rows at a time, so only one chunk is in
+        memory besides the table. Rows that can't be read are reported and
+        skipped (see get_bad_rows()).
 
-        Space: O(n^2) Time: O(n)
+        Space: O(n + k) Time: O(n), where k is the chunk size
 
-        :return: The hashmap where the packages are stored.
+        :return: The hashmap of the row of each package, by package id.
         """
         if len(self.__packages) > 0:
             return self.__packages
 
-        with open(self._assets_path + self._packages_file, encoding="utf-8-sig") as csv_file:
-            read_csv = csv.reader(csv_file, delimiter=',')
-            for row in read_csv:
-                if len(row) != 11:
-                    raise ValueError("The given input data for a package may have too little or too many columns.")
-
-                package_id = row[0]
-                address_id = row[1]
-                delivery_time = row[2]
-                has_truck_req = row[3]
-                truck_req = row[4]
-                is_delayed = row[5]
-                delay_time = row[6]
-                has_package_req = row[7]
-                package_req = row[8]
-                mass = row[9]
-                delivery_status = row[10]
+        path = self._assets_path + self._packages_file
+        # Make room for every package at once, instead of growing many times
+        row_count = packagereader.count_rows(path)
+        self.__packages = HashMap(row_count)
+        self.__package_table.reserve(row_count)
+        for first_line, rows in packagereader.read_chunks(path, self._chunk_size):
+            columns, package_reqs, lines, bad_rows = packagereader.convert_chunk(rows)
+            columns, package_reqs, lines = self.__remove_duplicates(columns, package_reqs, lines, bad_rows)
+            for i in sorted(bad_rows):
+                self.__bad_rows.append((first_line + i, bad_rows[i]))
+                print("Line %s of %s: %s" % (first_line + i, self._packages_file, bad_rows[i]))
+            if len(lines) <= 0:
+                continue
 
-                try:
-                    package = Package(package_id, address_id, delivery_time, has_truck_req, truck_req, is_delayed, delay_time, has_package_req, package_req, mass, delivery_status)
-                    self.__packages.append(package.package_id, package)
-                except ValueError as e:
-                    print(e)
+            self.__add_packages(columns, package_reqs)
 
         return self.__packages
 
+    def __add_packages(self, columns:dict, package_reqs:List[List[int]]):
+        """
+        Adds already converted packages to the table, and their rows to
+        the hashmap, index and groups of the packages.
+
+        Space: O(n) Time: O(n)
+
+        :param columns: The columns of the packages, by name. The columns used by the index have to be lists.
+        :param package_reqs: The package requirements of each package, or None for the packages without any.
+        :return: N/A
+        """
+        start = self.__package_table.add_rows(columns, package_reqs)
+        self.__packages.extend(columns["package_id"], range(start, start + len(package_reqs)))
+        self.__package_index.add_columns(columns)
+
+        # Group the packages that have to be delivered together, directly
+        # or through other packages.
+        for package_id, has_package_req, package_req in zip(columns["package_id"], columns["has_package_req"], package_reqs):
+            if not has_package_req or not package_req:
+                continue
+            for other_id in package_req:
+                self.__package_groups.union(package_id, other_id)
+
+    def __remove_duplicates(self, columns:dict, package_reqs:List[List[int]], lines:List[int], bad_rows:dict):
+        """
+        Leaves out the packages of a chunk whose ids were already read,
+        reporting them as bad rows.
+
+        Space: O(k) Time: O(k), where k is the amount of rows in the chunk
+
+        :param columns: The converted columns of the chunk, by name.
+        :param package_reqs: The package requirements of each row.
+        :param lines: The index in the chunk of each row.
+        :param bad_rows: The error of each bad row by its index in the chunk. The duplicate rows are added to it.
+        :return: The columns, package requirements and indexes in the chunk, without the duplicate rows.
+        """
+        seen = set()
+        keep = []
+        known_rows = self.__package_table.get_rows(columns["package_id"])
+        for i, package_id in enumerate(columns["package_id"]):
+            if package_id in seen or known_rows[i] >= 0:
+                bad_rows[lines[i]] = "Can't have similar keys in the map: %s" % package_id
+            else:
+                seen.add(package_id)
+                keep.append(i)
+        if len(keep) == len(lines):
+            return columns, package_reqs, lines
+        columns = {name: [values[i] for i in keep] for name, values in columns.items()}
+        return columns, [package_reqs[i] for i in keep], [lines[i] for i in keep]
+
     def get_locations(self) -> HashMap:
         """
         Reads the locations from the .csv file (if the locations hashmap
@@ -83,7 +158,8 @@ class Data(Borg):
         with open(self._assets_path + self._locations_file, encoding="utf-8-sig") as csv_file:
             read_csv = csv.reader(csv_file, delimiter=',')
             for row in read_csv:
-                if len(row) != 6:
+                # The latitude and longitude are optional, as the 7th and 8th columns
+                if len(row) != 6 and len(row) != 8:
                     raise ValueError("The given input data for a location may have too little or too many columns.")
 
                 location_id = row[0]
@@ -92,9 +168,11 @@ class Data(Borg):
                 city = row[3]
                 state = row[4]
                 zip_code = row[5]
+                latitude = row[6] if len(row) > 6 else None
+                longitude = row[7] if len(row) > 7 else None
 
                 try:
-                    location = Location(location_id, name, address, city, state, zip_code)
+                    location = Location(location_id, name, address, city, state, zip_code, latitude, longitude)
                     self.__locations.append(location.location_id, location)
                 except ValueError as e:
                     print(e)
@@ -105,7 +183,9 @@ class Data(Borg):
         """
         Reads the distance matrix of the locations from the .csv file
         (if the locations_matrix 2D array is not initialized) and returns
-        the 2D float array of the distance matrix.
+        the 2D float array of the distance matrix. If there's no such file,
+        the distances are calculated from the coordinates of the locations
+        instead (see distancematrix.build_matrix()).
 
         Space: O(n^2) Time: O(n^2)
 
@@ -114,6 +194,10 @@ class Data(Borg):
         if len(self.__locations_matrix) > 0:
             return self.__locations_matrix
 
+        if not os.path.exists(self._assets_path + self._location_weights_file):
+            self.__locations_matrix = self.__build_locations_matrix()
+            return self.__locations_matrix
+
         matrix = self.__locations_matrix
         with open(self._assets_path + self._location_weights_file) as csvFile:
             readCSV = csv.reader(csvFile, delimiter=',')
@@ -130,14 +214,196 @@ class Data(Borg):
 
         return self.__locations_matrix
 
+    def get_road_graph(self) -> RoadGraph:
+        """
+        Reads the roads from the .csv file (if the road graph is not
+        initialized) and returns the sparse graph of the roads. Each row
+        is a road that can be taken both ways, as the id of the node on
+        each end and the distance. The first nodes are the locations, by
+        location id, and any nodes after them are only passed through.
+
+        Space: O(n + m) Time: O(n + m log d), where m is the amount of roads and d is the most roads at a node
+
+        :return: The road graph, or None if there's no roads file.
+        """
+        if self.__road_graph is not None:
+            return self.__road_graph
+
+        path = self._assets_path + self._roads_file
+        if not os.path.exists(path):
+            return None
+
+        edges = []
+        with open(path, encoding="utf-8-sig") as csv_file:
+            read_csv = csv.reader(csv_file, delimiter=',')
+            for line_number, row in enumerate(read_csv, 1):
+                if len(row) <= 0:
+                    continue
+                if len(row) != 3:
+                    raise ValueError("Line %s of %s: The given input data for a road may have too little or too many columns." % (line_number, self._roads_file))
+                edges.append((int(row[0]), int(row[1]), float(row[2])))
+
+        node_amount = max([len(self.get_locations())] + [max(from_node, to_node) + 1 for from_node, to_node, weight in edges])
+        self.__road_graph = RoadGraph.from_edges(node_amount, edges)
+        return self.__road_graph
+
+    def has_road_graph(self) -> bool:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: True if the distances come from a road graph instead of a distance matrix, False otherwise.
+        """
+        return self.__road_graph is not None or os.path.exists(self._assets_path + self._roads_file)
+
+    def __build_locations_matrix(self):
+        """
+        Space: O(n^2) Time: O(n^2)
+
+        :return: The distance matrix calculated from the coordinates of the locations, where the row and column of each location is its id.
+        """
+        locations = self.get_locations()
+        latitudes = [0.0] * len(locations)
+        longitudes = [0.0] * len(locations)
+        for location in locations.values():
+            if location.location_id >= len(locations):
+                raise ValueError("The location ids have to go from 0 to %s to calculate the distances, but there's a location %s." % (len(locations) - 1, location.location_id))
+            if not location.has_coordinates:
+                raise ValueError("There's no %s file, and location %s has no coordinates to calculate the distances from." % (self._location_weights_file, location.location_id))
+            latitudes[location.location_id] = location.latitude
+            longitudes[location.location_id] = location.longitude
+        return distancematrix.build_matrix(latitudes, longitudes, self._road_factor)
+
+    def __get_sources(self) -> List[str]:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The paths to the .csv files.
+        """
+        return [self._assets_path + self._packages_file, self._assets_path + self._locations_file, self._assets_path + self._location_weights_file]
+
+    def __load_bundle(self) -> bool:
+        """
+        Loads the packages, locations and distance matrix from the dataset
+        bundle (see compile_bundle()) instead of parsing the .csv files.
+        Nothing is loaded if there's no bundle, or if it's broken or older
+        than the .csv files.
+
+        Space: O(n) Time: O(n)
+
+        :return: True if the data was loaded from the bundle, False otherwise.
+        """
+        path = self._assets_path + self._bundle_file
+        if not os.path.exists(path):
+            return False
+        try:
+            bundle = Bundle(path)
+        except (OSError, ValueError) as e:
+            print("%s Reading the .csv files instead." % e)
+            return False
+        if bundle.is_stale(self.__get_sources()):
+            print("The dataset bundle is older than the .csv files. Reading the .csv files instead.")
+            return False
+
+        columns = bundle.get_package_columns()
+        for name in self._indexed_columns:
+            columns[name] = columns[name].tolist()
+        package_reqs = bundle.get_package_reqs()
+        self.__packages = HashMap(len(package_reqs))
+        self.__package_table.reserve(len(package_reqs))
+        self.__add_packages(columns, package_reqs)
+
+        locations = bundle.get_locations()
+        self.__locations = HashMap(len(locations))
+        for location_id, name, address, city, state, zip_code, latitude, longitude in locations:
+            self.__locations.append(location_id, Location(location_id, name, address, city, state, zip_code, latitude, longitude))
+        # A bundle compiled with a road graph has no distance matrix
+        if not self.has_road_graph():
+            self.__locations_matrix = bundle.get_locations_matrix()
+        self.__bundle = bundle
+        return True
+
+    def compile_bundle(self):
+        """
+        Compiles the packages, locations and distance matrix into the
+        dataset bundle, so the next start can load them without parsing
+        the .csv files. With a road graph, the bundle has no distance
+        matrix, since the distances come from the roads.
+
+        Space: O(n^2) Time: O(n^2), or O(n) with a road graph
+
+        :return: The path to the dataset bundle.
+        """
+        path = self._assets_path + self._bundle_file
+        locations_matrix = [] if self.has_road_graph() else self.get_locations_matrix()
+        Bundle.compile(path, self.__get_sources(), self.__package_table, list(self.get_locations().values()), locations_matrix)
+        return path
+
+    def get_package_table(self) -> PackageTable:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The table that the packages are stored in, column by column.
+        """
+        return self.__package_table
+
+    def get_package_index(self) -> PackageIndex:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The index of the packages, which groups them by address, truck requirement and status.
+        """
+        return self.__package_index
+
+    def get_package_groups(self) -> DisjointSet:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The groups of package ids that have to be delivered together. Packages without any package requirement are not in any group.
+        """
+        return self.__package_groups
+
+    def get_bad_rows(self) -> List[Tuple[int, str]]:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The line number and error of every package row that couldn't be read.
+        """
+        return self.__bad_rows
+
     def get_package(self, id:int) -> Package:
         """
         Space: O(1) Time: O(1)
 
         :param id: The id of the package to be looked up from the hashmap.
-        :return: The package that was looked up using the given id.
+        :return: The package that was looked up using the given id, as a view of its row in the package table, or None if there's no such package.
+        """
+        row = self.packages[id]
+        if row is None:
+            return None
+        return self.__view(row)
+
+    def iter_packages(self, sort=False):
+        """
+        Goes through the packages, making each one only when it's reached.
+
+        Space: O(1), or O(n) if sorted Time: O(n), or O(n log n) if sorted
+
+        :param sort: If True, the packages are given in order of their ids.
+        :return: A generator of the packages.
+        """
+        for row in self.get_packages().iter_values(sort=sort):
+            yield self.__view(row)
+
+    def __view(self, row:int) -> Package:
+        """
+        Space: O(1) Time: O(1)
+
+        :param row: The index of the row of the package in the package table.
+        :return: The package in the given row, which keeps the package index up to date.
         """
-        return self.packages[id]
+        package = Package.view(self.__package_table, row)
+        package.index = self.__package_index
+        return package
 
     def get_location(self, id:int) -> Location:
         """
@@ -0,0 +1,108 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+from typing import List
+
+class DisjointSet:
+    """
+    Keeps items in separate groups that can be merged together, also
+    known as union-find. Each group is a tree whose root stands for the
+    whole group. Finding the root flattens the path to it (path
+    compression), and merging puts the smaller tree under the bigger one
+    (union by size), so both take O(a(n)) time on average, where a is the
+    inverse Ackermann function (at most 4 for any practical n).
+    """
+    def __init__(self):
+        """
+        Space: O(1) Time: O(1)
+        """
+        self.__parents = {}
+        # The items in each group, kept only for the roots
+        self.__members = {}
+
+    def add(self, item):
+        """
+        Adds the given item in a group of its own, if it's not added yet.
+
+        Space: O(1) Time: O(1)
+
+        :param item: The item to add.
+        :return: N/A
+        """
+        if item in self.__parents:
+            return
+        self.__parents[item] = item
+        self.__members[item] = [item]
+
+    def find(self, item):
+        """
+        Space: O(1) Time: O(a(n))
+
+        :param item: The item to find the group of. It has to be added already.
+        :return: The root item of the group that the given item is in.
+        """
+        root = item
+        while self.__parents[root] != root:
+            root = self.__parents[root]
+        # Point every item on the way straight to the root
+        while self.__parents[item] != root:
+            self.__parents[item], item = root, self.__parents[item]
+        return root
+
+    def union(self, item1, item2):
+        """
+        Merges the groups of the two given items, adding the items first
+        if they're not added yet.
+
+        Space: O(1) Time: O(a(n)), plus O(k) to merge the member lists, where k is the size of the smaller group
+
+        :param item1: The first item.
+        :param item2: The second item.
+        :return: The root item of the merged group.
+        """
+        self.add(item1)
+        self.add(item2)
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return root1
+        if len(self.__members[root1]) < len(self.__members[root2]):
+            root1, root2 = root2, root1
+        self.__parents[root2] = root1
+        self.__members[root1].extend(self.__members.pop(root2))
+        return root1
+
+    def get_group(self, item) -> List:
+        """
+        Space: O(1) Time: O(a(n))
+
+        :param item: The item to get the group of.
+        :return: The items in the same group as the given item, including itself. An item that's not added is in a group of its own.
+        """
+        if item not in self.__parents:
+            return [item]
+        return self.__members[self.find(item)]
+
+    def get_groups(self) -> List[List]:
+        """
+        Space: O(n) Time: O(n)
+
+        :return: Every group, as lists of items.
+        """
+        return list(self.__members.values())
+
+    def __contains__(self, item):
+        """
+        Space: O(1) Time: O(1)
+
+        :param item: The item to check.
+        :return: True if the item is added, False otherwise.
+        """
+        return item in self.__parents
+
+    def __len__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of items added.
+        """
+        return len(self.__parents)
@@ -0,0 +1,98 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import math
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The mean radius of the Earth, in miles
+earth_radius = 3958.8
+
+def build_matrix(latitudes:List[float], longitudes:List[float], road_factor=1.0, block_elements=1 << 22, dtype="f8", out=None):
+    """
+    Builds the distance matrix of the given coordinates from the
+    great-circle (haversine) distance between every two of them. Roads are
+    rarely straight, so the distances can be scaled by a road factor
+    (usually around 1.2 to 1.4) to get closer to the driving distances.
+
+    If NumPy is installed, the distances are calculated a block of rows
+    at a time with broadcasting, so only a block of at most block_elements
+    values is ever held besides the matrix itself. Only the blocks on and
+    above the diagonal are calculated, and then copied to the other side.
+    Otherwise, every distance is calculated one at a time.
+
+    Space: O(n^2) Time: O(n^2)
+
+    :param latitudes: The latitude of each location, in degrees.
+    :param longitudes: The longitude of each location, in degrees.
+    :param road_factor: What to multiply the great-circle distances by.
+    :param block_elements: The most distances calculated at once, when NumPy is installed.
+    :param dtype: The NumPy type of the distances. "f4" halves the memory needed for many locations.
+    :param out: Optional - An n by n NumPy array (e.g. a numpy.memmap) to write the distances to, instead of a new array.
+    :return: The distance matrix, in miles, as a 2D NumPy array if NumPy is installed, or as a 2D float array otherwise.
+    """
+    if len(latitudes) != len(longitudes):
+        raise ValueError("There has to be as many latitudes as longitudes: %s and %s" % (len(latitudes), len(longitudes)))
+    if np is None:
+        return _build_matrix_python(latitudes, longitudes, road_factor)
+
+    n = len(latitudes)
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_latitudes = np.cos(latitudes)
+    scale = 2 * earth_radius * road_factor
+    if out is not None and out.shape != (n, n):
+        raise ValueError("The given array has to be %s by %s, not %s." % (n, n, out.shape))
+    matrix = np.empty((n, n), dtype=dtype) if out is None else out
+
+    block_size = max(1, block_elements // max(n, 1))
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        # The distances from the rows of this block to every location at or after the block
+        half_latitudes = np.subtract(latitudes[start:end, None], latitudes[None, start:])
+        half_latitudes *= 0.5
+        np.sin(half_latitudes, out=half_latitudes)
+        np.square(half_latitudes, out=half_latitudes)
+        half_longitudes = np.subtract(longitudes[start:end, None], longitudes[None, start:])
+        half_longitudes *= 0.5
+        np.sin(half_longitudes, out=half_longitudes)
+        np.square(half_longitudes, out=half_longitudes)
+        # Multiplying the cosines together first keeps the matrix exactly symmetric
+        half_longitudes *= np.multiply(cos_latitudes[start:end, None], cos_latitudes[None, start:])
+        # The haversine of the central angle, clipped against rounding errors
+        haversines = half_latitudes
+        haversines += half_longitudes
+        np.clip(haversines, 0, 1, out=haversines)
+        np.sqrt(haversines, out=haversines)
+        np.arcsin(haversines, out=haversines)
+        haversines *= scale
+
+        matrix[start:end, start:] = haversines
+        matrix[end:, start:end] = haversines[:, end - start:].T
+    return matrix
+
+def _build_matrix_python(latitudes:List[float], longitudes:List[float], road_factor:float) -> List[List[float]]:
+    """
+    Space: O(n^2) Time: O(n^2)
+
+    :param latitudes: The latitude of each location, in degrees.
+    :param longitudes: The longitude of each location, in degrees.
+    :param road_factor: What to multiply the great-circle distances by.
+    :return: The distance matrix, in miles, as a 2D float array.
+    """
+    n = len(latitudes)
+    latitudes = [math.radians(latitude) for latitude in latitudes]
+    longitudes = [math.radians(longitude) for longitude in longitudes]
+    cos_latitudes = [math.cos(latitude) for latitude in latitudes]
+    scale = 2 * earth_radius * road_factor
+    matrix = [[0.0] * n for i in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            haversine = math.sin((latitudes[i] - latitudes[j]) / 2) ** 2 + cos_latitudes[i] * cos_latitudes[j] * math.sin((longitudes[i] - longitudes[j]) / 2) ** 2
+            distance = scale * math.asin(math.sqrt(min(max(haversine, 0), 1)))
+            matrix[i][j] = distance
+            matrix[j][i] = distance
+    return matrix
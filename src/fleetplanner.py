@@ -0,0 +1,567 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import bisect
+import heapq
+import math
+from collections import deque
+from src.borg import Borg
+from src.data import Data
+from src.load import Load
+from src.pathfinder import Pathfinder
+from src.warehouse import Warehouse
+from typing import List
+
+class FleetPlanner(Borg):
+    """
+    Plans which packages every truck carries on every trip, for the whole
+    fleet at once, so that no two trucks compete for the same packages.
+
+    The packages are first grouped into units, where a unit is a group of
+    packages that have to be delivered together (see __get_units()). The
+    trucks are then planned in the order they become free at the hub,
+    using a heap, and each free truck gets the next trip built for it:
+        1. If none of the units that are ready (not delayed anymore) have
+            a deadline, the truck waits for the next delayed units with a
+            deadline to arrive instead, or if it isn't full, for the next
+            delayed units of any kind. It only waits for them if no other
+            truck is already waiting for them.
+        2. The ready units with deadlines are loaded first, from the
+            earliest deadline to the latest.
+        3. The rest of the truck is filled with the ready units that add
+            the least distance to the trip, looking only at the units
+            near the locations already in the trip. The units that only
+            this truck can carry are loaded before any other units. A unit
+            is skipped if it makes any location in the trip later than it
+            was.
+    Units with a truck requirement are only ever loaded into that truck.
+    """
+    def __init__(self, trucks=None, start_time=0, service_time=0, hub_id=0, neighbor_count=16):
+        """
+        Space: O(n + t) Time: O(n log n + t log t + n * k * m), where n is the amount of packages, t the amount of trucks, k the neighbor count and m the amount of locations in a trip
+
+        :param trucks: Optional - The trucks to plan the trips of. If given, the trips are planned right away.
+        :param start_time: The time (in seconds) that the trucks can first leave the hub at.
+        :param service_time: The time (in seconds) spent at each location before leaving it.
+        :param hub_id: The id of the location of the hub.
+        :param neighbor_count: The amount of closest locations to look for units at, for each location in a trip.
+        """
+        Borg.__init__(self)
+        if trucks is not None:
+            self.__service_time = service_time
+            self.__hub_id = hub_id
+            self.__neighbor_count = neighbor_count
+            self.__neighbors = {}
+            self.__trips = {truck.truck_id: deque() for truck in trucks}
+            self.__unplanned = []
+            self.__plan(trucks, start_time)
+
+    def next_departure_time(self, truck_id:int) -> float:
+        """
+        Space: O(1) Time: O(1)
+
+        :param truck_id: The id of the truck.
+        :return: The time (in seconds) that the next trip of the truck leaves at, or infinity if there are no more trips.
+        """
+        trips = self.__trips.get(truck_id)
+        if trips is None or len(trips) <= 0:
+            return math.inf
+        return trips[0][0]
+
+    def next_trip(self, truck_id:int) -> List[int]:
+        """
+        Removes the next trip of the given truck from the plan.
+
+        Space: O(1) Time: O(1)
+
+        :param truck_id: The id of the truck.
+        :return: The ids of the packages to load into the truck, or None if there are no more trips.
+        """
+        trips = self.__trips.get(truck_id)
+        if trips is None or len(trips) <= 0:
+            return None
+        return trips.popleft()[1]
+
+    def get_unplanned(self) -> List[int]:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The ids of the packages that aren't in any trip, because they can't be reached or never fit in a truck that could carry them.
+        """
+        return self.__unplanned
+
+    def get_trips(self, truck_id:int) -> List:
+        """
+        Space: O(n) Time: O(n)
+
+        :param truck_id: The id of the truck.
+        :return: The trips left for the truck, as pairs of the departure time (in seconds) and the ids of the packages.
+        """
+        return list(self.__trips.get(truck_id, []))
+
+    def __plan(self, trucks, start_time:float):
+        """
+        Plans the trips of all the given trucks. The packages that end up
+        in no trip are printed, and kept in get_unplanned().
+
+        Space: O(n + t) Time: O(n log n + t log t + n * k * m)
+
+        :param trucks: The trucks to plan the trips of.
+        :param start_time: The time (in seconds) that the trucks can first leave the hub at.
+        :return: N/A
+        """
+        units = self.__get_units(start_time)
+        for unit in units:
+            # A unit with a truck requirement has to fit in that truck
+            if not any(unit.load.fits_in(truck.capacity) for truck in trucks if unit.truck_req in (-1, truck.truck_id)):
+                raise ValueError("Packages %s have to be delivered together but don't fit in any truck that can carry them." % unit.package_ids)
+
+        # A unit can't be delivered if there's no road from the hub to any
+        # of its locations, or back
+        unreachable = set()
+        for i, unit in enumerate(units):
+            if not all(self.__can_reach(location_id) for location_id in unit.location_ids):
+                print("Packages %s can't be delivered, since there's no road between the hub and their locations." % unit.package_ids)
+                unreachable.add(i)
+
+        self.__units = units
+        self.__assigned = [False] * len(units)
+        # The units that aren't ready yet, by release time, and the units
+        # that are ready, by location (and by deadline if they have one).
+        # The units going to more than one location are kept apart.
+        # Both are kept separately for each truck requirement, with -1
+        # being the units that any truck can carry.
+        self.__pending = {}
+        self.__pending_timed = {}
+        self.__ready_timed = {}
+        self.__ready_load = {}
+        self.__ready_at = {}
+        self.__ready_spanning_at = {}
+        for i, unit in enumerate(units):
+            if i in unreachable:
+                continue
+            heapq.heappush(self.__pending.setdefault(unit.truck_req, []), (unit.release, i))
+            if unit.is_timed:
+                heapq.heappush(self.__pending_timed.setdefault(unit.truck_req, []), (unit.release, i))
+        claimed = set()
+
+        free_trucks = [(start_time, index, truck) for index, truck in enumerate(trucks)]
+        heapq.heapify(free_trucks)
+        while len(free_trucks) > 0:
+            current_time, index, truck = heapq.heappop(free_trucks)
+            self.__release(current_time)
+            keys = (-1, truck.truck_id)
+            ready_load = self.__get_ready_load(keys)
+            has_timed = any(len(self.__ready_timed.get(key, [])) > 0 for key in keys)
+            next_release = min((self.__pending[key][0][0] for key in keys if len(self.__pending.get(key, [])) > 0), default=math.inf)
+            next_timed_release = min((self.__pending_timed[key][0][0] for key in keys if len(self.__pending_timed.get(key, [])) > 0), default=math.inf)
+
+            if ready_load.is_empty():
+                # Nothing to carry right now, so wait for the next units
+                # to arrive, or stop if there are none left.
+                if next_release < math.inf:
+                    heapq.heappush(free_trucks, (next_release, index, truck))
+                continue
+            if not has_timed:
+                wait_until = math.inf
+                if next_timed_release < math.inf and next_timed_release not in claimed:
+                    wait_until = next_timed_release
+                elif ready_load.fits_in(truck.capacity) and next_release < math.inf and next_release not in claimed:
+                    wait_until = next_release
+                if wait_until < math.inf:
+                    claimed.add(wait_until)
+                    heapq.heappush(free_trucks, (wait_until, index, truck))
+                    continue
+
+            route, package_ids = self.__build_trip(truck, current_time)
+            if len(package_ids) <= 0:
+                # None of the ready units fit in this truck
+                if next_release < math.inf:
+                    heapq.heappush(free_trucks, (next_release, index, truck))
+                continue
+            self.__trips[truck.truck_id].append((current_time, package_ids))
+            distance = sum(Pathfinder().get_distance(route[i], route[i + 1]) for i in range(len(route) - 1))
+            if distance == math.inf:
+                raise ValueError("Truck %s can't finish the trip through locations %s, since there's no road between some of them." % (truck.truck_id, route))
+            duration = distance / truck.speed * 60 * 60 + self.__service_time * (len(route) - 2)
+            heapq.heappush(free_trucks, (current_time + duration, index, truck))
+
+        # Every unit that can be reached should be in a trip by now
+        left_out = []
+        for i, unit in enumerate(units):
+            if self.__assigned[i]:
+                continue
+            self.__unplanned.extend(unit.package_ids)
+            if i not in unreachable:
+                left_out.extend(unit.package_ids)
+        if len(left_out) > 0:
+            print("Packages %s couldn't be planned into any trip, so they won't be delivered." % sorted(left_out))
+        self.__unplanned.sort()
+
+    def __get_units(self, start_time:float) -> List:
+        """
+        Groups the packages that are still at the hub into units of
+        packages that have to be delivered together, based on the
+        package groups (see Data().get_package_groups()).
+
+        Space: O(n) Time: O(n * a(n))
+
+        :param start_time: The time (in seconds) that the trucks can first leave the hub at.
+        :return: The units of packages.
+        """
+        package_ids = Warehouse().snapshot()
+        package_groups = Data().get_package_groups()
+        known = set(package_ids)
+        units = []
+        seen = set()
+        for package_id in package_ids:
+            if package_id not in package_groups:
+                units.append(_Unit([package_id], start_time))
+                continue
+            root = package_groups.find(package_id)
+            if root in seen:
+                continue
+            seen.add(root)
+            units.append(_Unit(sorted(other_id for other_id in package_groups.get_group(package_id) if other_id in known), start_time))
+        return units
+
+    def __can_reach(self, location_id:int) -> bool:
+        """
+        Space: O(1) Time: O(1)
+
+        :param location_id: The id of the location.
+        :return: True if there's a path from the hub to the location and back, False otherwise.
+        """
+        pathfinder = Pathfinder()
+        return pathfinder.get_distance(self.__hub_id, location_id) < math.inf and pathfinder.get_distance(location_id, self.__hub_id) < math.inf
+
+    def __release(self, current_time:float):
+        """
+        Moves the units that have arrived at the hub by the given time
+        from the pending units to the ready units.
+
+        Space: O(1) Time: O(r log n), where r is the amount of units released
+
+        :param current_time: The current time in seconds.
+        :return: N/A
+        """
+        for pending in self.__pending_timed.values():
+            while len(pending) > 0 and pending[0][0] <= current_time:
+                heapq.heappop(pending)
+        for key, pending in self.__pending.items():
+            while len(pending) > 0 and pending[0][0] <= current_time:
+                i = heapq.heappop(pending)[1]
+                unit = self.__units[i]
+                self.__ready_load[key] = self.__ready_load.get(key, Load()) + unit.load
+                if unit.is_timed:
+                    heapq.heappush(self.__ready_timed.setdefault(key, []), (unit.deadline, i))
+                if len(unit.location_ids) == 1:
+                    # Kept from the lightest to the heaviest
+                    bisect.insort(self.__ready_at.setdefault(unit.location_ids[0], []), (unit.load.mass, i))
+                else:
+                    for location_id in unit.location_ids:
+                        self.__ready_spanning_at.setdefault(location_id, []).append(i)
+
+    def __build_trip(self, truck, departure_time:float):
+        """
+        Builds the next trip of the given truck from the ready units.
+
+        Space: O(m) Time: O(k * m^2 + u log n), where u is the amount of units loaded
+
+        :param truck: The truck to build the trip for.
+        :param departure_time: The time (in seconds) that the truck leaves the hub at.
+        :return: The locations of the trip (starting and ending at the hub), and the ids of the packages loaded.
+        """
+        keys = (-1, truck.truck_id)
+        trip = _Trip(self.__hub_id, departure_time, truck.speed, self.__service_time)
+        space = truck.capacity
+
+        # Load the units with deadlines first, earliest deadline first
+        skipped = []
+        while not space.is_empty():
+            heaps = [(self.__ready_timed[key][0], key) for key in keys if len(self.__ready_timed.get(key, [])) > 0]
+            if len(heaps) <= 0:
+                break
+            (deadline, i), key = min(heaps)
+            heapq.heappop(self.__ready_timed[key])
+            if self.__assigned[i]:
+                continue
+            unit = self.__units[i]
+            if not unit.load.fits_in(space):
+                skipped.append((key, (deadline, i)))
+                # Stop looking once many units in a row don't fit, so a
+                # full truck doesn't go through every unit with a deadline.
+                if len(skipped) > self.__neighbor_count:
+                    break
+                continue
+            trip.insert(unit)
+            space -= unit.load
+            self.__assign(i)
+        for key, item in skipped:
+            heapq.heappush(self.__ready_timed[key], item)
+
+        # Fill the rest of the truck with the units nearest to the trip,
+        # starting with the units that only this truck can carry.
+        rejected = set()
+        for fill_keys in ((truck.truck_id,), keys):
+            while not space.is_empty() and not self.__get_ready_load(fill_keys).is_empty():
+                best_cost = math.inf
+                best = -1
+                for i in self.__get_candidates(trip, fill_keys, space, rejected):
+                    cost = trip.get_insertion_cost(self.__units[i])
+                    if cost < best_cost:
+                        best_cost = cost
+                        best = i
+                if best == -1:
+                    break
+                unit = self.__units[best]
+                lateness = trip.lateness
+                trip.insert(unit)
+                # The first unit is always loaded, even if it's late on its own
+                if trip.lateness > lateness and len(trip.package_ids) > unit.size:
+                    trip.remove(unit)
+                    rejected.add(best)
+                    continue
+                space -= unit.load
+                self.__assign(best)
+        return trip.route, trip.package_ids
+
+    def __get_candidates(self, trip, keys, space:Load, rejected:set):
+        """
+        Gets the ready units that can still be loaded into the trip, at
+        the locations closest to the locations already in the trip. If
+        there are none, all the ready units are looked at instead. Only
+        one of the units going to just a single location is given for
+        each location.
+
+        Space: O(k * m) Time: O(k * m) on average
+
+        :param trip: The trip being built.
+        :param keys: The truck requirements of the units that the truck can carry.
+        :param space: The space left in the truck.
+        :param rejected: The units that were already rejected for this trip.
+        :return: The indices of the units.
+        """
+        def usable(i):
+            unit = self.__units[i]
+            return not self.__assigned[i] and i not in rejected and unit.truck_req in keys and unit.load.fits_in(space)
+
+        def at(location_ids):
+            candidates = []
+            for location_id in location_ids:
+                # Units going only to this location all cost the same,
+                # so only the first one that can be loaded is needed.
+                # Since they're sorted by mass, none of the rest fit once
+                # one is too heavy.
+                for mass, i in self.__ready_at.get(location_id, []):
+                    if mass > space.mass:
+                        break
+                    if usable(i):
+                        candidates.append(i)
+                        break
+                candidates.extend(i for i in self.__ready_spanning_at.get(location_id, []) if usable(i))
+            return candidates
+
+        locations = set()
+        for location_id in trip.locations:
+            locations.add(location_id)
+            locations.update(self.__get_neighbors(location_id))
+        candidates = at(locations)
+        if len(candidates) > 0:
+            return candidates
+        return at(set(self.__ready_at) | set(self.__ready_spanning_at))
+
+    def __get_ready_load(self, keys) -> Load:
+        """
+        Space: O(1) Time: O(1)
+
+        :param keys: The truck requirements of the units to count.
+        :return: The load of all the ready units that aren't loaded yet, with the given truck requirements.
+        """
+        load = Load()
+        for key in keys:
+            load += self.__ready_load.get(key, Load())
+        return load
+
+    def __get_neighbors(self, location_id:int) -> List[int]:
+        """
+        Space: O(k) Time: O(l log k) the first time for each location, where l is the amount of locations, O(1) after
+
+        :param location_id: The id of the location.
+        :return: The ids of the closest locations to the given location.
+        """
+        neighbors = self.__neighbors.get(location_id)
+        if neighbors is None:
+            pathfinder = Pathfinder()
+            # Only the locations, and not any other nodes of a road graph
+            others = (other for other in Data().get_locations().iter_keys() if other != location_id)
+            neighbors = heapq.nsmallest(self.__neighbor_count, others, key=lambda other: pathfinder.get_distance(location_id, other))
+            self.__neighbors[location_id] = neighbors
+        return neighbors
+
+    def __assign(self, i:int):
+        """
+        Marks the given unit as loaded into a truck.
+
+        Space: O(1) Time: O(l), where l is the amount of locations of the unit
+
+        :param i: The index of the unit.
+        :return: N/A
+        """
+        unit = self.__units[i]
+        self.__assigned[i] = True
+        self.__ready_load[unit.truck_req] -= unit.load
+        if len(unit.location_ids) == 1:
+            ready_at = self.__ready_at
+            item = (unit.load.mass, i)
+        else:
+            ready_at = self.__ready_spanning_at
+            item = i
+        for location_id in unit.location_ids:
+            ready = ready_at[location_id]
+            ready.remove(item)
+            if len(ready) <= 0:
+                del ready_at[location_id]
+
+class _Unit:
+    def __init__(self, package_ids:List[int], start_time:float):
+        """
+        Space: O(n) Time: O(n)
+
+        :param package_ids: The ids of the packages that have to be delivered together.
+        :param start_time: The time (in seconds) that the trucks can first leave the hub at.
+        """
+        self.package_ids = package_ids
+        self.size = len(package_ids)
+        self.load = Load.of(package_ids)
+        self.release = start_time
+        self.deadline = math.inf
+        self.truck_req = -1
+        # The earliest deadline of the packages going to each location
+        self.deadlines = {}
+        for package_id in package_ids:
+            package = Data().get_package(package_id)
+            if package.is_delayed:
+                self.release = max(self.release, package.delay_time)
+            if package.has_truck_req:
+                if self.truck_req != -1 and package.truck_req != self.truck_req:
+                    raise ValueError("Packages %s have to be delivered together but need different trucks." % package_ids)
+                self.truck_req = package.truck_req
+            if package.is_timed:
+                self.deadline = min(self.deadline, package.delivery_time)
+            self.deadlines[package.address_id] = min(self.deadlines.get(package.address_id, math.inf), package.delivery_time if package.is_timed else math.inf)
+        self.location_ids = list(self.deadlines)
+        self.is_timed = self.deadline < math.inf
+
+class _Trip:
+    def __init__(self, hub_id:int, departure_time:float, speed:float, service_time:float):
+        """
+        Space: O(1) Time: O(1)
+
+        :param hub_id: The id of the location of the hub.
+        :param departure_time: The time (in seconds) that the truck leaves the hub at.
+        :param speed: The speed, in miles per hour, of the truck.
+        :param service_time: The time (in seconds) spent at each location before leaving it.
+        """
+        self.route = [hub_id, hub_id]
+        self.package_ids = []
+        self.departure_time = departure_time
+        self.speed = speed
+        self.service_time = service_time
+        # For each location in the trip, the deadlines of the units going there
+        self.__deadlines = {}
+        self.__previous_route = None
+
+    def __get_locations(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The ids of the locations in this trip, including the hub.
+        """
+        return self.route[:-1]
+
+    def __get_lateness(self):
+        """
+        Space: O(1) Time: O(m)
+
+        :return: The sum of the time (in seconds) past the deadline that each location in this trip is reached at.
+        """
+        pathfinder = Pathfinder()
+        lateness = 0
+        arrival = self.departure_time
+        for i in range(1, len(self.route) - 1):
+            arrival += (self.service_time if i > 1 else 0) + pathfinder.get_distance(self.route[i - 1], self.route[i]) / self.speed * 60 * 60
+            lateness += max(0, arrival - min(self.__deadlines[self.route[i]]))
+        return lateness
+
+    locations = property(__get_locations)
+    lateness = property(__get_lateness)
+
+    def get_insertion_cost(self, unit:_Unit) -> float:
+        """
+        Space: O(l) Time: O(l * m), where l is the amount of locations of the unit
+
+        :param unit: The unit to insert.
+        :return: The distance that inserting the unit adds to this trip.
+        """
+        route = self.route.copy()
+        cost = 0
+        for location_id in unit.location_ids:
+            if location_id in self.__deadlines:
+                continue
+            added, position = _get_cheapest_position(route, location_id)
+            route.insert(position, location_id)
+            cost += added
+        return cost
+
+    def insert(self, unit:_Unit):
+        """
+        Inserts the locations of the given unit into this trip, each where
+        it adds the least distance.
+
+        Space: O(l) Time: O(l * m)
+
+        :param unit: The unit to insert.
+        :return: N/A
+        """
+        self.__previous_route = self.route.copy()
+        for location_id, deadline in unit.deadlines.items():
+            if location_id not in self.__deadlines:
+                self.route.insert(_get_cheapest_position(self.route, location_id)[1], location_id)
+                self.__deadlines[location_id] = []
+            self.__deadlines[location_id].append(deadline)
+        self.package_ids.extend(unit.package_ids)
+
+    def remove(self, unit:_Unit):
+        """
+        Removes the given unit, which has to be the last unit inserted,
+        from this trip.
+
+        Space: O(1) Time: O(l)
+
+        :param unit: The unit to remove.
+        :return: N/A
+        """
+        self.route = self.__previous_route
+        for location_id, deadline in unit.deadlines.items():
+            self.__deadlines[location_id].remove(deadline)
+            if len(self.__deadlines[location_id]) <= 0:
+                del self.__deadlines[location_id]
+        del self.package_ids[-unit.size:]
+
+def _get_cheapest_position(route:List[int], location_id:int):
+    """
+    Space: O(1) Time: O(m)
+
+    :param route: The locations of a trip, starting and ending at the hub.
+    :param location_id: The id of the location to insert.
+    :return: The distance that inserting the location adds to the trip, and the index to insert it at.
+    """
+    distance = Pathfinder().get_distance
+    best_added = math.inf
+    best_position = 1
+    for i in range(len(route) - 1):
+        added = distance(route[i], location_id) + distance(location_id, route[i + 1]) - distance(route[i], route[i + 1])
+        if added < best_added:
+            best_added = added
+            best_position = i + 1
+    return best_added, best_position
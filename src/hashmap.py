@@ -1,40 +1,114 @@
 # Mark Christian Malabanan, Student ID #001233960
 
-from typing import List
+from array import array
+from itertools import islice
 import math
+import numbers
 
 class HashMap:
-    def __init__(self, size):
+    """
+    A hashmap that uses open addressing: instead of keeping a list of
+    key-value pairs per bucket, every key gets its own slot, and a key
+    whose slot is taken goes to the next free slot after it (linear
+    probing).
+
+    The keys, values and hashes are kept in parallel arrays, in the order
+    they were added, and the slots only hold the index of their key in
+    those arrays. This way the slots stay small, and there are no objects
+    made per key-value pair. Once more than 3/4 of the slots are used,
+    the slots are doubled and every key is placed again, so lookups stay
+    O(1) no matter how many keys are added.
+    """
+    # The slots can't be fuller than this before the map grows
+    _max_load = 0.75
+    # Marks a slot that was never used, or one whose key was removed
+    _empty = -1
+    _removed = -2
+    # 2^64 / golden ratio, to spread the hashes over the slots (Fibonacci hashing)
+    _fibonacci = 11400714819323198485
+    _mask = (1 << 64) - 1
+
+    def __init__(self, size=8):
         """
-        Space: O(n^2) Time: O(n)
+        Space: O(n) Time: O(n)
 
-        :param size: The max size of this hashmap.
+        :param size: The amount of keys to make room for at first. The map grows as needed.
         """
-        size = math.ceil(size * 1.5)
-        self.__map:List[List[KeyValuePair]] = [[] for i in range(size)]
+        self.__keys = []
+        self.__values = []
+        self.__hashes = []
         self.__size = 0
-        self.__max_size = size
+        # Changes whenever a key is added or removed, so going through the map can tell if it changed meanwhile
+        self.__version = 0
+        self.__resize(max(size, 1))
 
     def append(self, key, value):
         """
         Appends the given key and value pair to the hashmap by hashing
-        the given key. If new keys have the same hash key as the older
-        ones, they are both placed in the same array under the hash key.
+        the given key. If the slot of the key is taken, the key is placed
+        in the next free slot after it.
 
-        Space: O(1) Time: O(1)
+        Space: O(1) amortized Time: O(1) amortized
 
         :param key: The key used to identify the value.
         :param value: The value of the given key.
         :return: N/A
         """
+        key = self.__to_key(key)
         key_hash = self.__get_hash(key)
-        pair = KeyValuePair(key, value)
-
-        for kv in self.__map[key_hash]:
-            if kv.key == key:
-                raise ValueError("Can't have similar keys in the map: %s (similar to %s)" % (pair, kv))
-        self.__map[key_hash].append(pair)
+        slot, index = self.__find(key, key_hash)
+        if index >= 0:
+            raise ValueError("Can't have similar keys in the map: %s (similar to %s)" % (key, self.__keys[index]))
+
+        # Removed keys still take up room until the map resizes
+        if len(self.__keys) + 1 > self.__max_used:
+            self.__resize(self.__size + 1)
+            slot, index = self.__find(key, key_hash)
+
+        self.__slots[slot] = len(self.__keys)
+        self.__keys.append(key)
+        self.__values.append(value)
+        self.__hashes.append(key_hash)
         self.__size += 1
+        self.__version += 1
+
+    def extend(self, keys, values):
+        """
+        Appends many key and value pairs at once, making room for all of
+        them first so the map grows at most once.
+
+        Space: O(n) Time: O(n)
+
+        :param keys: The keys used to identify the values.
+        :param values: The value of each of the given keys.
+        :return: N/A
+        """
+        keys = list(keys)
+        if len(self.__keys) + len(keys) > self.__max_used:
+            self.__resize(self.__size + len(keys))
+
+        # The same as append(), without looking up the same things for every key
+        slots = self.__slots
+        all_keys = self.__keys
+        hashes = self.__hashes
+        index = len(all_keys)
+        try:
+            for key in keys:
+                key = self.__to_key(key)
+                key_hash = key & self._mask if type(key) is int else self.__get_hash(key)
+                slot, other_index = self.__find(key, key_hash)
+                if other_index >= 0:
+                    raise ValueError("Can't have similar keys in the map: %s (similar to %s)" % (key, all_keys[other_index]))
+                slots[slot] = index
+                all_keys.append(key)
+                hashes.append(key_hash)
+                index += 1
+        finally:
+            # Only the keys before a similar key are added
+            added = index - len(self.__values)
+            self.__values.extend(islice(values, added))
+            self.__size += added
+            self.__version += 1
 
     def pop(self, key):
         """
@@ -43,74 +117,204 @@ class HashMap:
         Space: O(1) Time: O(1)
 
         :param key: The key of the value to be removed and returned.
-        :return: The value removed from the map.
+        :return: The value removed from the map, or None if the key is not in the map.
         """
-        key_hash = self.__get_hash(key)
-
-        for i, kv in enumerate(self.__map[key_hash]):
-            if kv.key == key:
-                self.__size -= 1
-                return self.__map[key_hash].pop(i)
-        return None
+        key = self.__to_key(key)
+        slot, index = self.__find(key, self.__get_hash(key))
+        if index < 0:
+            return None
+
+        value = self.__values[index]
+        self.__slots[slot] = self._removed
+        # The entry is only cleared here, and is left out when the map resizes
+        self.__keys[index] = _removed_key
+        self.__values[index] = None
+        self.__size -= 1
+        self.__version += 1
+        return value
 
     def to_array(self):
         """
         Creates and returns an array of the key-value pairs in this
-        map.
+        map. Use iter_items() to go through them without making an array.
 
-        Space: O(n^2) Time: O(n^2)
+        Space: O(n) Time: O(n)
 
         :return: An array of the key-value pairs in this map.
         """
-        result = []
-        for kv_arr in self.__map:
-            for kv in kv_arr:
-                result.append(kv)
-        return result
+        return [KeyValuePair(key, value) for key, value in self.iter_items()]
 
     def keys(self):
         """
-        Creates and returns an array of only the keys in this map.
-
-        Space: O(n^2) Time: O(n^2)
+        Space: O(1) Time: O(1)
 
-        :return: An array of only the keys in this map.
+        :return: A view of only the keys in this map, which goes through the map itself instead of copying the keys.
         """
-        result = []
-        for kv_arr in self.__map:
-            for kv in kv_arr:
-                result.append(kv.key)
-        return result
+        return KeysView(self)
 
     def values(self):
         """
-        Creates and returns an array of only the values in this map.
+        Space: O(1) Time: O(1)
+
+        :return: A view of only the values in this map, which goes through the map itself instead of copying the values.
+        """
+        return ValuesView(self)
+
+    def items(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: A view of the (key, value) pairs in this map, which goes through the map itself instead of copying them.
+        """
+        return ItemsView(self)
+
+    def iter_keys(self, sort=False):
+        """
+        Space: O(1), or O(n) if sorted Time: O(n), or O(n log n) if sorted
+
+        :param sort: If True, the keys are given from smallest to largest. Otherwise, in the order they were added.
+        :return: A generator of the keys in this map.
+        """
+        keys = self.__keys
+        for index in self.__iter_indexes(sort):
+            yield keys[index]
+
+    def iter_values(self, sort=False):
+        """
+        Space: O(1), or O(n) if sorted Time: O(n), or O(n log n) if sorted
 
-        Space: O(n^2) Time: O(n^2)
+        :param sort: If True, the values are given in the order of their keys, from smallest to largest. Otherwise, in the order they were added.
+        :return: A generator of the values in this map.
+        """
+        values = self.__values
+        for index in self.__iter_indexes(sort):
+            yield values[index]
+
+    def iter_items(self, sort=False):
+        """
+        Space: O(1), or O(n) if sorted Time: O(n), or O(n log n) if sorted
 
-        :return: An array of only the values in this map.
+        :param sort: If True, the pairs are given in the order of their keys, from smallest to largest. Otherwise, in the order they were added.
+        :return: A generator of the (key, value) pairs in this map.
         """
-        result = []
-        for kv_arr in self.__map:
-            for kv in kv_arr:
-                result.append(kv.value)
-        return result
+        keys = self.__keys
+        values = self.__values
+        for index in self.__iter_indexes(sort):
+            yield keys[index], values[index]
 
-    def __get_hash(self, key):
+    def __iter_indexes(self, sort:bool):
+        """
+        Goes through the indexes of the keys that are not removed. If
+        sorted, only the indexes are sorted, not the keys or values
+        themselves.
+
+        Space: O(1), or O(n) if sorted Time: O(n), or O(n log n) if sorted
+
+        :param sort: If True, the indexes are given in the order of their keys, from smallest to largest.
+        :return: A generator of the indexes of the keys in the parallel arrays.
+        """
+        version = self.__version
+        keys = self.__keys
+        if sort:
+            indexes = sorted((index for index, key in enumerate(keys) if key is not _removed_key), key=keys.__getitem__)
+        else:
+            indexes = (index for index, key in enumerate(keys) if key is not _removed_key)
+
+        for index in indexes:
+            yield index
+            if self.__version != version:
+                raise ValueError("The map can't be changed while going through it.")
+
+    @staticmethod
+    def __to_key(key):
         """
-        Hashes the key to (hopefully) create a unique enough index
-        to store the key-value pair into.
+        Turns any other kind of integer, like the ones NumPy gives, into a
+        plain int, so it's hashed and compared the same as the int with
+        the same value. Booleans are left as they are.
 
         Space: O(1) Time: O(1)
 
+        :param key: The key to be turned into a plain int.
+        :return: The key as a plain int if it's an integer, or the key as it is otherwise.
+        """
+        if type(key) is not int and isinstance(key, numbers.Integral) and not isinstance(key, bool):
+            return int(key)
+        return key
+
+    def __get_hash(self, key) -> int:
+        """
+        Hashes the key to a 64-bit number. Integers are already numbers,
+        so they're used as they are. Anything else is hashed by its
+        string form.
+
+        Space: O(1) Time: O(1) for integers, O(k) otherwise, where k is the length of the key as a string
+
         :param key: The key to be hashed.
         :return: The hashed key.
         """
-        input = str(key)
+        if type(key) is int:
+            return key & self._mask
+
         hash = 7
-        for char in input:
-            hash = hash * 31 + ord(char)
-        return int(hash % self.__max_size)
+        for char in str(key):
+            hash = (hash * 31 + ord(char)) & self._mask
+        return hash
+
+    def __find(self, key, key_hash:int):
+        """
+        Looks for the slot of the given key, starting from the slot its
+        hash points to and going through the slots after it.
+
+        Space: O(1) Time: O(1) on average
+
+        :param key: The key to look for.
+        :param key_hash: The hash of the key.
+        :return: The slot and index of the key if it's in the map. Otherwise, the slot to place it in, and -1.
+        """
+        slots = self.__slots
+        mask = len(slots) - 1
+        slot = ((key_hash * self._fibonacci) & self._mask) >> self.__shift
+        free_slot = -1
+        while True:
+            index = slots[slot]
+            if index == self._empty:
+                return (slot if free_slot < 0 else free_slot), -1
+            if index == self._removed:
+                if free_slot < 0:
+                    free_slot = slot
+            elif self.__hashes[index] == key_hash and self.__keys[index] == key:
+                return slot, index
+            slot = (slot + 1) & mask
+
+    def __resize(self, size:int):
+        """
+        Makes enough slots for the given amount of keys, leaves out the
+        removed keys, and places every key again.
+
+        Space: O(n) Time: O(n)
+
+        :param size: The amount of keys to make room for.
+        :return: N/A
+        """
+        # There has to be a power of 2 amount of slots, and twice as many as needed, so it doesn't resize again soon
+        bits = max(3, math.ceil(math.log2(size * 2 / self._max_load)))
+        self.__slots = array("q", [self._empty]) * (1 << bits)
+        self.__shift = 64 - bits
+        self.__max_used = int((1 << bits) * self._max_load)
+
+        if self.__size < len(self.__keys):
+            kept = [i for i, key in enumerate(self.__keys) if key is not _removed_key]
+            self.__keys = [self.__keys[i] for i in kept]
+            self.__values = [self.__values[i] for i in kept]
+            self.__hashes = [self.__hashes[i] for i in kept]
+
+        slots = self.__slots
+        mask = len(slots) - 1
+        for index, key_hash in enumerate(self.__hashes):
+            slot = ((key_hash * self._fibonacci) & self._mask) >> self.__shift
+            while slots[slot] != self._empty:
+                slot = (slot + 1) & mask
+            slots[slot] = index
 
     def __getitem__(self, key):
         """
@@ -121,12 +325,11 @@ class HashMap:
         :param key: The key of the value to be looked up.
         :return: The value looked up in map.
         """
-        key_hash = self.__get_hash(key)
-
-        for kv in self.__map[key_hash]:
-            if kv.key == key:
-                return kv.value
-        return None
+        key = self.__to_key(key)
+        slot, index = self.__find(key, self.__get_hash(key))
+        if index < 0:
+            return None
+        return self.__values[index]
 
     def __delitem__(self, key):
         """
@@ -137,6 +340,16 @@ class HashMap:
         """
         self.pop(key)
 
+    def __contains__(self, key):
+        """
+        Space: O(1) Time: O(1)
+
+        :param key: The key to check.
+        :return: True if the key is in the map, False otherwise.
+        """
+        key = self.__to_key(key)
+        return self.__find(key, self.__get_hash(key))[1] >= 0
+
     def __len__(self):
         """
         Space: O(1) Time: O(1)
@@ -149,9 +362,102 @@ class HashMap:
         """
         Space: O(1) Time: O(1)
 
-        :return: The iterator of the map itself.
+        :return: An iterator over the keys in this map, in the order they were added.
+        """
+        return self.iter_keys()
+
+class KeysView:
+    """
+    A view of the keys in a hashmap, like the one dict.keys() gives. It
+    doesn't copy anything, so it always shows the current keys.
+    """
+    def __init__(self, hashmap:HashMap):
+        """
+        Space: O(1) Time: O(1)
+
+        :param hashmap: The hashmap to view.
+        """
+        self._hashmap = hashmap
+
+    def __iter__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: An iterator over the keys, in the order they were added.
+        """
+        return self._hashmap.iter_keys()
+
+    def __contains__(self, key):
         """
-        return self.__map.__iter__()
+        Space: O(1) Time: O(1)
+
+        :param key: The key to check.
+        :return: True if the key is in the hashmap, False otherwise.
+        """
+        return key in self._hashmap
+
+    def __len__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of keys in the hashmap.
+        """
+        return len(self._hashmap)
+
+    def __repr__(self):
+        """
+        Space: O(n) Time: O(n)
+
+        :return: The representation of this view when printed.
+        """
+        return "%s(%s)" % (type(self).__name__, list(self))
+
+class ValuesView(KeysView):
+    """
+    A view of the values in a hashmap, like the one dict.values() gives.
+    """
+    def __iter__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: An iterator over the values, in the order their keys were added.
+        """
+        return self._hashmap.iter_values()
+
+    def __contains__(self, value):
+        """
+        Space: O(1) Time: O(n)
+
+        :param value: The value to check.
+        :return: True if the value is in the hashmap, False otherwise.
+        """
+        return any(other is value or other == value for other in self)
+
+class ItemsView(KeysView):
+    """
+    A view of the (key, value) pairs in a hashmap, like the one
+    dict.items() gives.
+    """
+    def __iter__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: An iterator over the (key, value) pairs, in the order they were added.
+        """
+        return self._hashmap.iter_items()
+
+    def __contains__(self, item):
+        """
+        Space: O(1) Time: O(1)
+
+        :param item: The (key, value) pair to check.
+        :return: True if the key is in the hashmap with the given value, False otherwise.
+        """
+        key, value = item
+        if key not in self._hashmap:
+            return False
+        other = self._hashmap[key]
+        return other is value or other == value
 
 class KeyValuePair:
     def __init__(self, key, value):
@@ -162,4 +468,7 @@ class KeyValuePair:
         :param value: The value in this pair.
         """
         self.key = key
-        self.value = value
\ No newline at end of file
+        self.value = value
+
+# Stands in for a removed key until the map resizes, since None can be a key
+_removed_key = object()
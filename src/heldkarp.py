@@ -0,0 +1,84 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+from src.pathfinder import Pathfinder
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The most locations solved at once. The tables take 2^n * n values, and
+# the biggest layer of sets is extended all at once, so 16 locations
+# already take tens of MB, and every location more doubles it.
+max_locations = 16
+
+def solve(location_ids:List[int], start_id:int, end_id:int) -> List[int]:
+    """
+    Finds the shortest path that starts from the start location, goes
+    through every given location, and ends at the end location, using
+    the Held-Karp algorithm. This always finds the best path, but takes
+    exponential time and space, so it should only be used for a small
+    amount of locations (at most max_locations).
+
+    The algorithm keeps, for each set of locations (as a bitmask) and
+    each location in that set, the shortest distance of a path that
+    starts from the start location, goes through exactly that set of
+    locations, and ends at that location. The distances of bigger sets
+    are built from those of smaller sets, one location at a time.
+
+    Space: O(2^n * n) Time: O(2^n * n^2)
+
+    :param location_ids: The ids of the locations to go through.
+    :param start_id: The id of the starting location.
+    :param end_id: The id of the ending location, or -1 if the path can end anywhere.
+    :return: The order to visit the locations in, as indices of the given location ids.
+    """
+    if np is None:
+        raise ImportError("The Held-Karp solver needs NumPy to be installed.")
+
+    n = len(location_ids)
+    if n > max_locations:
+        raise ValueError("The Held-Karp solver can solve at most %s locations at once, not %s." % (max_locations, n))
+    if n <= 1:
+        return list(range(n))
+
+    pathfinder = Pathfinder()
+    distances = np.array([[pathfinder.get_distance(i, j) for j in location_ids] for i in location_ids])
+    from_start = np.array([pathfinder.get_distance(start_id, i) for i in location_ids])
+    to_end = np.zeros(n) if end_id < 0 else np.array([pathfinder.get_distance(i, end_id) for i in location_ids])
+
+    # shortest[mask][j] is the shortest distance going through the set of
+    # locations in mask and ending at location j, and previous[mask][j]
+    # is the location right before j in that path.
+    shortest = np.full((1 << n, n), np.inf)
+    previous = np.full((1 << n, n), -1, dtype=np.int8)
+    bits = 1 << np.arange(n)
+    shortest[bits, np.arange(n)] = from_start
+    masks = np.arange(1 << n)
+    sizes = ((masks.reshape(-1, 1) & bits) != 0).sum(axis=1)
+    # Sets of the same size don't depend on each other, so all the sets
+    # of the same size are extended in a single NumPy operation.
+    for size in range(1, n):
+        layer = masks[sizes == size]
+        # Extend the paths ending at each location in each set to each
+        # location not in that set, and keep the shortest one.
+        extended = shortest[layer][:, :, np.newaxis] + distances
+        best_previous = extended.argmin(axis=1)
+        best_distances = np.take_along_axis(extended, best_previous[:, np.newaxis, :], axis=1)[:, 0, :]
+        layer_masks, next_locations = np.nonzero((layer.reshape(-1, 1) & bits) == 0)
+        next_masks = layer[layer_masks] | bits[next_locations]
+        shortest[next_masks, next_locations] = best_distances[layer_masks, next_locations]
+        previous[next_masks, next_locations] = best_previous[layer_masks, next_locations]
+
+    # Go back through the shortest path to get the order of the locations
+    mask = (1 << n) - 1
+    location = int((shortest[mask] + to_end).argmin())
+    order = []
+    while location != -1:
+        order.append(location)
+        next_location = int(previous[mask][location])
+        mask ^= 1 << location
+        location = next_location
+    order.reverse()
+    return order
@@ -0,0 +1,89 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import math
+from src.data import Data
+from typing import List
+
+class Load:
+    """
+    The amount of packages, the mass and the volume of a load of
+    packages. A truck's capacity is a Load too, and a load fits in a
+    truck only if it's within the truck's capacity in every one of them.
+    """
+    def __init__(self, count=0, mass=0, volume=0):
+        """
+        Space: O(1) Time: O(1)
+
+        :param count: The amount of packages.
+        :param mass: The mass, in kilograms.
+        :param volume: The volume, in cubic meters.
+        """
+        self.count = count
+        self.mass = mass
+        self.volume = volume
+
+    @staticmethod
+    def capacity(count=math.inf, mass=math.inf, volume=math.inf):
+        """
+        Space: O(1) Time: O(1)
+
+        :param count: The maximum amount of packages.
+        :param mass: The maximum mass, in kilograms.
+        :param volume: The maximum volume, in cubic meters.
+        :return: The capacity, as a Load with no limit on anything not given.
+        """
+        return Load(count, mass, volume)
+
+    @staticmethod
+    def of(package_ids:List[int]):
+        """
+        Space: O(1) Time: O(n)
+
+        :param package_ids: The ids of the packages.
+        :return: The load of the given packages.
+        """
+        table = Data().get_package_table()
+        return Load(len(package_ids), table.sum("mass", package_ids), table.sum("volume", package_ids))
+
+    def fits_in(self, capacity) -> bool:
+        """
+        Space: O(1) Time: O(1)
+
+        :param capacity: The capacity to check against.
+        :return: True if this load is within the given capacity in every way, False otherwise.
+        """
+        return self.count <= capacity.count and self.mass <= capacity.mass and self.volume <= capacity.volume
+
+    def is_empty(self) -> bool:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: True if there are no packages in this load, False otherwise.
+        """
+        return self.count <= 0
+
+    def __add__(self, other):
+        """
+        Space: O(1) Time: O(1)
+
+        :param other: The load to add.
+        :return: A new load of both loads together.
+        """
+        return Load(self.count + other.count, self.mass + other.mass, self.volume + other.volume)
+
+    def __sub__(self, other):
+        """
+        Space: O(1) Time: O(1)
+
+        :param other: The load to take away.
+        :return: A new load of this load without the given load.
+        """
+        return Load(self.count - other.count, self.mass - other.mass, self.volume - other.volume)
+
+    def __repr__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The representation of this load when printed.
+        """
+        return "%s packages, %s kg, %s m^3" % (self.count, self.mass, self.volume)
@@ -0,0 +1,280 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import time
+from collections import deque
+from src.pathfinder import Pathfinder
+from typing import Callable
+from typing import List
+
+_improvement_tolerance = 1e-9
+_max_segment_length = 3
+
+def improve(path_array:List, get_id:Callable[[object], int], fixed_end=True, max_iterations=None, time_budget=None, neighbor_count=8, on_improvement=None) -> List:
+    """
+    Shortens the given path with 2-opt and Or-opt moves until no more
+    moves can shorten it, or until the iteration or time budget runs out.
+        - A 2-opt move removes two edges of the path and reconnects it
+            the other way around, reversing the part of the path between.
+        - An Or-opt move takes 1 to 3 locations in a row and moves them
+            somewhere else in the path, in either direction.
+    The first location of the path never moves, and neither does the last
+    one if fixed_end is True.
+
+    Only the closest locations to each location (its neighbor list) are
+    tried as new edges, since long edges almost never make a path shorter.
+    Each location also has a "don't look" bit that is set when no move
+    around it shortens the path, and only cleared when one of its edges
+    changes, so locations that can't be improved are not checked again.
+
+    Space: O(n * k) Time: O(n^2 log n) to build the neighbor lists, then O(n * k) for each pass over the path, where k is the neighbor count
+
+    :param path_array: The path to shorten.
+    :param get_id: The conversion function used to convert the items in the path to location ids.
+    :param fixed_end: If True, the last location of the path never moves.
+    :param max_iterations: Optional - The maximum amount of moves to make.
+    :param time_budget: Optional - The maximum amount of time (in seconds) to spend.
+    :param neighbor_count: The amount of closest locations tried as new edges for each location.
+    :param on_improvement: Optional - Called with the shortened path (as a new list) after each move.
+    :return: A new list of the same items as the given path, in the shortened order.
+    """
+    if len(path_array) < 4:
+        return list(path_array)
+
+    search = _LocalSearch(path_array, get_id, fixed_end, neighbor_count)
+    on_move = None
+    if on_improvement is not None:
+        on_move = lambda tour: on_improvement([path_array[node] for node in tour if node < len(path_array)])
+    search.run(max_iterations, time_budget, on_move)
+    return [path_array[node] for node in search.tour if node < len(path_array)]
+
+class _LocalSearch:
+    def __init__(self, path_array:List, get_id:Callable[[object], int], fixed_end:bool, neighbor_count:int):
+        """
+        Space: O(n * k) Time: O(n^2 log n)
+
+        :param path_array: The path to shorten.
+        :param get_id: The conversion function used to convert the items in the path to location ids.
+        :param fixed_end: If True, the last location of the path never moves.
+        :param neighbor_count: The amount of closest locations tried as new edges for each location.
+        """
+        self.location_ids = [get_id(item) for item in path_array]
+        # If the end of the path is free, a dummy location with a distance
+        # of 0 to every other location is added as the fixed end instead.
+        # This way, both kinds of paths are searched in the same way.
+        self.dummy = len(path_array) if not fixed_end else -1
+        self.tour = list(range(len(path_array)))
+        if not fixed_end:
+            self.tour.append(self.dummy)
+        self.position = list(range(len(self.tour)))
+        self.neighbors = self._get_neighbors(neighbor_count)
+        self.dont_look = [False] * len(self.tour)
+        self.active = deque(node for node in self.tour[1:-1])
+
+    def distance(self, node1:int, node2:int) -> float:
+        """
+        Space: O(1) Time: O(1)
+
+        :param node1: The first node.
+        :param node2: The second node.
+        :return: The distance of the best path between the locations of the two nodes.
+        """
+        if node1 == self.dummy or node2 == self.dummy:
+            return 0
+        return Pathfinder().get_distance(self.location_ids[node1], self.location_ids[node2])
+
+    def _get_neighbors(self, neighbor_count:int) -> List[List[int]]:
+        """
+        Space: O(n * k) Time: O(n^2 log n)
+
+        :param neighbor_count: The amount of closest nodes to keep for each node.
+        :return: The closest nodes to each node, sorted from closest to farthest.
+        """
+        neighbors = []
+        for node in self.tour:
+            others = [other for other in self.tour if other != node]
+            others.sort(key=lambda other: self.distance(node, other))
+            neighbors.append(others[:neighbor_count])
+        return neighbors
+
+    def _next(self, node:int, step:int):
+        """
+        Space: O(1) Time: O(1)
+
+        :param node: The node to get the next node of.
+        :param step: 1 to get the node after the given node, -1 to get the node before it.
+        :return: The next node in the given direction, or None if the given node is at the end of the path.
+        """
+        index = self.position[node] + step
+        if index < 0 or index >= len(self.tour):
+            return None
+        return self.tour[index]
+
+    def _wake(self, *nodes):
+        """
+        Clears the "don't look" bits of the given nodes, so they are
+        checked again.
+
+        Space: O(1) Time: O(1)
+
+        :param nodes: The nodes to check again.
+        :return: N/A
+        """
+        for node in nodes:
+            if node is None or node == self.dummy or not self.dont_look[node]:
+                continue
+            self.dont_look[node] = False
+            self.active.append(node)
+
+    def run(self, max_iterations=None, time_budget=None, on_move=None):
+        """
+        Makes moves that shorten the path until there are none left, or
+        until the budget runs out.
+
+        Space: O(n) Time: O(n * k) for each pass over the path
+
+        :param max_iterations: Optional - The maximum amount of moves to make.
+        :param time_budget: Optional - The maximum amount of time (in seconds) to spend.
+        :param on_move: Optional - Called with the tour after each move.
+        :return: The amount of moves made.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        iterations = 0
+        while len(self.active) > 0:
+            if max_iterations is not None and iterations >= max_iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            node = self.active.popleft()
+            if self.dont_look[node]:
+                continue
+            if self._two_opt(node) or self._or_opt(node):
+                iterations += 1
+                if on_move is not None:
+                    on_move(self.tour)
+                # Keep checking this node until it can't be improved
+                self.active.appendleft(node)
+                continue
+            self.dont_look[node] = True
+        return iterations
+
+    def _two_opt(self, node:int) -> bool:
+        """
+        Tries to replace an edge of the given node with an edge to one of
+        its neighbors, reversing the part of the path in between.
+
+        Space: O(1) Time: O(k + n)
+
+        :param node: The node to try the moves for.
+        :return: True if a move was made, False otherwise.
+        """
+        for step in (1, -1):
+            next_node = self._next(node, step)
+            if next_node is None:
+                continue
+            old_distance = self.distance(node, next_node)
+            for neighbor in self.neighbors[node]:
+                new_distance = self.distance(node, neighbor)
+                if new_distance >= old_distance:
+                    break
+                neighbor_next = self._next(neighbor, step)
+                if neighbor_next is None or neighbor_next == node:
+                    continue
+                # Edges (node, next_node) and (neighbor, neighbor_next)
+                # become (node, neighbor) and (next_node, neighbor_next)
+                change = new_distance + self.distance(next_node, neighbor_next) - old_distance - self.distance(neighbor, neighbor_next)
+                if change < -_improvement_tolerance:
+                    i = self.position[node]
+                    j = self.position[neighbor]
+                    if step == 1:
+                        self._reverse(min(i, j) + 1, max(i, j))
+                    else:
+                        self._reverse(min(i, j), max(i, j) - 1)
+                    self._wake(node, next_node, neighbor, neighbor_next)
+                    return True
+        return False
+
+    def _or_opt(self, node:int) -> bool:
+        """
+        Tries to move a segment of 1 to 3 nodes, starting at the given
+        node, next to one of the neighbors of the segment's ends.
+
+        Space: O(1) Time: O(k + n)
+
+        :param node: The node that the segment starts at.
+        :return: True if a move was made, False otherwise.
+        """
+        start = self.position[node]
+        for length in range(1, _max_segment_length + 1):
+            end = start + length - 1
+            # The segment can't include the fixed ends of the path
+            if start < 1 or end > len(self.tour) - 2:
+                return False
+            first = self.tour[start]
+            last = self.tour[end]
+            before = self.tour[start - 1]
+            after = self.tour[end + 1]
+            removed = self.distance(before, first) + self.distance(last, after) - self.distance(before, after)
+            if removed <= _improvement_tolerance:
+                continue
+
+            for neighbor in self.neighbors[first] + self.neighbors[last]:
+                neighbor_index = self.position[neighbor]
+                if start <= neighbor_index <= end:
+                    continue
+                for edge_start in (neighbor_index - 1, neighbor_index):
+                    if edge_start < 0 or edge_start + 1 >= len(self.tour):
+                        continue
+                    # Skip the edges touching the segment
+                    if start - 1 <= edge_start <= end:
+                        continue
+                    edge_from = self.tour[edge_start]
+                    edge_to = self.tour[edge_start + 1]
+                    edge_distance = self.distance(edge_from, edge_to)
+                    forward = self.distance(edge_from, first) + self.distance(last, edge_to) - edge_distance
+                    backward = self.distance(edge_from, last) + self.distance(first, edge_to) - edge_distance
+                    added = min(forward, backward)
+                    if added - removed < -_improvement_tolerance:
+                        self._move(start, end, edge_start, backward < forward)
+                        self._wake(before, after, first, last, edge_from, edge_to)
+                        return True
+        return False
+
+    def _reverse(self, start:int, end:int):
+        """
+        Reverses the nodes in the path between the given indices.
+
+        Space: O(1) Time: O(n)
+
+        :param start: The index of the first node to reverse.
+        :param end: The index of the last node to reverse.
+        :return: N/A
+        """
+        while start < end:
+            self.tour[start], self.tour[end] = self.tour[end], self.tour[start]
+            self.position[self.tour[start]] = start
+            self.position[self.tour[end]] = end
+            start += 1
+            end -= 1
+
+    def _move(self, start:int, end:int, edge_start:int, reverse:bool):
+        """
+        Moves the nodes in the path between the given indices in between
+        the node at edge_start and the node after it.
+
+        Space: O(n) Time: O(n)
+
+        :param start: The index of the first node to move.
+        :param end: The index of the last node to move.
+        :param edge_start: The index of the node that the segment is moved after.
+        :param reverse: If True, the segment is inserted in reverse.
+        :return: N/A
+        """
+        segment = self.tour[start:end + 1]
+        if reverse:
+            segment.reverse()
+        edge_from = self.tour[edge_start]
+        del self.tour[start:end + 1]
+        index = self.tour.index(edge_from) + 1
+        self.tour[index:index] = segment
+        for i, node in enumerate(self.tour):
+            self.position[node] = i
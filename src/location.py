@@ -4,7 +4,7 @@ import re
 
 state_regex = "^([A-Z][A-Z])$"
 class Location:
-    def __init__(self, location_id, name, address, city, state, zip_code):
+    def __init__(self, location_id, name, address, city, state, zip_code, latitude=None, longitude=None):
         """
         Space: O(1) Time: O(1)
 
@@ -14,6 +14,8 @@ class Location:
         :param city: The city this location is in.
         :param state: The state this location is in.
         :param zip_code: The zip code where this location is in.
+        :param latitude: Optional - The latitude of this location, in degrees.
+        :param longitude: Optional - The longitude of this location, in degrees.
         """
         self.location_id = location_id
         self.name = name
@@ -21,6 +23,8 @@ class Location:
         self.city = city
         self.state = state
         self.zip_code = zip_code
+        self.latitude = latitude
+        self.longitude = longitude
 
     def _get_location_id(self):
         """
@@ -131,9 +135,60 @@ class Location:
         val = int(value)
         self._zip_code = val
 
+    def _get_latitude(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The latitude of this location, in degrees, or None if it's not known.
+        """
+        return self._latitude
+
+    def _set_latitude(self, value):
+        """
+        Space: O(1) Time: O(1)
+
+        :param value: The latitude to assign to this location, in degrees. Can be a number string, or None if it's not known.
+        :return: N/A
+        """
+        val = None if value is None or value == "" else float(value)
+        if val is not None and not -90 <= val <= 90:
+            raise ValueError("The given latitude has to be between -90 and 90 degrees: %s" % value)
+        self._latitude = val
+
+    def _get_longitude(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The longitude of this location, in degrees, or None if it's not known.
+        """
+        return self._longitude
+
+    def _set_longitude(self, value):
+        """
+        Space: O(1) Time: O(1)
+
+        :param value: The longitude to assign to this location, in degrees. Can be a number string, or None if it's not known.
+        :return: N/A
+        """
+        val = None if value is None or value == "" else float(value)
+        if val is not None and not -180 <= val <= 180:
+            raise ValueError("The given longitude has to be between -180 and 180 degrees: %s" % value)
+        self._longitude = val
+
+    def _get_has_coordinates(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: True if both the latitude and longitude of this location are known, False otherwise.
+        """
+        return self._latitude is not None and self._longitude is not None
+
     location_id = property(_get_location_id, _set_location_id)
     name = property(_get_name, _set_name)
     address = property(_get_address, _set_address)
     city = property(_get_city, _set_city)
     state = property(_get_state, _set_state)
-    zip_code = property(_get_zip_code, _set_zip_code)
\ No newline at end of file
+    zip_code = property(_get_zip_code, _set_zip_code)
+    latitude = property(_get_latitude, _set_latitude)
+    longitude = property(_get_longitude, _set_longitude)
+    has_coordinates = property(_get_has_coordinates)
\ No newline at end of file
@@ -0,0 +1,96 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from src.pathfinder import Pathfinder
+import src.localsearch as localsearch
+import src.tspsolver as tspsolver
+from typing import List
+
+def solve(location_ids:List[int], start_id:int, end_id:int, starts:int, workers=None, seed=0, improve=True, max_iterations=None, time_budget=None) -> List[int]:
+    """
+    Builds a path through the given locations several times, each time
+    inserting the locations in a different random order, and returns the
+    shortest one. The first start always uses the given order, so the
+    result is never longer than a single start.
+
+    The starts run in parallel on a pool of processes. Instead of each
+    process calculating the best paths again, the distances are copied
+    once into shared memory and every process reads them from there.
+    With a road graph, the paths are only calculated when needed and
+    can't be shared, so the starts run one after the other instead.
+
+    Space: O(n^2) for the shared distances Time: O(s * n^2 / w), where s is the amount of starts and w the amount of workers
+
+    :param location_ids: The ids of the locations to go through.
+    :param start_id: The id of the starting location.
+    :param end_id: The id of the ending location, or -1 if the path can end anywhere.
+    :param starts: The amount of insertion orders to try.
+    :param workers: Optional - The amount of processes to use. Defaults to the amount of CPUs.
+    :param seed: The seed of the random insertion orders.
+    :param improve: If True, each path is also improved with local search.
+    :param max_iterations: Optional - The maximum amount of moves the local search can make for each start.
+    :param time_budget: Optional - The maximum amount of time (in seconds) the local search can spend for each start.
+    :return: The order to visit the locations in, as indices of the given location ids.
+    """
+    pathfinder = Pathfinder()
+    arguments = [(location_ids, start_id, end_id, seed + i if i > 0 else None, improve, max_iterations, time_budget) for i in range(starts)]
+    if pathfinder.graph is not None:
+        results = [_solve_start(argument) for argument in arguments]
+    else:
+        block = pathfinder.share_distances()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(block.name, pathfinder.node_amount, pathfinder.version)) as executor:
+                results = list(executor.map(_solve_start, arguments))
+        finally:
+            block.close()
+            block.unlink()
+
+    # Use the first of the shortest paths, so the result doesn't depend
+    # on which process finishes first.
+    shortest = min(range(len(results)), key=lambda i: results[i][0])
+    return results[shortest][1]
+
+def _attach(name, node_amount, version):
+    """
+    Runs once in each process of the pool, to read the distances from the
+    shared memory block.
+
+    Space: O(1) Time: O(1)
+
+    :param name: The name of the shared memory block.
+    :param node_amount: The amount of nodes in the graph.
+    :param version: The version of the distances.
+    :return: N/A
+    """
+    Pathfinder().attach_distances(name, node_amount, version)
+
+def _solve_start(arguments):
+    """
+    Builds a single path through the locations, inserting them in a
+    random order.
+
+    Space: O(n) Time: O(n^2), plus the time spent improving the path
+
+    :param arguments: The location ids, start id, end id, seed (or None to keep the given order), and the local search settings.
+    :return: The overall distance of the path, and the order to visit the locations in.
+    """
+    location_ids, start_id, end_id, seed, improve, max_iterations, time_budget = arguments
+    insertion_order = list(range(len(location_ids)))
+    if seed is not None:
+        random.Random(seed).shuffle(insertion_order)
+
+    order = tspsolver.cheapest_insertion([location_ids[i] for i in insertion_order], start_id)
+    order = [insertion_order[i] for i in order]
+
+    # The path is made of indices of the locations, with the start and
+    # end locations right after the last index, so a location id that
+    # shows up more than once still maps back to the right location.
+    all_ids = location_ids + [start_id, end_id]
+    path = [len(location_ids)] + order
+    if end_id >= 0:
+        path.append(len(location_ids) + 1)
+    if improve:
+        path = localsearch.improve(path, lambda i: all_ids[i], end_id >= 0, max_iterations, time_budget)
+    distance = tspsolver.overall_distance(path, lambda i: all_ids[i])
+    return [distance, [i for i in path if i < len(location_ids)]]
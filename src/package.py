@@ -3,10 +3,31 @@
 import re
 import src.timeutil as timeutil
 from enum import IntEnum
-import src.data as data
+import src.packagetable as packagetable
 
 num_arr_regex = "^((\d*, ?)*(\d+)|\[(\d*, ?)*(\d+)\])$"
 
+def parse_package_req(value:str):
+    """
+    Space: O(n) Time: O(n)
+
+    :param value: An array, in string form, of package ids. Examples of the different formats are: "13, 19" or "[13, 19]". "-1" means there are none.
+    :return: The package ids in the array.
+    """
+    match = re.search(num_arr_regex, value)
+    val = value
+    if match is None:
+        if value == "-1":
+            val = "[]"
+        else:
+            raise ValueError("The given value has to be an array of numbers, like so: 13, 19 or [13, 19]")
+    if val[0] == '[':
+        no_brackets = val[1:len(val) - 1]
+    else:
+        no_brackets = val
+    no_spaces = no_brackets.replace(' ', '')
+    return [] if len(no_spaces) <= 0 else [int(s) for s in no_spaces.split(',')]
+
 class DeliveryStatus(IntEnum):
     NotDelivered = 0
     EnRoute = 1
@@ -14,7 +35,9 @@ class DeliveryStatus(IntEnum):
     DeliveredLate = 3
 
 class Package:
-    def __init__(self, package_id, address_id, delivery_time, has_truck_req, truck_req, is_delayed, delay_time, has_package_req, package_req, mass, delivery_status):
+    __slots__ = ("index", "_table", "_row")
+
+    def __init__(self, package_id, address_id, delivery_time, has_truck_req, truck_req, is_delayed, delay_time, has_package_req, package_req, mass, delivery_status, volume=0, table=None):
         """
         Space: O(1) Time: O(1)
 
@@ -29,7 +52,13 @@ class Package:
         :param package_req: The package requirement (as an array string) of this package
         :param mass: The mass, in kilograms, of this package.
         :param delivery_status: The delivery status of package.
+        :param volume: The volume, in cubic meters, of this package.
+        :param table: Optional - The table to add this package to. If not given, the package is kept in a table of its own.
         """
+        # The index that this package is in, if any (see PackageIndex)
+        self.index = None
+        self._table = table if table is not None else packagetable.PackageTable(1)
+        self._row = self._table.add_row()
         self.package_id = package_id
         self.address_id = address_id
         self.delivery_time = delivery_time
@@ -40,16 +69,35 @@ class Package:
         self.has_package_req = has_package_req
         self.package_req = package_req
         self.mass = mass
+        self.volume = volume
         self.delivery_status = delivery_status
         self.delivered_at = 0
 
+    @staticmethod
+    def view(table, row:int):
+        """
+        Makes a package that reads and writes a row already in the given
+        table, without converting any values.
+
+        Space: O(1) Time: O(1)
+
+        :param table: The table that the package is in.
+        :param row: The index of the row of the package.
+        :return: The package.
+        """
+        package = Package.__new__(Package)
+        package.index = None
+        package._table = table
+        package._row = row
+        return package
+
     def _get_package_id(self):
         """
         Space: O(1) Time: O(1)
 
         :return: The id of this package.
         """
-        return self._package_id
+        return self._table.get("package_id", self._row)
 
     def _set_package_id(self, value):
         """
@@ -61,7 +109,7 @@ class Package:
         val = int(value)
         if val < 0:
             raise ValueError("Id cannot be a negative value!")
-        self._package_id = val
+        self._set_indexed("package_id", val)
 
     def _get_address_id(self):
         """
@@ -69,7 +117,7 @@ class Package:
 
         :return: The id of the address that this package is to be delivered to.
         """
-        return self._address_id
+        return self._table.get("address_id", self._row)
 
     def _set_address_id(self, value):
         """
@@ -81,7 +129,7 @@ class Package:
         val = int(value)
         if val < 0:
             raise ValueError("Address Id cannot be a negative value!")
-        self._address_id = val
+        self._set_indexed("address_id", val)
 
     def _get_is_timed(self):
         """
@@ -97,7 +145,7 @@ class Package:
 
         :return: The time that this package is supposed to be delivered by.
         """
-        return self._delivery_time
+        return self._table.get("delivery_time", self._row)
 
     def _set_delivery_time(self, value):
         """
@@ -107,7 +155,7 @@ class Package:
         :return: N/A
         """
         val = "11:59:59 PM" if value == "EOD" else value
-        self._delivery_time = timeutil.to_seconds(val)
+        self._set_indexed("delivery_time", timeutil.to_seconds(val))
 
     def _get_has_truck_req(self):
         """
@@ -115,7 +163,7 @@ class Package:
 
         :return: True if the package has any truck requirements (e.g. should be delivered by truck 2), False otherwise.
         """
-        return self._has_truck_req
+        return self._table.get("has_truck_req", self._row)
 
     def _set_has_truck_req(self, value):
         """
@@ -126,7 +174,7 @@ class Package:
         """
         int_val = int(value)
         val = True if int_val == 1 else False
-        self._has_truck_req = val
+        self._table.set("has_truck_req", self._row, val)
 
     def _get_truck_req(self):
         """
@@ -134,7 +182,7 @@ class Package:
 
         :return: The id of the truck that this package should be in.
         """
-        return self._truck_req
+        return self._table.get("truck_req", self._row)
 
     def _set_truck_req(self, value):
         """
@@ -144,7 +192,7 @@ class Package:
         :return: N/A
         """
         val = int(value)
-        self._truck_req = val
+        self._set_indexed("truck_req", val)
 
     def _get_is_delayed(self):
         """
@@ -152,7 +200,7 @@ class Package:
 
         :return: True if the package is delayed, False otherwise
         """
-        return self._is_delayed
+        return self._table.get("is_delayed", self._row)
 
     def _set_is_delayed(self, value):
         """
@@ -163,7 +211,7 @@ class Package:
         """
         int_val = int(value)
         val = True if int_val == 1 else False
-        self._is_delayed = val
+        self._set_indexed("is_delayed", val)
 
     def _get_delay_time(self):
         """
@@ -171,7 +219,7 @@ class Package:
 
         :return: The time, in seconds, that this delayed package will arrive at the warehouse.
         """
-        return self._delay_time
+        return self._table.get("delay_time", self._row)
 
     def _set_delay_time(self, value):
         """
@@ -181,7 +229,7 @@ class Package:
         :return: N/A
         """
         val = "11:59:59 PM" if value == "-1" else value
-        self._delay_time = timeutil.to_seconds(val)
+        self._table.set("delay_time", self._row, timeutil.to_seconds(val))
 
     def _get_has_package_req(self):
         """
@@ -189,7 +237,7 @@ class Package:
 
         :return: True if the package has to be with other packages when being delivered, False otherwise.
         """
-        return self._has_package_req
+        return self._table.get("has_package_req", self._row)
 
     def _set_has_package_req(self, value):
         """
@@ -200,7 +248,7 @@ class Package:
         """
         int_val = int(value)
         val = True if int_val == 1 else False
-        self._has_package_req = val
+        self._table.set("has_package_req", self._row, val)
 
     def _get_package_req(self):
         """
@@ -208,7 +256,7 @@ class Package:
 
         :return: An array of the package ids that this package should be delivered with.
         """
-        return self._package_req
+        return self._table.get_package_req(self._row)
 
     def _set_package_req(self, value):
         """
@@ -217,20 +265,7 @@ class Package:
         :param value: An array, in string form, of package ids that this package should be delivered with. Examples of the different formats are: "13, 19" or "[13, 19]".
         :return: N/A
         """
-        match = re.search(num_arr_regex, value)
-        val = value
-        if match is None:
-            if value == "-1":
-                val = "[]"
-            else:
-                raise ValueError("The given value has to be an array of numbers, like so: 13, 19 or [13, 19]")
-        if val[0] == '[':
-            no_brackets = val[1:len(val) - 1]
-        else:
-            no_brackets = val
-        no_spaces = no_brackets.replace(' ', '')
-        num_arr = [] if len(no_spaces) <= 0 else [int(s) for s in no_spaces.split(',')]
-        self._package_req = num_arr
+        self._table.set_package_req(self._row, parse_package_req(value))
 
     def _get_mass(self):
         """
@@ -238,7 +273,7 @@ class Package:
 
         :return: The mass, in kilograms, of the package.
         """
-        return self._mass
+        return self._table.get("mass", self._row)
 
     def _set_mass(self, value):
         """
@@ -247,7 +282,27 @@ class Package:
         :param value: The mass, in kilograms, that this package should be set to.
         :return: N/A
         """
-        self._mass = int(value)
+        self._table.set("mass", self._row, int(value))
+
+    def _get_volume(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The volume, in cubic meters, of the package.
+        """
+        return self._table.get("volume", self._row)
+
+    def _set_volume(self, value):
+        """
+        Space: O(1) Time: O(1)
+
+        :param value: The volume, in cubic meters, that this package should be set to.
+        :return: N/A
+        """
+        val = float(value)
+        if val < 0:
+            raise ValueError("Volume cannot be a negative value!")
+        self._table.set("volume", self._row, val)
 
     def _get_delivery_status(self):
         """
@@ -255,7 +310,7 @@ class Package:
 
         :return: The current delivery status of this package, as represented by the DeliveryStatus enum.
         """
-        return self._delivery_status
+        return DeliveryStatus(self._table.get("delivery_status", self._row))
 
     def _set_delivery_status(self, value):
         """
@@ -264,7 +319,51 @@ class Package:
         :param value: The delivery status that this package should be set to.
         :return: N/A
         """
-        self._delivery_status = DeliveryStatus(int(value))
+        self._set_indexed("delivery_status", DeliveryStatus(int(value)).value)
+
+    def _get_delivered_at(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The time, in seconds, that this package was delivered at.
+        """
+        return self._table.get("delivered_at", self._row)
+
+    def _set_delivered_at(self, value):
+        """
+        Space: O(1) Time: O(1)
+
+        :param value: The time, in seconds, that this package was delivered at.
+        :return: N/A
+        """
+        self._table.set("delivered_at", self._row, value)
+
+    def _get_lock(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The lock to hold while making changes to this package that have to happen together.
+        """
+        return self._table.get_lock(self._row)
+
+    def _set_indexed(self, column:str, value):
+        """
+        Sets a column that the package index groups the packages by, and
+        moves this package to the right groups in the index. Only the
+        groups of that column change, so the package never goes missing
+        from the rest of the index.
+
+        Space: O(1) Time: O(1)
+
+        :param column: The name of the column to set.
+        :param value: The value to set the column to.
+        :return: N/A
+        """
+        with self.lock:
+            old_value = self._table.get(column, self._row)
+            self._table.set(column, self._row, value)
+            if self.index is not None:
+                self.index.move(self, column, old_value)
 
     package_id = property(_get_package_id, _set_package_id)
     address_id = property(_get_address_id, _set_address_id)
@@ -277,7 +376,10 @@ class Package:
     has_package_req = property(_get_has_package_req, _set_has_package_req)
     package_req = property(_get_package_req, _set_package_req)
     mass = property(_get_mass, _set_mass)
+    volume = property(_get_volume, _set_volume)
     delivery_status = property(_get_delivery_status, _set_delivery_status)
+    delivered_at = property(_get_delivered_at, _set_delivered_at)
+    lock = property(_get_lock)
 
     def __repr__(self):
         """
@@ -296,7 +398,10 @@ class Package:
         message = ""
         message += "Package %s\n" % self.package_id
 
-        location = data.Data().get_location(self.address_id)
+        # Imported here, since the data module imports this one, and a
+        # process that imports this module first would otherwise fail
+        from src.data import Data
+        location = Data().get_location(self.address_id)
         message += "\tAddress: %s, %s, %s %s\n\tDelivery Time: %s\n\tMass: %s kg\n\tDelivery Status: %s (%s)" % (location.address, location.city, location.state, location.zip_code, timeutil.to_time(self.delivery_time), self.mass, DeliveryStatus(self.delivery_status).name, timeutil.to_time(self.delivered_at))
         if self.has_truck_req == True:
             message += "\n\tTruck Req: %s" % self.truck_req
@@ -0,0 +1,194 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+from src.package import DeliveryStatus
+import threading
+
+class PackageIndex:
+    """
+    Keeps the ids of the packages grouped by their address, truck
+    requirement, delivery status, and whether they're time-sensitive or
+    delayed, so the packages matching any of those can be looked up
+    without going through every package.
+
+    The packages added to this index tell it whenever any of those
+    change, so it's always up to date. Every change is made while holding
+    the lock of this index, and every group is given as a frozen copy
+    made while holding it, so a group can be read while packages change
+    in another thread.
+    """
+    def __init__(self):
+        """
+        Space: O(1) Time: O(1)
+        """
+        self.__by_address = {}
+        self.__by_truck_req = {}
+        self.__by_status = {}
+        self.__timed = set()
+        self.__delayed = set()
+        self.__lock = threading.Lock()
+
+    def add(self, package):
+        """
+        Adds the given package to this index.
+
+        Space: O(1) Time: O(1)
+
+        :param package: The package to add.
+        :return: N/A
+        """
+        package_id = package.package_id
+        address_id = package.address_id
+        truck_req = package.truck_req
+        delivery_status = DeliveryStatus(package.delivery_status)
+        is_timed = package.is_timed
+        is_delayed = package.is_delayed
+        with self.__lock:
+            self.__by_address.setdefault(address_id, set()).add(package_id)
+            self.__by_truck_req.setdefault(truck_req, set()).add(package_id)
+            self.__by_status.setdefault(delivery_status, set()).add(package_id)
+            if is_timed:
+                self.__timed.add(package_id)
+            if is_delayed:
+                self.__delayed.add(package_id)
+
+    def add_columns(self, columns:dict):
+        """
+        Adds many packages to this index at once, straight from their
+        columns, without making a Package for each.
+
+        Space: O(n) Time: O(n)
+
+        :param columns: The package_id, address_id, truck_req, delivery_status, delivery_time and is_delayed columns of the packages, by name.
+        :return: N/A
+        """
+        end_of_day = 86399.0
+        with self.__lock:
+            by_address = self.__by_address
+            by_truck_req = self.__by_truck_req
+            by_status = {status: self.__by_status.setdefault(DeliveryStatus(status), set()) for status in set(columns["delivery_status"])}
+            timed = self.__timed
+            delayed = self.__delayed
+            for package_id, address_id, truck_req, delivery_status, delivery_time, is_delayed in zip(columns["package_id"], columns["address_id"], columns["truck_req"], columns["delivery_status"], columns["delivery_time"], columns["is_delayed"]):
+                group = by_address.get(address_id)
+                if group is None:
+                    group = by_address[address_id] = set()
+                group.add(package_id)
+                group = by_truck_req.get(truck_req)
+                if group is None:
+                    group = by_truck_req[truck_req] = set()
+                group.add(package_id)
+                by_status[delivery_status].add(package_id)
+                if delivery_time < end_of_day:
+                    timed.add(package_id)
+                if is_delayed:
+                    delayed.add(package_id)
+
+    def move(self, package, column:str, old_value):
+        """
+        Moves the given package to the right groups of the given column,
+        after the column has changed. The package stays in the groups of
+        every other column.
+
+        Space: O(1) Time: O(1)
+
+        :param package: The package that changed.
+        :param column: The name of the column that changed.
+        :param old_value: The value of the column before it changed.
+        :return: N/A
+        """
+        package_id = package.package_id
+        with self.__lock:
+            if column == "package_id":
+                groups = [self.__by_address.get(package.address_id), self.__by_truck_req.get(package.truck_req), self.__by_status.get(DeliveryStatus(package.delivery_status)), self.__timed, self.__delayed]
+                for group in groups:
+                    if group is not None and old_value in group:
+                        group.discard(old_value)
+                        group.add(package_id)
+            elif column == "address_id":
+                self.__by_address.get(old_value, set()).discard(package_id)
+                self.__by_address.setdefault(package.address_id, set()).add(package_id)
+            elif column == "truck_req":
+                self.__by_truck_req.get(old_value, set()).discard(package_id)
+                self.__by_truck_req.setdefault(package.truck_req, set()).add(package_id)
+            elif column == "delivery_status":
+                self.__by_status.get(DeliveryStatus(old_value), set()).discard(package_id)
+                self.__by_status.setdefault(DeliveryStatus(package.delivery_status), set()).add(package_id)
+            elif column == "delivery_time":
+                if package.is_timed:
+                    self.__timed.add(package_id)
+                else:
+                    self.__timed.discard(package_id)
+            elif column == "is_delayed":
+                if package.is_delayed:
+                    self.__delayed.add(package_id)
+                else:
+                    self.__delayed.discard(package_id)
+
+    def remove(self, package):
+        """
+        Removes the given package from this index.
+
+        Space: O(1) Time: O(1)
+
+        :param package: The package to remove.
+        :return: N/A
+        """
+        package_id = package.package_id
+        address_id = package.address_id
+        truck_req = package.truck_req
+        delivery_status = DeliveryStatus(package.delivery_status)
+        with self.__lock:
+            self.__by_address.get(address_id, set()).discard(package_id)
+            self.__by_truck_req.get(truck_req, set()).discard(package_id)
+            self.__by_status.get(delivery_status, set()).discard(package_id)
+            self.__timed.discard(package_id)
+            self.__delayed.discard(package_id)
+
+    def get_by_address(self, address_id:int) -> frozenset:
+        """
+        Space: O(n) Time: O(n)
+
+        :param address_id: The id of the address.
+        :return: A copy of the ids of the packages going to the given address.
+        """
+        with self.__lock:
+            return frozenset(self.__by_address.get(address_id, ()))
+
+    def get_by_truck_req(self, truck_req:int) -> frozenset:
+        """
+        Space: O(n) Time: O(n)
+
+        :param truck_req: The id of the truck, or -1 for the packages without a truck requirement.
+        :return: A copy of the ids of the packages that have to be in the given truck.
+        """
+        with self.__lock:
+            return frozenset(self.__by_truck_req.get(truck_req, ()))
+
+    def get_by_status(self, delivery_status) -> frozenset:
+        """
+        Space: O(n) Time: O(n)
+
+        :param delivery_status: The delivery status, as a DeliveryStatus or its value.
+        :return: A copy of the ids of the packages with the given delivery status.
+        """
+        delivery_status = DeliveryStatus(delivery_status)
+        with self.__lock:
+            return frozenset(self.__by_status.get(delivery_status, ()))
+
+    def get_timed(self) -> frozenset:
+        """
+        Space: O(n) Time: O(n)
+
+        :return: A copy of the ids of the time-sensitive packages.
+        """
+        with self.__lock:
+            return frozenset(self.__timed)
+
+    def get_delayed(self) -> frozenset:
+        """
+        Space: O(n) Time: O(n)
+
+        :return: A copy of the ids of the delayed packages.
+        """
+        with self.__lock:
+            return frozenset(self.__delayed)
@@ -0,0 +1,217 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import csv
+from itertools import islice
+import src.timeutil as timeutil
+from src.package import DeliveryStatus, parse_package_req
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# A package row has 11 columns, or 12 with the volume
+_min_columns = 11
+_max_columns = 12
+
+def count_rows(path:str, block_size=1 << 20) -> int:
+    """
+    Counts the rows of the given .csv file without parsing them, so the
+    store can be made big enough before reading it.
+
+    Space: O(1) Time: O(n)
+
+    :param path: The path to the .csv file.
+    :param block_size: The amount of bytes to read at a time.
+    :return: The amount of lines in the file.
+    """
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            count += block.count(b"\n")
+            last = block[-1:]
+    # The last line may not end with a new line
+    return count if last == b"\n" else count + 1
+
+def read_chunks(path:str, chunk_size=4096) -> Iterator[Tuple[int, List[List[str]]]]:
+    """
+    Reads the given .csv file a chunk of rows at a time, so only one
+    chunk is ever in memory.
+
+    Space: O(k) Time: O(n), where k is the chunk size
+
+    :param path: The path to the .csv file.
+    :param chunk_size: The amount of rows in each chunk.
+    :return: A generator of the line number of the first row in each chunk, and the rows in the chunk.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as csv_file:
+        read_csv = csv.reader(csv_file, delimiter=',')
+        line_number = 1
+        while True:
+            rows = list(islice(read_csv, chunk_size))
+            if len(rows) <= 0:
+                break
+            yield line_number, rows
+            line_number += len(rows)
+
+def convert_chunk(rows:List[List[str]]) -> Tuple[Dict[str, list], List[List[int]], List[int], Dict[int, str]]:
+    """
+    Converts a chunk of package rows a whole column at a time, checking
+    the values the same way the Package setters do. A row with any bad
+    value is left out and reported, and the rest are still converted.
+
+    Space: O(k) Time: O(k), where k is the amount of rows
+
+    :param rows: The rows of the chunk, as strings.
+    :return: The converted columns by name, the package requirements and the index in the chunk of the good rows, and the error of each bad row by its index in the chunk. Blank lines are neither.
+    """
+    bad_rows = {}
+    good_rows = []
+    for i, row in enumerate(rows):
+        # Blank lines are skipped
+        if len(row) <= 0:
+            continue
+        if len(row) < _min_columns or len(row) > _max_columns:
+            bad_rows[i] = "The given input data for a package may have too little or too many columns."
+            continue
+        good_rows.append(i)
+    good = rows if len(good_rows) == len(rows) else [rows[i] for i in good_rows]
+
+    # Most columns only have a few different values, so each of those is
+    # only converted once
+    columns = {
+        "package_id": _convert_column([row[0] for row in good], _to_id, good_rows, bad_rows, False),
+        "address_id": _convert_column([row[1] for row in good], _to_address_id, good_rows, bad_rows),
+        "delivery_time": _convert_column([row[2] for row in good], _to_delivery_time, good_rows, bad_rows),
+        "has_truck_req": _convert_column([row[3] for row in good], _to_flag, good_rows, bad_rows),
+        "truck_req": _convert_column([row[4] for row in good], int, good_rows, bad_rows),
+        "is_delayed": _convert_column([row[5] for row in good], _to_flag, good_rows, bad_rows),
+        "delay_time": _convert_column([row[6] for row in good], _to_delay_time, good_rows, bad_rows),
+        "has_package_req": _convert_column([row[7] for row in good], _to_flag, good_rows, bad_rows),
+        "mass": _convert_column([row[9] for row in good], int, good_rows, bad_rows),
+        "delivery_status": _convert_column([row[10] for row in good], _to_delivery_status, good_rows, bad_rows),
+        "volume": _convert_column([row[11] if len(row) > 11 else "0" for row in good], _to_volume, good_rows, bad_rows),
+    }
+    # Every package gets its own list, so they can't be converted only once
+    package_reqs = _convert_column([row[8] for row in good], _to_package_req, good_rows, bad_rows, False)
+
+    # Leave out the rows that had a bad value in any column
+    if len(bad_rows) > 0:
+        keep = [i for i, row in enumerate(good_rows) if row not in bad_rows]
+        if len(keep) < len(good_rows):
+            columns = {name: [values[i] for i in keep] for name, values in columns.items()}
+            package_reqs = [package_reqs[i] for i in keep]
+            good_rows = [good_rows[i] for i in keep]
+    return columns, package_reqs, good_rows, bad_rows
+
+def _convert_column(values:List[str], convert:Callable, rows, bad_rows:Dict[int, str], distinct_only=True) -> list:
+    """
+    Converts every value in a column, first all at once, then one at a
+    time only if any of them is bad, to find out which.
+
+    Space: O(k) Time: O(k)
+
+    :param values: The values in the column, as strings.
+    :param convert: Converts one value, raising a ValueError if it's bad.
+    :param rows: The index in the chunk of the row of each value.
+    :param bad_rows: The error of each bad row by its index in the chunk. The rows found to be bad here are added to it.
+    :param distinct_only: If True, each different value is only converted once, and the rows with the same value share the result.
+    :return: The converted values, with None for the bad ones.
+    """
+    try:
+        if distinct_only:
+            converted = {value: convert(value) for value in set(values)}
+            return [converted[value] for value in values]
+        return list(map(convert, values))
+    except ValueError:
+        pass
+
+    result = []
+    for row, value in zip(rows, values):
+        try:
+            result.append(convert(value))
+        except ValueError as e:
+            bad_rows.setdefault(row, str(e))
+            result.append(None)
+    return result
+
+def _to_id(value:str) -> int:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: An id, as an integer string.
+    :return: The id.
+    """
+    val = int(value)
+    if val < 0:
+        raise ValueError("Id cannot be a negative value!")
+    return val
+
+def _to_address_id(value:str) -> int:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: The id of an address, as an integer string.
+    :return: The id.
+    """
+    val = int(value)
+    if val < 0:
+        raise ValueError("Address Id cannot be a negative value!")
+    return val
+
+def _to_flag(value:str) -> bool:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: 1 for True, or anything else for False, as an integer string.
+    :return: The boolean value.
+    """
+    return int(value) == 1
+
+def _to_delivery_time(value:str) -> int:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: The time as a readable string, or EOD for 11:59:59 PM.
+    :return: The time, in seconds.
+    """
+    return timeutil.to_seconds("11:59:59 PM" if value == "EOD" else value)
+
+def _to_delay_time(value:str) -> int:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: The time as a readable string, or -1 for 11:59:59 PM.
+    :return: The time, in seconds.
+    """
+    return timeutil.to_seconds("11:59:59 PM" if value == "-1" else value)
+
+def _to_delivery_status(value:str) -> int:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: The delivery status, as an integer string.
+    :return: The value of the delivery status.
+    """
+    return DeliveryStatus(int(value)).value
+
+def _to_package_req(value:str) -> List[int]:
+    """
+    Space: O(n) Time: O(n)
+
+    :param value: An array, in string form, of package ids, or -1 if there are none.
+    :return: The package ids in the array.
+    """
+    return [] if value == "-1" else parse_package_req(value)
+
+def _to_volume(value:str) -> float:
+    """
+    Space: O(1) Time: O(1)
+
+    :param value: The volume, in cubic meters, as a number string.
+    :return: The volume.
+    """
+    val = float(value)
+    if val < 0:
+        raise ValueError("Volume cannot be a negative value!")
+    return val
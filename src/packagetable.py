@@ -0,0 +1,497 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+from array import array
+import bisect
+import heapq
+from typing import List
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class PackageTable:
+    """
+    Stores the packages column by column instead of as separate objects,
+    so the same field of many packages can be read at once. Each Package
+    is only a view of a row in this table (see Package.view()).
+
+    If NumPy is installed, the rows are kept in a structured NumPy array
+    and the get_*_mask() methods check many packages in one vectorized
+    operation. Otherwise, every column is an array from the array module.
+    The package requirements are lists of any length, so they're always
+    kept in a plain list, with None for the packages that have none.
+
+    The rows are split between a few locks (lock striping), so packages
+    in different stripes can be changed from different threads at once.
+    Every change to a row is made while holding the lock of the row, and
+    changes that have to happen together, like a delivery status and the
+    time it was delivered at, should be made while holding it as well
+    (see get_lock()). snapshot() holds every lock just long enough to
+    copy the table, so readers get a consistent copy without stopping
+    the simulation.
+    """
+    # The name, NumPy type and array module type code of each column
+    _columns = [
+        ("package_id", "i8", "q"),
+        ("address_id", "i4", "i"),
+        ("delivery_time", "f8", "d"),
+        ("has_truck_req", "?", "b"),
+        ("truck_req", "i4", "i"),
+        ("is_delayed", "?", "b"),
+        ("delay_time", "f8", "d"),
+        ("has_package_req", "?", "b"),
+        ("mass", "i8", "q"),
+        ("volume", "f8", "d"),
+        ("delivery_status", "i1", "b"),
+        ("delivered_at", "f8", "d"),
+    ]
+    # Anything delivered at or after 11:59:59 PM isn't time-sensitive
+    _end_of_day = 86399.0
+    # The amount of locks that the rows are split between
+    _lock_stripes = 16
+
+    def __init__(self, capacity=16):
+        """
+        Space: O(n) Time: O(n)
+
+        :param capacity: The amount of rows to make room for at first. The table grows as needed.
+        """
+        self.__size = 0
+        self.__capacity = max(capacity, 1)
+        self.__package_reqs = []
+        # The package ids in order, and the row of each of them, so the
+        # row of a package is found with a binary search. Both are
+        # replaced together, so they always match.
+        self.__id_index = (self.__new_index_column(), self.__new_index_column())
+        if np is not None:
+            self.__dtype = np.dtype([(name, numpy_type) for name, numpy_type, type_code in self._columns])
+            self.__rows = np.zeros(self.__capacity, dtype=self.__dtype)
+        else:
+            self.__rows = {name: self.__new_column(type_code, self.__capacity) for name, numpy_type, type_code in self._columns}
+        self.__types = {name: type_code for name, numpy_type, type_code in self._columns}
+        self.__locks = [threading.RLock() for i in range(self._lock_stripes)]
+        # Held while the ids in order are replaced, since changing the id
+        # of a package only holds the lock of its row
+        self.__id_lock = threading.Lock()
+
+    def __get_is_columnar(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: True if the columns are NumPy arrays that can be checked with the get_*_mask() methods, False otherwise.
+        """
+        return np is not None
+
+    is_columnar = property(__get_is_columnar)
+
+    def add_row(self) -> int:
+        """
+        Adds an empty row to the end of the table, doubling the room in
+        the table if it's full.
+
+        Space: O(1) amortized Time: O(1) amortized
+
+        :return: The index of the new row.
+        """
+        # Growing moves every row, so nothing else can change them meanwhile
+        with _AllLocks(self.__locks):
+            return self.__add_row()
+
+    def __add_row(self) -> int:
+        """
+        Space: O(1) amortized Time: O(1) amortized
+
+        :return: The index of the new row.
+        """
+        self.__grow(self.__size + 1)
+        self.__package_reqs.append(None)
+        self.__size += 1
+        return self.__size - 1
+
+    def add_rows(self, columns:dict, package_reqs:List[List[int]]) -> int:
+        """
+        Adds many rows to the end of the table at once, a whole column at
+        a time. Any column not given is left as 0.
+
+        Space: O(n) Time: O(n)
+
+        :param columns: The values of each column, by the name of the column. Every column has to have the same amount of values.
+        :param package_reqs: The package requirements of each row, or None for the rows without any.
+        :return: The index of the first new row.
+        """
+        count = len(package_reqs)
+        with _AllLocks(self.__locks):
+            start = self.__size
+            end = start + count
+            self.__grow(end)
+            for name, values in columns.items():
+                if np is not None:
+                    self.__rows[name][start:end] = values
+                else:
+                    self.__rows[name][start:end] = array(self.__types[name], values)
+            self.__package_reqs.extend(package_req if package_req else None for package_req in package_reqs)
+            self.__size = end
+
+            if "package_id" in columns and count > 0:
+                with self.__id_lock:
+                    self.__index_ids(columns["package_id"], start)
+        return start
+
+    def __index_ids(self, package_ids, start:int):
+        """
+        Adds the given package ids to the ids in order, merging them in
+        instead of sorting every id again.
+
+        Space: O(n) Time: O(n + k log k), where k is the amount of ids given
+
+        :param package_ids: The ids of the packages.
+        :param start: The row of the first package. The rest are in the rows right after it.
+        :return: N/A
+        """
+        ids, rows = self.__id_index
+        if np is not None:
+            new_ids = np.asarray(package_ids, dtype=np.int64)
+            order = np.argsort(new_ids, kind="stable")
+            new_ids = new_ids[order]
+            new_rows = order + start
+            positions = np.searchsorted(ids, new_ids, side="right")
+            self.__id_index = (np.insert(ids, positions, new_ids), np.insert(rows, positions, new_rows))
+            return
+        pairs = sorted(zip(package_ids, range(start, start + len(package_ids))))
+        if len(ids) > 0 and pairs[0][0] < ids[-1]:
+            pairs = list(heapq.merge(zip(ids, rows), pairs))
+            ids = self.__new_index_column()
+            rows = self.__new_index_column()
+        else:
+            ids = array("q", ids)
+            rows = array("q", rows)
+        ids.extend(package_id for package_id, row in pairs)
+        rows.extend(row for package_id, row in pairs)
+        self.__id_index = (ids, rows)
+
+    def __reindex_id(self, old_id:int, new_id:int, row:int):
+        """
+        Moves the given row from its old package id to its new one in
+        the ids in order.
+
+        Space: O(n) Time: O(n)
+
+        :param old_id: The old id of the package.
+        :param new_id: The new id of the package.
+        :param row: The row of the package.
+        :return: N/A
+        """
+        ids, rows = self.__id_index
+        if np is not None:
+            keep = (ids != old_id) | (rows != row)
+            ids = ids[keep]
+            rows = rows[keep]
+            position = np.searchsorted(ids, new_id, side="right")
+            self.__id_index = (np.insert(ids, position, new_id), np.insert(rows, position, row))
+            return
+        pairs = [(package_id, other_row) for package_id, other_row in zip(ids, rows) if package_id != old_id or other_row != row]
+        bisect.insort(pairs, (new_id, row))
+        self.__id_index = (array("q", (package_id for package_id, other_row in pairs)), array("q", (other_row for package_id, other_row in pairs)))
+
+    def reserve(self, capacity:int):
+        """
+        Makes room for the given amount of rows at once, so the table
+        doesn't have to grow many times while rows are added.
+
+        Space: O(n) Time: O(n)
+
+        :param capacity: The amount of rows to make room for.
+        :return: N/A
+        """
+        with _AllLocks(self.__locks):
+            self.__grow(capacity, False)
+
+    def __grow(self, size:int, double=True):
+        """
+        Makes room for at least the given amount of rows, if there isn't
+        room for them yet.
+
+        Space: O(n) Time: O(n)
+
+        :param size: The amount of rows to make room for.
+        :param double: If True, the room is doubled until it's enough. Otherwise, there's room for exactly the given amount of rows.
+        :return: N/A
+        """
+        if size <= self.__capacity:
+            return
+        capacity = self.__capacity
+        if double:
+            while capacity < size:
+                capacity *= 2
+        else:
+            capacity = size
+
+        if np is not None:
+            rows = np.zeros(capacity, dtype=self.__dtype)
+            rows[:self.__size] = self.__rows[:self.__size]
+            self.__rows = rows
+        else:
+            for name, column in self.__rows.items():
+                column.extend(self.__new_column(self.__types[name], capacity - len(column)))
+        self.__capacity = capacity
+
+    def get(self, column:str, row:int):
+        """
+        Space: O(1) Time: O(1)
+
+        :param column: The name of the column.
+        :param row: The index of the row.
+        :return: The value in the given column and row, as a plain Python value.
+        """
+        if np is not None:
+            return self.__rows[column][row].item()
+        value = self.__rows[column][row]
+        return bool(value) if self.__types[column] == "b" and column != "delivery_status" else value
+
+    def set(self, column:str, row:int, value):
+        """
+        Space: O(1) Time: O(1), or O(n) if the package id is changed
+
+        :param column: The name of the column.
+        :param row: The index of the row.
+        :param value: The value to set.
+        :return: N/A
+        """
+        # Growing replaces every column while holding every lock, so
+        # holding this one makes sure the value isn't set in an old column
+        with self.get_lock(row):
+            if column == "package_id":
+                with self.__id_lock:
+                    self.__reindex_id(self.get(column, row), value, row)
+            self.__rows[column][row] = value
+
+    def get_package_req(self, row:int) -> List[int]:
+        """
+        Space: O(1) Time: O(1)
+
+        :param row: The index of the row.
+        :return: The ids of the packages that the package in the given row has to be delivered with.
+        """
+        package_req = self.__package_reqs[row]
+        return [] if package_req is None else package_req
+
+    def set_package_req(self, row:int, value:List[int]):
+        """
+        Space: O(1) Time: O(1)
+
+        :param row: The index of the row.
+        :param value: The ids of the packages that the package in the given row has to be delivered with.
+        :return: N/A
+        """
+        self.__package_reqs[row] = value if value else None
+
+    def get_lock(self, row:int):
+        """
+        Space: O(1) Time: O(1)
+
+        :param row: The index of the row.
+        :return: The lock of the given row, shared with the other rows in its stripe.
+        """
+        return self.__locks[row % self._lock_stripes]
+
+    def snapshot(self):
+        """
+        Copies this table while holding every lock, so no row is copied
+        halfway through a change. Changes made to the copy don't change
+        this table.
+
+        Space: O(n) Time: O(n)
+
+        :return: A copy of this table, as it is right now.
+        """
+        with _AllLocks(self.__locks):
+            snapshot = PackageTable.__new__(PackageTable)
+            snapshot.__size = self.__size
+            snapshot.__capacity = self.__capacity
+            snapshot.__package_reqs = [None if package_req is None else list(package_req) for package_req in self.__package_reqs]
+            snapshot.__id_index = tuple(values.copy() if np is not None else array("q", values) for values in self.__id_index)
+            if np is not None:
+                snapshot.__dtype = self.__dtype
+                snapshot.__rows = self.__rows.copy()
+            else:
+                snapshot.__rows = {name: array(column.typecode, column) for name, column in self.__rows.items()}
+            snapshot.__types = self.__types
+            snapshot.__locks = [threading.RLock() for i in range(self._lock_stripes)]
+            snapshot.__id_lock = threading.Lock()
+        return snapshot
+
+    def get_row(self, package_id:int) -> int:
+        """
+        Space: O(1) Time: O(log n)
+
+        :param package_id: The id of the package.
+        :return: The index of the row of the package, or -1 if there's no such package.
+        """
+        ids, rows = self.__id_index
+        if np is not None:
+            i = int(np.searchsorted(ids, package_id))
+        else:
+            i = bisect.bisect_left(ids, package_id)
+        if i < len(ids) and ids[i] == package_id:
+            return int(rows[i])
+        return -1
+
+    def get_rows(self, package_ids):
+        """
+        Space: O(n) Time: O(n log m), where m is the amount of rows in this table
+
+        :param package_ids: The ids of the packages.
+        :return: The index of the row of each package, or -1 for any id that has no package, as a NumPy array if NumPy is installed, or as a list otherwise.
+        """
+        if np is None:
+            return [self.get_row(package_id) for package_id in package_ids]
+        ids, rows = self.__id_index
+        package_ids = np.asarray(package_ids, dtype=np.int64)
+        if len(ids) <= 0:
+            return np.full(len(package_ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(ids, package_ids), len(ids) - 1)
+        return np.where(ids[found] == package_ids, rows[found], -1)
+
+    def __get_known_rows(self, package_ids):
+        """
+        Space: O(n) Time: O(n log m), where m is the amount of rows in this table
+
+        :param package_ids: The ids of the packages.
+        :return: The index of the row of each package.
+        """
+        rows = self.get_rows(package_ids)
+        if np is not None:
+            missing = np.flatnonzero(rows < 0)
+        else:
+            missing = [i for i, row in enumerate(rows) if row < 0]
+        if len(missing) > 0:
+            raise KeyError("There's no package with the id %s." % list(package_ids)[missing[0]])
+        return rows
+
+    def get_column(self, column:str, package_ids):
+        """
+        Gets a column of the given packages in one vectorized operation.
+        Only works if is_columnar is True.
+
+        Space: O(n) Time: O(n)
+
+        :param column: The name of the column.
+        :param package_ids: The ids of the packages, which all have to be in this table.
+        :return: A NumPy array of the values in the column, in the same order as the given ids.
+        """
+        return self.__rows[column][self.__get_known_rows(package_ids)]
+
+    def get_column_bytes(self, column:str) -> bytes:
+        """
+        Space: O(n) Time: O(n)
+
+        :param column: The name of the column.
+        :return: The values of the column in every row, as the raw bytes of an array of the column's array module type.
+        """
+        with _AllLocks(self.__locks):
+            if np is not None:
+                return np.ascontiguousarray(self.__rows[column][:self.__size]).tobytes()
+            return self.__rows[column][:self.__size].tobytes()
+
+    def get_timed_mask(self, package_ids):
+        """
+        Space: O(n) Time: O(n)
+
+        :param package_ids: The ids of the packages.
+        :return: A NumPy array that is True for each of the given packages that is time-sensitive.
+        """
+        return self.get_column("delivery_time", package_ids) < self._end_of_day
+
+    def get_delayed_mask(self, package_ids):
+        """
+        Space: O(n) Time: O(n)
+
+        :param package_ids: The ids of the packages.
+        :return: A NumPy array that is True for each of the given packages that is delayed.
+        """
+        return self.get_column("is_delayed", package_ids)
+
+    def get_truck_req_mask(self, package_ids, truck_req:int):
+        """
+        Space: O(n) Time: O(n)
+
+        :param package_ids: The ids of the packages.
+        :param truck_req: The id of the truck.
+        :return: A NumPy array that is True for each of the given packages that has to be in the given truck.
+        """
+        return self.get_column("truck_req", package_ids) == truck_req
+
+    def sum(self, column:str, package_ids):
+        """
+        Space: O(n) Time: O(n)
+
+        :param column: The name of the column.
+        :param package_ids: The ids of the packages.
+        :return: The sum of the column over the given packages.
+        """
+        if np is not None:
+            return self.get_column(column, package_ids).sum().item()
+        values = self.__rows[column]
+        return sum(values[row] for row in self.__get_known_rows(package_ids))
+
+    def __new_column(self, type_code:str, size:int, value=0):
+        """
+        Space: O(n) Time: O(n)
+
+        :param type_code: The array module type code of the column.
+        :param size: The amount of values in the column.
+        :param value: The value to fill the column with.
+        :return: A new column from the array module.
+        """
+        return array(type_code, [value]) * size
+
+    def __new_index_column(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: A new empty column of the ids in order or their rows, as a NumPy array if NumPy is installed, or an array from the array module otherwise.
+        """
+        if np is not None:
+            return np.zeros(0, dtype=np.int64)
+        return self.__new_column("q", 0)
+
+    def __len__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of rows in this table.
+        """
+        return self.__size
+
+class _AllLocks:
+    """
+    Holds every one of the given locks, always taken in the same order so
+    two threads holding them at once can't wait on each other forever.
+    """
+    def __init__(self, locks):
+        """
+        Space: O(1) Time: O(1)
+
+        :param locks: The locks to hold.
+        """
+        self.__locks = locks
+
+    def __enter__(self):
+        """
+        Space: O(1) Time: O(n)
+
+        :return: N/A
+        """
+        for lock in self.__locks:
+            lock.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Space: O(1) Time: O(n)
+
+        :return: N/A
+        """
+        for lock in reversed(self.__locks):
+            lock.release()
@@ -3,9 +3,15 @@
 from src.package import Package
 from src.locationcluster import LocationCluster
 from src.data import Data
+from src.load import Load
 from typing import Callable
 from typing import List
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def get_packages_and(packages:List[int], is_timed, is_delayed):
     """
     Gets the packages based on the boolean criteria is_timed AND is_delayed.
@@ -17,6 +23,9 @@ def get_packages_and(packages:List[int], is_timed, is_delayed):
 
     Note: This also removes the filtered packages from the given packages list.
 
+    If the package table is columnar (NumPy is installed), the packages are
+    checked all at once with vectorized masks.
+
     Space: O(n) Time: O(n)
 
     :param packages: The list of packages to filter.
@@ -24,7 +33,13 @@ def get_packages_and(packages:List[int], is_timed, is_delayed):
     :param is_delayed: The boolean criteria determining whether the package is delayed.
     :return: The list of packages matching the given criteria.
     """
-    return get_packages_with_predicate(packages, lambda package: (is_timed == package.is_timed) and (is_delayed == package.is_delayed))
+    table = Data().get_package_table()
+    if table.is_columnar and len(packages) > 0:
+        return _split_mask(packages, (table.get_timed_mask(packages) == is_timed) & (table.get_delayed_mask(packages) == is_delayed))
+    index = Data().get_package_index()
+    timed = index.get_timed()
+    delayed = index.get_delayed()
+    return _split(packages, lambda package_id: (is_timed == (package_id in timed)) and (is_delayed == (package_id in delayed)))
 
 def get_packages_or(packages:List[int], is_timed, is_delayed):
     """
@@ -37,6 +52,9 @@ def get_packages_or(packages:List[int], is_timed, is_delayed):
 
     Note: This also removes the filtered packages from the given packages list.
 
+    If the package table is columnar (NumPy is installed), the packages are
+    checked all at once with vectorized masks.
+
     Space: O(n) Time: O(n)
 
     :param packages: The list of packages to filter.
@@ -44,7 +62,13 @@ def get_packages_or(packages:List[int], is_timed, is_delayed):
     :param is_delayed: The boolean criteria determining whether the package is delayed.
     :return: The list of packages matching the given criteria.
     """
-    return get_packages_with_predicate(packages, lambda package: (is_timed == package.is_timed) or (is_delayed == package.is_delayed))
+    table = Data().get_package_table()
+    if table.is_columnar and len(packages) > 0:
+        return _split_mask(packages, (table.get_timed_mask(packages) == is_timed) | (table.get_delayed_mask(packages) == is_delayed))
+    index = Data().get_package_index()
+    timed = index.get_timed()
+    delayed = index.get_delayed()
+    return _split(packages, lambda package_id: (is_timed == (package_id in timed)) or (is_delayed == (package_id in delayed)))
 
 def get_timed_packages_only(packages:List[int], is_not=False):
     """
@@ -52,13 +76,22 @@ def get_timed_packages_only(packages:List[int], is_not=False):
 
     Note: This also removes the filtered packages from the given packages list.
 
-    Space: O(n) Time: O(n)
+    If the package table is columnar (NumPy is installed), the packages are
+    checked all at once with a vectorized mask.
+
+    Space: O(n) Time: O(1) if there are no such packages, O(n) otherwise
 
     :param packages: The list of packages to filter.
     :param is_not: The boolean criteria determining whether to get all the packages that are NOT time-sensitive instead.
     :return: The list of packages matching the given criteria.
     """
-    return get_packages_with_predicate(packages, lambda package: is_not != package.is_timed)
+    table = Data().get_package_table()
+    if table.is_columnar and len(packages) > 0:
+        return _split_mask(packages, table.get_timed_mask(packages) != is_not)
+    timed = Data().get_package_index().get_timed()
+    if not is_not:
+        return get_packages_in(packages, timed)
+    return _split(packages, lambda package_id: package_id not in timed)
 
 def get_delayed_packages_only(packages:List[int], is_not=False):
     """
@@ -66,13 +99,98 @@ def get_delayed_packages_only(packages:List[int], is_not=False):
 
     Note: This also removes the filtered packages from the given packages list.
 
-    Space: O(n) Time: O(n)
+    If the package table is columnar (NumPy is installed), the packages are
+    checked all at once with a vectorized mask.
+
+    Space: O(n) Time: O(1) if there are no such packages, O(n) otherwise
 
     :param packages: The list of packages to filter.
     :param is_not: The boolean criteria determining whether to get all the packages that are NOT delayed instead.
     :return: The list of packages matching the given criteria.
     """
-    return get_packages_with_predicate(packages, lambda package: is_not != package.is_delayed)
+    table = Data().get_package_table()
+    if table.is_columnar and len(packages) > 0:
+        return _split_mask(packages, table.get_delayed_mask(packages) != is_not)
+    delayed = Data().get_package_index().get_delayed()
+    if not is_not:
+        return get_packages_in(packages, delayed)
+    return _split(packages, lambda package_id: package_id not in delayed)
+
+def get_packages_with_truck_req(packages:List[int], truck_req:int):
+    """
+    Gets only the packages that have to be in the given truck.
+
+    Note: This also removes the filtered packages from the given packages list.
+
+    If the package table is columnar (NumPy is installed), the packages are
+    checked all at once with a vectorized mask.
+
+    Space: O(n) Time: O(1) if no packages have to be in the truck, O(n) otherwise
+
+    :param packages: The list of packages to filter.
+    :param truck_req: The id of the truck.
+    :return: The list of packages matching the given criteria.
+    """
+    matching = Data().get_package_index().get_by_truck_req(truck_req)
+    table = Data().get_package_table()
+    if table.is_columnar and len(matching) > 0 and len(packages) > 0:
+        return _split_mask(packages, table.get_truck_req_mask(packages, truck_req))
+    return get_packages_in(packages, matching)
+
+def get_packages_in(packages:List[int], package_ids):
+    """
+    Gets only the packages whose ids are in the given set of ids, like
+    the ones from the package index (see Data().get_package_index()).
+
+    Note: This also removes the filtered packages from the given packages list.
+
+    Space: O(n) Time: O(1) if the given set is empty, O(n) otherwise
+
+    :param packages: The list of packages to filter.
+    :param package_ids: The set of package ids to get.
+    :return: The list of packages in the given set, in the same order as in the packages list.
+    """
+    if len(package_ids) <= 0:
+        return []
+    return _split(packages, lambda package_id: package_id in package_ids)
+
+def _split_mask(packages:List[int], mask):
+    """
+    Removes the package ids where the given mask is True from the given
+    list and returns them, in one vectorized operation.
+
+    Space: O(n) Time: O(n)
+
+    :param packages: The list of packages to filter.
+    :param mask: A NumPy array of booleans, one for each package in the list.
+    :return: The list of packages where the mask is True.
+    """
+    package_ids = np.asarray(packages)
+    result = package_ids[mask].tolist()
+    packages[:] = package_ids[~mask].tolist()
+    return result
+
+def _split(packages:List[int], is_match: Callable[[int], bool]):
+    """
+    Removes the package ids matching the given check from the given
+    list and returns them. Unlike get_packages_with_predicate(), the
+    check is given only the id, so the packages aren't looked up.
+
+    Space: O(n) Time: O(n)
+
+    :param packages: The list of packages to filter.
+    :param is_match: The check for each package id.
+    :return: The list of packages matching the check.
+    """
+    result = []
+    non_result = []
+    for package_id in packages:
+        if is_match(package_id):
+            result.append(package_id)
+        else:
+            non_result.append(package_id)
+    packages[:] = non_result
+    return result
 
 def get_packages_with_predicate(packages:List[int], predicate: Callable[[Package], bool]):
     """
@@ -103,22 +221,40 @@ def get_packages_with_predicate(packages:List[int], predicate: Callable[[Package
 def get_package_ids_with_same_package_req(packages:List[int]):
     """
     Gets only the package ids of the packages that need to be together
-    based on their package requirements.
+    based on their package requirements, for every group of them.
 
-    Space: O(n) Time: O(n^2)
+    Space: O(n) Time: O(n)
 
     :param packages: The list of packages to filter.
     :return: The package ids of the packages that need to be together based on their package requirements.
     """
     result = []
+    for group in get_package_groups(packages):
+        result.extend(group)
+    return result
+
+def get_package_groups(packages:List[int]) -> List[List[int]]:
+    """
+    Gets the separate groups of packages that need to be together based
+    on their package requirements, looked up in the package groups built
+    when the packages were loaded (see Data().get_package_groups()).
+
+    Space: O(n) Time: O(n * a(n))
+
+    :param packages: The list of packages to look for groups in.
+    :return: The groups of package ids, each with at least one package in the given list, in the order they first show up in it.
+    """
+    package_groups = Data().get_package_groups()
+    result = []
+    seen = set()
     for package_id in packages:
-        package = Data().get_package(package_id)
-        if not package.has_package_req:
+        if package_id not in package_groups:
             continue
-        for req in package.package_req:
-            if req not in result:
-                result.append(req)
-        result.append(package.package_id)
+        root = package_groups.find(package_id)
+        if root in seen:
+            continue
+        seen.add(root)
+        result.append(list(package_groups.get_group(package_id)))
     return result
 
 def to_location_clusters(packages:List[int]) -> List[LocationCluster]:
@@ -177,7 +313,11 @@ def fill_up(first_arr:List[int], second_arr:List[int], amount:int, significant_o
     of ids that will fill up the first array. The second array is still
     modified to not include the ids removed from it.
 
-    Space: O(n) Time: O(n^2)
+    Packages that have to be delivered together are taken together, with
+    the rest of their group in the second array, or not at all if the
+    whole group doesn't fit in the amount left.
+
+    Space: O(n) Time: O(n + k log k), where k is the amount of packages going to the same addresses
 
     :param first_arr: The array of package ids to fill up to.
     :param second_arr: The array of package ids to fill up from.
@@ -185,42 +325,79 @@ def fill_up(first_arr:List[int], second_arr:List[int], amount:int, significant_o
     :param significant_only: If True, will return only the package ids going to the same location as any of those in the first array.
     :return: The array of ids to fill up the first array with.
     """
+    # The packages going to each address are looked up in the package
+    # index, so only the packages at the same addresses are checked.
+    index = Data().get_package_index()
+    package_groups = Data().get_package_groups()
+    positions = {package_id: i for i, package_id in enumerate(second_arr)}
+    taken = set()
+
+    def get_unit(package_id):
+        if package_id not in package_groups:
+            return [package_id]
+        group = sorted(positions[other_id] for other_id in package_groups.get_group(package_id) if other_id in positions and other_id not in taken)
+        return [second_arr[i] for i in group]
+
+    def take_same_address(package_id, amount):
+        address_id = Data().get_package(package_id).address_id
+        same_address = sorted(positions[other_id] for other_id in index.get_by_address(address_id) if other_id in positions and other_id not in taken)
+        added = []
+        for i in same_address:
+            if amount <= 0:
+                break
+            if second_arr[i] in taken:
+                continue
+            unit = get_unit(second_arr[i])
+            if len(unit) > amount:
+                continue
+            taken.update(unit)
+            added.extend(unit)
+            amount -= len(unit)
+        return added
+
     result = []
     for package1_id in first_arr:
-        package1 = Data().get_package(package1_id)
         if amount <= 0:
             break
-        non_result = []
-        for package2_id in second_arr:
-            package2 = Data().get_package(package2_id)
-            if amount > 0 and package1.address_id == package2.address_id:
-                result.append(package2.package_id)
-                amount -= 1
-            else:
-                non_result.append(package2.package_id)
-        second_arr[:] = non_result
+        added = take_same_address(package1_id, amount)
+        result.extend(added)
+        amount -= len(added)
     if amount > 0 and not significant_only:
-        if len(second_arr) <= 0:
-            return result
-        result2 = [second_arr[0]]
-        for package1_id in result2:
-            package1 = Data().get_package(package1_id)
+        # Take the rest of the packages in order, along with the other
+        # packages going to the same address as each of them.
+        for package_id in second_arr:
             if amount <= 0:
                 break
-            non_result = []
-            for package2_id in second_arr:
-                package2 = Data().get_package(package2_id)
-                if amount > 0 and package1.address_id == package2.address_id:
-                    result.append(package2.package_id)
-                    amount -= 1
-                else:
-                    non_result.append(package2.package_id)
-            second_arr[:] = non_result
-            if len(second_arr) <= 0:
-                break
-            result2.append(second_arr[0])
+            if package_id in taken:
+                continue
+            added = take_same_address(package_id, amount)
+            result.extend(added)
+            amount -= len(added)
+    second_arr[:] = [package_id for package_id in second_arr if package_id not in taken]
     return result
 
+def fill_with_package_groups(first_arr:List[int], second_arr:List[int]):
+    """
+    Fills up the given first array package ids with the package ids from
+    the second array that have to be delivered together with any package
+    in the first array, based on the package requirements. Only the
+    groups that the first array already has a package of are pulled in.
+
+    However, instead of filling up the first array, it returns the array
+    of ids that will fill up the first array. The second array is still
+    modified to not include the ids removed from it.
+
+    Space: O(n) Time: O(n * a(n))
+
+    :param first_arr: The array of package ids to fill up to.
+    :param second_arr: The array of package ids to fill up from.
+    :return: The array of ids to fill up the first array with.
+    """
+    needed = set()
+    for group in get_package_groups(first_arr):
+        needed.update(group)
+    return get_packages_in(second_arr, needed)
+
 def fill_with_same_package_req(first_arr:List[int], second_arr:List[int], packages_with_same_package_req:List[int]):
     """
     Fills up the given first array package ids with package ids from
@@ -241,22 +418,56 @@ def fill_with_same_package_req(first_arr:List[int], second_arr:List[int], packag
     :return: The array of ids to fill up the first array with.
     """
     # Check how many packages in the same package req are already here
+    same_package_req = set(packages_with_same_package_req)
     same_package_req_count = 0
     for package1_id in first_arr:
-        package1 = Data().get_package(package1_id)
-        if package1.package_id in packages_with_same_package_req:
+        if package1_id in same_package_req:
             same_package_req_count += 1
     same_package_req_needed = len(packages_with_same_package_req) - same_package_req_count
     if same_package_req_needed <= 0:
         return [] # Nothing more needs to be done if they're all in the truck already
 
-    result = []
-    non_result = []
-    for package2_id in second_arr:
-        package2 = Data().get_package(package2_id)
-        if same_package_req_needed > 0 and package2.package_id in packages_with_same_package_req:
-            result.append(package2.package_id)
+    return _split(second_arr, lambda package_id: package_id in same_package_req)
+
+def fit_to_capacity(packages:List[int], capacity:Load, leftovers:List[int]) -> List[int]:
+    """
+    Keeps only as many of the given packages as fit in the given
+    capacity, by their amount, mass and volume. This is a greedy
+    knapsack: the packages are taken from the earliest deadline to the
+    latest (and in the given order for the same deadline), skipping any
+    that don't fit anymore. Packages that have to be delivered together
+    are taken or skipped together.
+
+    Space: O(n) Time: O(n log n)
+
+    :param packages: The package ids to fit.
+    :param capacity: The capacity to fit the packages in.
+    :param leftovers: The list to put the package ids that don't fit into.
+    :return: The package ids that fit, in the given order.
+    """
+    package_groups = Data().get_package_groups()
+    given = set(packages)
+    units = []
+    seen = set()
+    for i, package_id in enumerate(packages):
+        if package_id in package_groups:
+            root = package_groups.find(package_id)
+            if root in seen:
+                continue
+            seen.add(root)
+            unit = [other_id for other_id in package_groups.get_group(package_id) if other_id in given]
         else:
-            non_result.append(package2.package_id)
-    second_arr[:] = non_result
-    return result
+            unit = [package_id]
+        deadline = min(Data().get_package(other_id).delivery_time for other_id in unit)
+        units.append((deadline, i, unit))
+    units.sort(key=lambda unit: unit[:2])
+
+    load = Load()
+    kept = set()
+    for deadline, i, unit in units:
+        unit_load = Load.of(unit)
+        if (load + unit_load).fits_in(capacity):
+            load += unit_load
+            kept.update(unit)
+    leftovers.extend(package_id for package_id in packages if package_id not in kept)
+    return [package_id for package_id in packages if package_id in kept]
@@ -1,60 +1,498 @@
 # Mark Christian Malabanan, Student ID #001233960
 
+import hashlib
+import heapq
 import math
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from itertools import chain
+from itertools import count
+from multiprocessing import shared_memory
 from src.borg import Borg
 from src.constantarray import ConstantArray
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Note: We cannot use the A* algorithm because all the nodes are connected
 # to each other. Since A* always chooses the good enough path to the end
 # point, it will always choose the direct path from the start to end, even
 # if there are other better paths. We have to use the Dijkstra's algorithm
 # to find the absolute best path between two points.
+#
+# With a distance matrix, the best paths between every two locations are
+# calculated up front. Real road networks are sparse, though, and only the
+# paths from the hub and the delivery stops are ever needed, so with a
+# RoadGraph the paths from a node are only calculated the first time
+# they're asked for, and kept in a cache with a memory limit.
 class Pathfinder(Borg):
-    def __init__(self, distance_matrix=None):
+    _cache_magic = b"PFC1"
+    _cache_header = struct.Struct("<4sI")
+    _versions = count(1)
+
+    def __init__(self, distance_matrix=None, cache_path=None, graph=None, max_cache_bytes=64 << 20):
         """
-        Space: O(n^2) Time: O(n^2)
+        Space: O(n^2) Time: O(n^3), or O(n^2) if the paths are loaded from the cache, or O(1) for a road graph
 
         :param distance_matrix: The distance matrix of the locations.
+        :param cache_path: Optional - The directory to cache the calculated paths in. The cache is reused as long as the distance matrix does not change.
+        :param graph: Optional - A sparse RoadGraph to use instead of a distance matrix. The paths from each node are only calculated the first time they're needed.
+        :param max_cache_bytes: The most memory that the paths calculated from the nodes of a road graph can take up, in bytes. The least recently used ones are forgotten first.
         """
         Borg.__init__(self)
+        if graph is not None:
+            self.graph = graph
+            self.distance_matrix = None
+            self.node_amount = graph.node_amount
+            self.distances = None
+            self.predecessors = None
+            self.version = next(self._versions)
+            self._cache_map = None
+            self._sources = _SourceCache(max_cache_bytes)
+            return
         if distance_matrix is not None:
+            self.graph = None
             self.distance_matrix = distance_matrix
             self.node_amount = len(distance_matrix)
-            self.calculated_paths_matrix = [[PathNode(j, 0, []) for j in range(len(distance_matrix[0]))] for i in range(len(distance_matrix))]
+            # The best paths are stored as flat n*n arrays, where the
+            # path from i to j is at index i * n + j. Only the node right
+            # before j is kept for each path, and the rest of the path
+            # is rebuilt from it when needed.
+            self.distances = None
+            self.predecessors = None
+            # Changes every time the distances change, so anything that
+            # depends on the distances knows when to update.
+            self.version = next(self._versions)
+            self._cache_map = None
+            if cache_path is not None and self._load_cache(cache_path):
+                return
             self._calculate_paths()
+            if cache_path is not None:
+                self._save_cache(cache_path)
 
     def get_path(self, from_node, to_node):
-        return self.calculated_paths_matrix[from_node][to_node]
+        """
+        Space: O(1) Time: O(1)
 
-    def _calculate_paths(self):
+        :param from_node: The node of the graph the path starts from.
+        :param to_node: The node of the graph the path ends at.
+        :return: The best path between the two nodes, as a PathNode.
+        """
+        distance = self.get_distance(from_node, to_node)
+        if distance == math.inf:
+            raise ValueError("There's no path from node %s to node %s." % (from_node, to_node))
+        return PathNode(to_node, distance, start_index=from_node)
+
+    def get_distance(self, from_node, to_node) -> float:
+        """
+        Space: O(1) Time: O(1)
+
+        :param from_node: The node of the graph the path starts from.
+        :param to_node: The node of the graph the path ends at.
+        :return: The overall distance of the best path between the two nodes.
+        """
+        if self.graph is not None:
+            return self._get_source(from_node)[0][to_node]
+        return float(self.distances[from_node * self.node_amount + to_node])
+
+    def get_time(self, from_node, to_node) -> float:
+        """
+        Space: O(1) Time: O(1)
+
+        :param from_node: The node of the graph the path starts from.
+        :param to_node: The node of the graph the path ends at.
+        :return: The time, in seconds, spent taking the best path between the two nodes.
+        """
+        return self.get_distance(from_node, to_node) / 18 * 60 * 60
+
+    def share_distances(self) -> shared_memory.SharedMemory:
+        """
+        Copies the distances of the best paths into a new block of shared
+        memory, so other processes can read them with attach_distances()
+        instead of calculating the paths again. The caller has to close
+        and unlink the block when it's done with it.
+
+        This can't be used with a road graph, since it would calculate
+        the paths from every node up front, which is what the road graph
+        is there to avoid.
+
+        Space: O(n^2) Time: O(n^2)
+
+        :return: The shared memory block with the distances in it.
+        """
+        if self.graph is not None:
+            raise ValueError("The distances of a road graph can't be shared, since they're only calculated when needed.")
+        size = self.node_amount * self.node_amount
+        block = shared_memory.SharedMemory(create=True, size=size * 8)
+        if np is not None:
+            np.ndarray(size, dtype=np.float64, buffer=block.buf)[:] = self.distances
+        else:
+            block.buf.cast("d")[:] = array("d", self.distances)
+        return block
+
+    def attach_distances(self, name, node_amount, version=0):
+        """
+        Sets this singleton up to read the distances of the best paths
+        from a block of shared memory made by share_distances() in another
+        process. Only get_distance() and get_time() can be used afterwards,
+        since the paths themselves are not shared.
+
+        Space: O(1) Time: O(1)
+
+        :param name: The name of the shared memory block.
+        :param node_amount: The amount of nodes in the graph.
+        :param version: The version of the distances in the other process.
+        :return: N/A
+        """
+        block = shared_memory.SharedMemory(name=name)
+        self.graph = None
+        self.distance_matrix = None
+        self.node_amount = node_amount
+        self.predecessors = None
+        self.version = version
+        self._cache_map = None
+        self._shared_block = block
+        if np is not None:
+            self.distances = np.ndarray(node_amount * node_amount, dtype=np.float64, buffer=block.buf)
+        else:
+            self.distances = block.buf.cast("d")
+
+    def get_hops(self, from_node, to_node):
+        """
+        Rebuilds the locations passed through when going from the start
+        node to the end node, not including the start and end nodes.
+
+        Space: O(n) Time: O(n)
+
+        :param from_node: The node of the graph the path starts from.
+        :param to_node: The node of the graph the path ends at.
+        :return: An array of location ids showing the best path.
+        """
+        if self.get_distance(from_node, to_node) == math.inf:
+            raise ValueError("There's no path from node %s to node %s." % (from_node, to_node))
+        if self.graph is not None:
+            predecessors = self._get_source(from_node)[1]
+            offset = 0
+        else:
+            predecessors = self.predecessors
+            offset = from_node * self.node_amount
+        path = []
+        node = int(predecessors[offset + to_node])
+        while node != from_node:
+            path.append(node)
+            node = int(predecessors[offset + node])
+        path.reverse()
+        return path
+
+    def _get_source(self, start_node):
+        """
+        Gets the best paths from the given node of the road graph,
+        calculating them the first time they're needed.
+
+        Space: O(n) Time: O(1) if cached, O((n + m) log n) otherwise, where m is the amount of roads
+
+        :param start_node: The node of the graph to start from.
+        :return: The distance of the best path to each node, and the node right before each node in its path.
+        """
+        paths = self._sources.get(start_node, self.version)
+        if paths is None:
+            paths = self._sparse_dijkstra(start_node)
+            self._sources.put(start_node, self.version, paths)
+        return paths
+
+    def _sparse_dijkstra(self, start_node):
+        """
+        Use the Dijkstra's algorithm to find the best paths from the given
+        node of the road graph, always visiting the closest node next with
+        a binary heap. A node can be in the heap more than once, and the
+        ones further than its best distance are skipped when taken out.
+
+        Space: O(n + m) Time: O((n + m) log n), where m is the amount of roads
+
+        :param start_node: The node of the graph to start from.
+        :return: The distance of the best path to each node (infinite if it can't be reached), and the node right before each node in its path (-1 if it can't be reached).
+        """
+        graph = self.graph
+        offsets = graph.offsets
+        targets = graph.targets
+        weights = graph.weights
+        distances = array("d", [math.inf]) * self.node_amount
+        predecessors = array("i", [-1]) * self.node_amount
+        distances[start_node] = 0
+        predecessors[start_node] = start_node
+        heap = [(0.0, start_node)]
+        while len(heap) > 0:
+            distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            for slot in range(offsets[node], offsets[node + 1]):
+                to_node = targets[slot]
+                new_distance = distance + weights[slot]
+                if new_distance < distances[to_node]:
+                    distances[to_node] = new_distance
+                    predecessors[to_node] = node
+                    heapq.heappush(heap, (new_distance, to_node))
+        return distances, predecessors
+
+    def _get_cache_file(self, cache_path):
+        """
+        Gets the cache file of the current distance matrix. The file name
+        is a hash of the contents of the matrix, so a changed matrix never
+        reads the paths of an older one.
+
+        Space: O(n^2) Time: O(n^2)
+
+        :param cache_path: The directory that the cache files are in.
+        :return: The path to the cache file.
+        """
+        weights = array("d", chain.from_iterable(self.distance_matrix))
+        digest = hashlib.sha256(weights.tobytes()).hexdigest()
+        return os.path.join(cache_path, "paths-%s-%s.bin" % (self.node_amount, digest[:32]))
+
+    def _load_cache(self, cache_path):
+        """
+        Memory-maps the calculated paths from the cache file. The file is
+        mapped copy-on-write, so processes reading the same file share its
+        pages, and any changes to the paths stay in this process.
+
+        Space: O(1) Time: O(n^2) for hashing the distance matrix
+
+        :param cache_path: The directory that the cache files are in.
+        :return: True if the paths were loaded from the cache, False otherwise.
+        """
+        size = self.node_amount * self.node_amount
+        try:
+            with open(self._get_cache_file(cache_path), "rb") as cache_file:
+                cache_map = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            return False
+
+        header_size = self._cache_header.size
+        if len(cache_map) != header_size + size * 12:
+            cache_map.close()
+            return False
+        magic, node_amount = self._cache_header.unpack_from(cache_map)
+        if magic != self._cache_magic or node_amount != self.node_amount:
+            cache_map.close()
+            return False
+
+        predecessors_offset = header_size + size * 8
+        if np is not None:
+            self.distances = np.frombuffer(cache_map, dtype=np.float64, count=size, offset=header_size)
+            self.predecessors = np.frombuffer(cache_map, dtype=np.int32, count=size, offset=predecessors_offset)
+        else:
+            view = memoryview(cache_map)
+            self.distances = view[header_size:predecessors_offset].cast("d")
+            self.predecessors = view[predecessors_offset:].cast("i")
+        self._cache_map = cache_map
+        return True
+
+    def _save_cache(self, cache_path):
+        """
+        Saves the calculated paths to the cache file. The file is written
+        under a temporary name first, so other processes never read a
+        partially written file.
+
+        Space: O(n^2) Time: O(n^2)
+
+        :param cache_path: The directory that the cache files are in.
+        :return: N/A
         """
-        Calculates the best path for each locations.
+        cache_file_path = self._get_cache_file(cache_path)
+        temp_file_path = "%s.%s.tmp" % (cache_file_path, os.getpid())
+        try:
+            os.makedirs(cache_path, exist_ok=True)
+            with open(temp_file_path, "wb") as cache_file:
+                cache_file.write(self._cache_header.pack(self._cache_magic, self.node_amount))
+                if np is not None:
+                    cache_file.write(np.asarray(self.distances, dtype=np.float64).tobytes())
+                    cache_file.write(np.asarray(self.predecessors, dtype=np.int32).tobytes())
+                else:
+                    cache_file.write(array("d", self.distances).tobytes())
+                    cache_file.write(array("i", self.predecessors).tobytes())
+            os.replace(temp_file_path, cache_file_path)
+        except OSError as e:
+            print(e)
+
+    def update_edge(self, from_node, to_node, weight):
+        """
+        Changes the distance of the road between two locations (e.g. for
+        road closures or congestion) and updates only the best paths
+        affected by it, instead of calculating all the paths again.
+
+        If the road got shorter, every path can only get better by going
+        through the road, so each path is checked against going through
+        it in O(n^2). If the road got longer, only the paths from the
+        starting nodes that used the road can change, so the Dijkstra's
+        algorithm is run again from those nodes only.
+
+        Space: O(n^2) Time: O(n^2) if the road got shorter, O(k * n^2) if longer, where k is the amount of starting nodes whose paths used the road
+
+        :param from_node: The node on one end of the road.
+        :param to_node: The node on the other end of the road.
+        :param weight: The new distance of the road.
+        :return: N/A
+        """
+        if from_node == to_node:
+            raise ValueError("The road has to be between two different locations.")
+        if weight < 0:
+            raise ValueError("The distance of a road cannot be a negative value!")
+
+        # Any path in a road graph may change, so the paths calculated
+        # from every node are forgotten, and calculated again when needed
+        if self.graph is not None:
+            if self.graph.get_weight(from_node, to_node) == math.inf:
+                raise ValueError("There's no road from %s to %s." % (from_node, to_node))
+            self.graph.set_weight(from_node, to_node, weight)
+            if self.graph.get_weight(to_node, from_node) != math.inf:
+                self.graph.set_weight(to_node, from_node, weight)
+            self._sources.clear()
+            self.version = next(self._versions)
+            return
+
+        old_weight = self.distance_matrix[from_node][to_node]
+        if weight == old_weight:
+            return
+        self.distance_matrix[from_node][to_node] = weight
+        self.distance_matrix[to_node][from_node] = weight
+
+        if weight < old_weight:
+            self._relax_edge(from_node, to_node, weight)
+            self._relax_edge(to_node, from_node, weight)
+        else:
+            n = self.node_amount
+            sources = [i for i in range(n)
+                       if self.predecessors[i * n + to_node] == from_node or self.predecessors[i * n + from_node] == to_node]
+            if np is not None:
+                self._vectorized_dijkstra(sources)
+            else:
+                for i in sources:
+                    self._dijkstra(i)
+        self.version = next(self._versions)
+
+    def _relax_edge(self, from_node, to_node, weight):
+        """
+        Updates the best paths that get shorter by going from the from
+        node to the to node through the road with the given distance.
 
         Space: O(n^2) Time: O(n^2)
 
+        :param from_node: The node the road is taken from.
+        :param to_node: The node the road leads to.
+        :param weight: The distance of the road.
+        :return: N/A
+        """
+        n = self.node_amount
+        if np is not None:
+            distances = self.distances.reshape(n, n)
+            predecessors = self.predecessors.reshape(n, n)
+            # The path from i to j through the road is i -> from_node ->
+            # to_node -> j, so the node before j is the same as in the
+            # path from to_node to j.
+            road_predecessors = predecessors[to_node].copy()
+            road_predecessors[to_node] = from_node
+            new_distances = distances[:, from_node].reshape(-1, 1) + weight + distances[to_node]
+            shorter = new_distances < distances
+            distances[shorter] = new_distances[shorter]
+            predecessors[:] = np.where(shorter, road_predecessors, predecessors)
+            return
+
+        for j in range(n):
+            road_predecessor = from_node if j == to_node else self.predecessors[to_node * n + j]
+            road_distance = weight + self.distances[to_node * n + j]
+            for i in range(n):
+                new_distance = self.distances[i * n + from_node] + road_distance
+                if new_distance < self.distances[i * n + j]:
+                    self.distances[i * n + j] = new_distance
+                    self.predecessors[i * n + j] = road_predecessor
+
+    def _calculate_paths(self):
+        """
+        Calculates the best path for each locations. Runs the Dijkstra's
+        algorithm from all the locations at once with NumPy if it is
+        installed, and from each location one by one otherwise.
+
+        Space: O(n^2) Time: O(n^3)
+
         :return: N/A
         """
+        size = self.node_amount * self.node_amount
+        if np is not None:
+            self.distances = np.full(size, math.inf)
+            self.predecessors = np.zeros(size, dtype=np.int32)
+            self._vectorized_dijkstra(range(self.node_amount))
+            return
+
+        self.distances = array("d", [math.inf]) * size
+        self.predecessors = array("i", [0]) * size
         for i in range(self.node_amount):
             self._dijkstra(i)
 
+    def _vectorized_dijkstra(self, start_nodes):
+        """
+        Use the Dijkstra's algorithm to find the best paths from all the
+        given nodes at the same time. Each row of the arrays below is the
+        state of the Dijkstra's algorithm started from that row's node,
+        and every step visits the closest node of all the rows in a single
+        NumPy operation. This is only n steps done in Python instead of
+        n^3, and the paths found are exactly the same as the ones found
+        by _dijkstra(), down to how ties between paths are broken.
+
+        Space: O(k * n) Time: O(k * n^2), where k is the amount of start nodes
+
+        :param start_nodes: The nodes of the graph to start from.
+        :return: N/A
+        """
+        n = self.node_amount
+        start_nodes = np.array(start_nodes, dtype=np.intp)
+        if len(start_nodes) <= 0:
+            return
+        rows = np.arange(len(start_nodes))
+        weights = np.array(self.distance_matrix, dtype=np.float64)
+        distances = np.full((len(start_nodes), n), math.inf)
+        distances[rows, start_nodes] = 0
+        visited = np.zeros((len(start_nodes), n), dtype=bool)
+        predecessors = np.repeat(start_nodes.reshape(-1, 1), n, axis=1)
+        for _ in range(n):
+            # Find and visit the closest unvisited node of every row
+            closest = np.where(visited, math.inf, distances).argmin(axis=1)
+            visited[rows, closest] = True
+            # Relax the distances of the nodes adjacent to the closest node
+            new_distances = weights[closest] + distances[rows, closest].reshape(-1, 1)
+            shorter = (new_distances < distances) & ~visited
+            distances = np.where(shorter, new_distances, distances)
+            predecessors = np.where(shorter, closest.reshape(-1, 1), predecessors)
+
+        self.distances.reshape(n, n)[start_nodes] = distances
+        self.predecessors.reshape(n, n)[start_nodes] = predecessors
+
     def _dijkstra(self, start_node):
         """
         Use the Dijkstra's algorithm to find the best paths between
         any two nodes. The time complexity of this is O(n^2).
 
-        Space: O(n^2) Time: O(n^2)
+        Space: O(n) Time: O(n^2)
 
         :param start_node: The node of the graph to start from.
         :return: N/A
         """
+        offset = start_node * self.node_amount
         # Fill the array with nodes of distance 0 for the start node,
         # and infinite for the other nodes.
         array = ConstantArray(self.node_amount)
         for i in range(self.node_amount):
+            self.predecessors[offset + i] = start_node
             if i == start_node:
                 array[start_node] = PathNode(start_node, 0, [])
+                self.distances[offset + i] = 0
                 continue
             array[i] = PathNode(i, math.inf, [])
+            self.distances[offset + i] = math.inf
 
         while len(array) > 0:
             # Find and get the closest node in array
@@ -78,27 +516,25 @@ class Pathfinder(Borg):
                 # If the distance of this adjacent node is greater than
                 # the distance of the closest node plus the distance of
                 # the adjacent node to the closest node, then update
-                # the distance of this adjacent node.
+                # the distance of this adjacent node and mark the closest
+                # node as the one right before it.
                 if adjacent_node is not None and new_distance < adjacent_node.distance:
-                    curr_path_node = self.calculated_paths_matrix[start_node][closest_node.index]
-                    adj_path_node = self.calculated_paths_matrix[start_node][adjacent_node.index]
-                    if closest_node.index != start_node:
-                        shortest_path = curr_path_node.path.copy()
-                        shortest_path.append(closest_node.index)
-                        adj_path_node.path = shortest_path
-                    adj_path_node.distance = new_distance
+                    self.predecessors[offset + i] = closest_node.index
+                    self.distances[offset + i] = new_distance
                     adjacent_node.distance = new_distance
 
 class PathNode:
-    def __init__(self, index, distance, path):
+    def __init__(self, index, distance, path=None, start_index=None):
         """
         Space: O(1) Time: O(1)
 
         :param index: The index of the location that this node is associated to.
         :param distance: The overall distance of the path.
-        :param path: An array of location ids showing the best path.
+        :param path: An array of location ids showing the best path. If None, it is rebuilt from the Pathfinder when first needed.
+        :param start_index: The index of the location that the path starts from.
         """
         self.index = index
+        self.start_index = start_index
         self.distance = distance
         self.time = distance / 18 * 60 * 60
         self.path = path
@@ -175,4 +611,112 @@ class PathNode:
         self._distance = value
         self.time = value / 18 * 60 * 60
 
-    distance = property(_get_distance, _set_distance)
\ No newline at end of file
+    def _get_path(self):
+        """
+        Space: O(n) Time: O(n)
+
+        :return: An array of location ids showing the best path.
+        """
+        if self._path is None and self.start_index is not None:
+            self._path = Pathfinder().get_hops(self.start_index, self.index)
+        return self._path
+
+    def _set_path(self, value):
+        """
+        Space: O(1) Time: O(1)
+
+        :param value: The array of location ids to set the path to.
+        :return: N/A
+        """
+        self._path = value
+
+    distance = property(_get_distance, _set_distance)
+    path = property(_get_path, _set_path)
+
+
+class _SourceCache:
+    """
+    Remembers the best paths calculated from each node of a road graph,
+    so the Dijkstra's algorithm only runs once per node. Only the most
+    recently used ones are kept, up to the given amount of memory.
+    """
+    def __init__(self, max_bytes:int):
+        """
+        Space: O(1) Time: O(1)
+
+        :param max_bytes: The most memory that the remembered paths can take up, in bytes.
+        """
+        self.__sources = OrderedDict()
+        self.__version = None
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, start_node:int, version):
+        """
+        Looks up the paths from the given node, and marks them as the most
+        recently used ones.
+
+        Space: O(1) Time: O(1)
+
+        :param start_node: The node the paths start from.
+        :param version: The version of the distances that the paths have to be calculated with.
+        :return: The distances and predecessors of the paths, or None if they're not remembered.
+        """
+        if version != self.__version:
+            self.clear()
+            self.__version = version
+        paths = self.__sources.get(start_node)
+        if paths is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__sources.move_to_end(start_node)
+        return paths
+
+    def put(self, start_node:int, version, paths):
+        """
+        Remembers the paths from the given node. The least recently used
+        paths are forgotten until they all fit in the memory limit.
+
+        Space: O(1) Time: O(1) amortized
+
+        :param start_node: The node the paths start from.
+        :param version: The version of the distances that the paths were calculated with.
+        :param paths: The distances and predecessors of the paths.
+        :return: N/A
+        """
+        size = sum(len(values) * values.itemsize for values in paths)
+        if size > self.max_bytes:
+            return
+        if version != self.__version:
+            self.clear()
+            self.__version = version
+        old_paths = self.__sources.pop(start_node, None)
+        if old_paths is not None:
+            self.bytes -= sum(len(values) * values.itemsize for values in old_paths)
+        self.__sources[start_node] = paths
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            node, forgotten = self.__sources.popitem(last=False)
+            self.bytes -= sum(len(values) * values.itemsize for values in forgotten)
+
+    def clear(self):
+        """
+        Forgets all the paths remembered.
+
+        Space: O(1) Time: O(n)
+
+        :return: N/A
+        """
+        self.__sources.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of nodes whose paths are remembered.
+        """
+        return len(self.__sources)
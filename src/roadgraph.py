@@ -0,0 +1,203 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+import math
+from array import array
+from typing import Iterable, Tuple
+
+class RoadGraph:
+    """
+    A sparse graph of roads, kept in compressed sparse row (CSR) form:
+    the roads leaving each node are next to each other in the targets and
+    weights arrays, and offsets[i] is where the roads of node i start. This
+    takes O(n + m) memory, where m is the amount of roads, instead of the
+    O(n^2) of a distance matrix.
+
+    The first nodes are the locations, by location id. Any nodes after
+    them are only passed through, like intersections.
+    """
+    def __init__(self, node_amount:int, offsets:array, targets:array, weights:array):
+        """
+        Space: O(1) Time: O(1)
+
+        :param node_amount: The amount of nodes in the graph.
+        :param offsets: Where the roads of each node start in the targets and weights arrays, plus the amount of roads at the end.
+        :param targets: The node each road leads to.
+        :param weights: The distance of each road.
+        """
+        if len(offsets) != node_amount + 1:
+            raise ValueError("There has to be one offset for each of the %s nodes, plus one at the end." % node_amount)
+        if len(targets) != len(weights) or offsets[-1] != len(targets):
+            raise ValueError("Every road needs both a target and a weight.")
+        self.node_amount = node_amount
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    @staticmethod
+    def from_edges(node_amount:int, edges:Iterable[Tuple[int, int, float]], directed=False):
+        """
+        Makes a graph from a list of roads, sorting them by the node they
+        leave from (counting sort). If the same road is given more than
+        once, the shortest one is kept.
+
+        Space: O(n + m) Time: O(n + m log d), where d is the most roads leaving a node
+
+        :param node_amount: The amount of nodes in the graph.
+        :param edges: The roads, as (from node, to node, distance).
+        :param directed: If False, every road can be taken both ways.
+        :return: The graph.
+        """
+        sources = array("i")
+        targets = array("i")
+        weights = array("d")
+        for from_node, to_node, weight in edges:
+            from_node = int(from_node)
+            to_node = int(to_node)
+            weight = float(weight)
+            if not 0 <= from_node < node_amount or not 0 <= to_node < node_amount:
+                raise ValueError("The road from %s to %s has to be between nodes 0 and %s." % (from_node, to_node, node_amount - 1))
+            if weight < 0 or math.isnan(weight):
+                raise ValueError("The distance of a road cannot be a negative value!")
+            if from_node == to_node:
+                continue
+            sources.append(from_node)
+            targets.append(to_node)
+            weights.append(weight)
+            if not directed:
+                sources.append(to_node)
+                targets.append(from_node)
+                weights.append(weight)
+
+        # Count the roads leaving each node, then place each road right
+        # after the ones placed before it from the same node
+        offsets = array("q", [0]) * (node_amount + 1)
+        for from_node in sources:
+            offsets[from_node + 1] += 1
+        for i in range(node_amount):
+            offsets[i + 1] += offsets[i]
+        next_slot = array("q", offsets[:node_amount])
+        sorted_targets = array("i", [0]) * len(targets)
+        sorted_weights = array("d", [0]) * len(weights)
+        for from_node, to_node, weight in zip(sources, targets, weights):
+            slot = next_slot[from_node]
+            sorted_targets[slot] = to_node
+            sorted_weights[slot] = weight
+            next_slot[from_node] = slot + 1
+
+        return RoadGraph(node_amount, offsets, sorted_targets, sorted_weights)._without_duplicates()
+
+    @staticmethod
+    def from_matrix(distance_matrix):
+        """
+        Makes a graph from a distance matrix, with a road for every pair
+        of nodes with a positive, finite distance.
+
+        Space: O(n^2) Time: O(n^2)
+
+        :param distance_matrix: The distance matrix of the locations.
+        :return: The graph.
+        """
+        node_amount = len(distance_matrix)
+        edges = ((i, j, float(weight)) for i, row in enumerate(distance_matrix) for j, weight in enumerate(row)
+                 if i != j and 0 < weight < math.inf)
+        return RoadGraph.from_edges(node_amount, edges, directed=True)
+
+    def _without_duplicates(self):
+        """
+        Space: O(n + m) Time: O(n + m log d), where d is the most roads leaving a node
+
+        :return: This graph, with only the shortest of any roads between the same two nodes.
+        """
+        offsets = array("q", [0])
+        targets = array("i")
+        weights = array("d")
+        for node in range(self.node_amount):
+            shortest = {}
+            for slot in range(self.offsets[node], self.offsets[node + 1]):
+                to_node = self.targets[slot]
+                weight = self.weights[slot]
+                if weight < shortest.get(to_node, math.inf):
+                    shortest[to_node] = weight
+            for to_node in sorted(shortest):
+                targets.append(to_node)
+                weights.append(shortest[to_node])
+            offsets.append(len(targets))
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        return self
+
+    def get_roads(self, node:int):
+        """
+        Space: O(1) Time: O(1)
+
+        :param node: The node the roads leave from.
+        :return: The first and last (exclusive) index of the roads leaving the node, in the targets and weights arrays.
+        """
+        return self.offsets[node], self.offsets[node + 1]
+
+    def get_weight(self, from_node:int, to_node:int) -> float:
+        """
+        Space: O(1) Time: O(log d), where d is the amount of roads leaving the from node
+
+        :param from_node: The node the road leaves from.
+        :param to_node: The node the road leads to.
+        :return: The distance of the road, or infinity if there's no such road.
+        """
+        slot = self.__find(from_node, to_node)
+        return math.inf if slot < 0 else self.weights[slot]
+
+    def set_weight(self, from_node:int, to_node:int, weight:float):
+        """
+        Changes the distance of a road that's already in the graph. Roads
+        can't be added, since that would move every road after it.
+
+        Space: O(1) Time: O(log d), where d is the amount of roads leaving the from node
+
+        :param from_node: The node the road leaves from.
+        :param to_node: The node the road leads to.
+        :param weight: The new distance of the road.
+        :return: N/A
+        """
+        slot = self.__find(from_node, to_node)
+        if slot < 0:
+            raise ValueError("There's no road from %s to %s." % (from_node, to_node))
+        self.weights[slot] = weight
+
+    def get_memory_size(self) -> int:
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of bytes in the arrays of this graph.
+        """
+        return sum(len(values) * values.itemsize for values in (self.offsets, self.targets, self.weights))
+
+    def __find(self, from_node:int, to_node:int) -> int:
+        """
+        Binary searches the roads leaving the from node, which are sorted
+        by the node they lead to.
+
+        Space: O(1) Time: O(log d), where d is the amount of roads leaving the from node
+
+        :param from_node: The node the road leaves from.
+        :param to_node: The node the road leads to.
+        :return: The index of the road in the targets and weights arrays, or -1 if there's no such road.
+        """
+        low, high = self.offsets[from_node], self.offsets[from_node + 1]
+        while low < high:
+            middle = (low + high) // 2
+            if self.targets[middle] < to_node:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.offsets[from_node + 1] and self.targets[low] == to_node:
+            return low
+        return -1
+
+    def __len__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of roads in this graph.
+        """
+        return len(self.targets)
@@ -0,0 +1,108 @@
+# Mark Christian Malabanan, Student ID #001233960
+
+from collections import OrderedDict
+
+class RouteCache:
+    """
+    Remembers the paths solved for a set of locations, so the same set
+    of locations with the same start and end doesn't have to be solved
+    again. Only the most recently used paths are kept.
+    """
+    def __init__(self, max_size=256):
+        """
+        Space: O(n) Time: O(1)
+
+        :param max_size: The maximum amount of paths to remember.
+        """
+        self.__routes = OrderedDict()
+        self.__version = None
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """
+        Looks up the path solved for the given key, and marks it as the
+        most recently used path.
+
+        Space: O(1) Time: O(1)
+
+        :param key: The key of the path, as made by make_key().
+        :param version: The version of the distances that the path has to be solved with.
+        :return: The path remembered for the key, or None if there is none.
+        """
+        self.__check_version(version)
+        route = self.__routes.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__routes.move_to_end(key)
+        return route
+
+    def put(self, key, version, route):
+        """
+        Remembers the path solved for the given key. If there are too many
+        paths remembered, the least recently used one is forgotten.
+
+        Space: O(1) Time: O(1)
+
+        :param key: The key of the path, as made by make_key().
+        :param version: The version of the distances that the path was solved with.
+        :param route: The path to remember.
+        :return: N/A
+        """
+        if self.max_size <= 0:
+            return
+        self.__check_version(version)
+        self.__routes[key] = route
+        self.__routes.move_to_end(key)
+        while len(self.__routes) > self.max_size:
+            self.__routes.popitem(last=False)
+
+    def clear(self):
+        """
+        Forgets all the paths remembered.
+
+        Space: O(1) Time: O(n)
+
+        :return: N/A
+        """
+        self.__routes.clear()
+
+    def __check_version(self, version):
+        """
+        Forgets all the paths remembered if the distances changed since
+        they were solved.
+
+        Space: O(1) Time: O(n)
+
+        :param version: The current version of the distances.
+        :return: N/A
+        """
+        if version != self.__version:
+            self.__routes.clear()
+            self.__version = version
+
+    def __len__(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The amount of paths remembered.
+        """
+        return len(self.__routes)
+
+def make_key(location_ids, start_id:int, end_id:int, *settings):
+    """
+    Makes the key that a path is remembered by. The order of the given
+    locations doesn't matter.
+
+    Space: O(n) Time: O(n)
+
+    :param location_ids: The ids of the locations in the path.
+    :param start_id: The id of the starting location.
+    :param end_id: The id of the ending location.
+    :param settings: Anything else that changes the path solved.
+    :return: The key of the path.
+    """
+    return (frozenset(location_ids), start_id, end_id) + settings
@@ -1,6 +1,7 @@
 # Mark Christian Malabanan, Student ID #001233960
 
 from datetime import datetime
+from functools import lru_cache
 from time import gmtime
 from time import strftime
 import re
@@ -21,10 +22,12 @@ def to_time(seconds:int) -> str:
     secs = int(seconds)
     return strftime("%I:%M:%S %p", gmtime(seconds))
 
+@lru_cache(maxsize=4096)
 def to_seconds(time:str) -> int:
     """
     Converts the given human-readable time of the format `HH:MM(:SS) [AM/PM]`
-    to the amount of seconds since 12:00 AM of the same day.
+    to the amount of seconds since 12:00 AM of the same day. Most packages
+    share the same few times, so the conversions are remembered.
 
     Space: O(1) Time: O(1)
 
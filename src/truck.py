@@ -9,21 +9,29 @@ from src.package import Package, DeliveryStatus
 from src.locationcluster import LocationCluster
 import src.packageutil as packageutil
 import src.tspsolver as tsp
+from src.fleetplanner import FleetPlanner
+from src.load import Load
 import math
 from abc import ABC, abstractmethod
 from typing import List
 from typing import Deque
 
 class AbstractTruck(ABC):
-    def __init__(self, truck_id, speed=18):
+    def __init__(self, truck_id, speed=18, planning_iterations=1000, capacity=16, max_mass=math.inf, max_volume=math.inf):
         """
         Space: O(n) Time: O(1)
 
         :param truck_id: The id of this truck.
         :param speed: The speed of this truck.
+        :param planning_iterations: The maximum amount of moves made improving a path before the truck leaves.
+        :param capacity: The maximum amount of packages this truck can carry.
+        :param max_mass: The maximum mass, in kilograms, of the packages this truck can carry.
+        :param max_volume: The maximum volume, in cubic meters, of the packages this truck can carry.
         """
         self.truck_id = truck_id
         self.speed = speed
+        self.capacity = Load.capacity(capacity, max_mass, max_volume)
+        self.planning_iterations = planning_iterations
         self.eta = -1
         self.odometer = 0
         self.current_location = 0
@@ -44,10 +52,32 @@ class AbstractTruck(ABC):
             self.__sender = sender
 
         if self.load_packages_when(current_seconds):
-            self.load_packages()
+            # Loading takes packages out of the warehouse and puts some back
+            with Warehouse().lock:
+                self.load_packages(current_seconds)
         else:
             self.drive(current_seconds)
 
+        if self.on_update in sender.on_tick.listeners:
+            sender.schedule(self.next_update_time(current_seconds))
+
+    def next_update_time(self, current_seconds:int):
+        """
+        Gets the earliest time that this truck needs to be updated at,
+        so a clock in discrete mode can skip the ticks in between.
+
+        Space: O(1) Time: O(1)
+
+        :param current_seconds: The current time in seconds.
+        :return: The time, in seconds, of the next update this truck needs.
+        """
+        # Wait until we arrive at the next location
+        if self.eta != -1:
+            return self.eta
+        # Otherwise, drive to the next location or load packages on
+        # the next tick
+        return current_seconds + 1
+
     def end_update(self):
         """
         Ends the update lifecycle of this object.
@@ -100,20 +130,49 @@ class AbstractTruck(ABC):
             next_delivery = self.delivery_path.popleft()
             for package in next_delivery:
                 delivery_status = DeliveryStatus.DeliveredLate if package.is_timed and current_seconds > package.delivery_time else DeliveryStatus.Delivered
-                package.delivery_status = delivery_status.value
-                package.delivered_at = current_seconds
+                # Nothing should see the new status without the time it was delivered at
+                with package.lock:
+                    package.delivery_status = delivery_status.value
+                    package.delivered_at = current_seconds
                 print("%s - Truck %s: Delivered package no. %s at location %s." % (current_time, self.truck_id, package.package_id, location.address))
             self.eta = -1
             self.current_location = next_location.location_id
 
+    def solve_path(self, packages:List[int], current_seconds:int) -> Deque[LocationCluster]:
+        """
+        Groups the given packages by location and finds the shortest path
+        from the warehouse through all of them and back, making sure the
+        packages are delivered before their deadlines if possible.
+        The path is improved with at most planning_iterations moves,
+        instead of for an amount of time, so the same packages always get
+        the same path no matter how fast or busy the machine is.
+
+        Space: O(n) Time: O(n^2), plus the planning iterations
+
+        :param packages: The ids of the packages loaded into this truck.
+        :param current_seconds: The current time in seconds.
+        :return: The path to deliver the packages through.
+        """
+        if not Load.of(packages).fits_in(self.capacity):
+            raise ValueError("Truck %s can't carry packages %s (%s) with a capacity of %s." % (self.truck_id, packages, Load.of(packages), self.capacity))
+        clusters = packageutil.to_location_clusters(packages)
+        # The truck leaves on the next tick of the clock. At each location,
+        # the truck is up to a tick late to notice it has arrived, then
+        # leaves on the tick after that.
+        time_delta = self.__sender.time_delta
+        solved = tsp.solve(deque(clusters), 0, 0, departure_time=current_seconds + time_delta, speed=self.speed, service_time=2 * time_delta, improve=True, max_iterations=self.planning_iterations)
+        return deque(solved[2])
+
     # What will be loaded into this truck
     @abstractmethod
-    def load_packages(self):
+    def load_packages(self, current_seconds:int):
         """
         Loads the packages into the truck by accessing the
         warehouse's package storage.
 
         Space: O(n^2) Time: O(n^2)
+
+        :param current_seconds: The current time in seconds
         """
         pass
 
@@ -124,7 +183,7 @@ class AbstractTruck(ABC):
         loaded into the truck. Called in the on_update() method
         like so:
             ``if load_packages_when(current_seconds):``
-                ``load_packages()``
+                ``load_packages(current_seconds)``
 
         Space: O(1) Time: O(1)
 
@@ -139,10 +198,10 @@ class TimedTruck(AbstractTruck):
     the simulation starts.
     """
 
-    def __init__(self, id, speed=18):
-        super().__init__(id, speed)
+    def __init__(self, id, speed=18, planning_iterations=1000, capacity=16, max_mass=math.inf, max_volume=math.inf):
+        super().__init__(id, speed, planning_iterations, capacity, max_mass, max_volume)
 
-    def load_packages(self):
+    def load_packages(self, current_seconds:int):
         packages:List[int] = Warehouse().packages
         # End drive if no more packages in warehouse
         if len(packages) <= 0:
@@ -151,26 +210,28 @@ class TimedTruck(AbstractTruck):
             return
 
         # Grab necessary packages
-        packages_with_same_package_req = packageutil.get_package_ids_with_same_package_req(packages)
         delayed_packages = packageutil.get_delayed_packages_only(packages)
         timed_packages = packageutil.get_timed_packages_only(packages)
 
-        # Fill with packages with the same package requirement
-        if len(timed_packages) < 16:
-            timed_packages.extend(packageutil.fill_with_same_package_req(timed_packages, packages, packages_with_same_package_req))
-        # Fill with packages with the truck requirement of this truck.
-        if len(timed_packages) < 16:
-            truck_req_packages = packageutil.get_packages_with_predicate(packages, predicate=lambda package: package.truck_req == self.truck_id)
+        # Fill with the packages that have to be delivered together with
+        # the packages already in this truck
+        if len(timed_packages) < self.capacity.count:
+            timed_packages.extend(packageutil.fill_with_package_groups(timed_packages, packages))
+        # Fill with packages with the truck requirement of this truck,
+        # along with the packages that have to be delivered with them.
+        if len(timed_packages) < self.capacity.count:
+            truck_req_packages = packageutil.get_packages_with_truck_req(packages, self.truck_id)
+            truck_req_packages.extend(packageutil.fill_with_package_groups(truck_req_packages, packages))
             timed_packages.extend(truck_req_packages)
         # Fill with packages going to the same locations and other packages.
-        if len(timed_packages) < 16:
-            timed_packages.extend(packageutil.fill_up(timed_packages, packages, 16 - len(timed_packages)))
+        if len(timed_packages) < self.capacity.count:
+            timed_packages.extend(packageutil.fill_up(timed_packages, packages, self.capacity.count - len(timed_packages)))
 
+        # Put back whatever doesn't fit, by amount, mass or volume
+        timed_packages = packageutil.fit_to_capacity(timed_packages, self.capacity, packages)
         print("Loaded packages into truck %s: %s" % (self.truck_id, timed_packages))
         # Convert the package ids to location clusters and solve for TSP
-        timed_packages_cluster = packageutil.to_location_clusters(timed_packages)
-        solved = tsp.solve(deque(timed_packages_cluster), 0, 0)
-        self.delivery_path = deque(solved[2])
+        self.delivery_path = self.solve_path(timed_packages, current_seconds)
         # Mark all packages in this truck as En Route
         for loc_cluster in self.delivery_path:
             for package in loc_cluster:
@@ -189,23 +250,27 @@ class DelayedTruck(AbstractTruck):
     Waits for and loads the earliest delayed packages
     """
 
-    def __init__(self, id, speed=18):
+    def __init__(self, id, speed=18, planning_iterations=1000, capacity=16, max_mass=math.inf, max_volume=math.inf):
         """
         Space: O(n) Time: O(n)
 
         :param id: The id of this truck.
         :param speed: The speed of this truck.
+        :param planning_iterations: The maximum amount of moves made improving a path before the truck leaves.
+        :param capacity: The maximum amount of packages this truck can carry.
+        :param max_mass: The maximum mass, in kilograms, of the packages this truck can carry.
+        :param max_volume: The maximum volume, in cubic meters, of the packages this truck can carry.
         """
-        super().__init__(id, speed)
+        super().__init__(id, speed, planning_iterations, capacity, max_mass, max_volume)
         self.earliest_delay_time = math.inf
-        packages:List[int] = Warehouse().packages
+        packages:List[int] = Warehouse().snapshot()
         # Get the earliest time that delayed packages are arriving.
         for package_id in packages:
             package:Package = Data().get_package(package_id)
             if package.is_delayed and package.delay_time < self.earliest_delay_time:
                 self.earliest_delay_time = package.delay_time
 
-    def load_packages(self):
+    def load_packages(self, current_seconds:int):
         packages:List[int] = Warehouse().packages
         # End drive if no more packages in warehouse
         if len(packages) <= 0:
@@ -214,34 +279,98 @@ class DelayedTruck(AbstractTruck):
             return
 
         # Grab necessary packages
-        packages_with_same_package_req = packageutil.get_package_ids_with_same_package_req(packages)
         delayed_packages = packageutil.get_delayed_packages_only(packages)
 
-        # Fill with packages with the same package requirement
-        if len(delayed_packages) < 16:
-            delayed_packages.extend(packageutil.fill_with_same_package_req(delayed_packages, packages, packages_with_same_package_req))
-        # Fill with packages with the truck requirement of this truck.
-        if len(delayed_packages) < 16:
-            truck_req_packages = packageutil.get_packages_with_predicate(packages, predicate=lambda package: package.truck_req == self.truck_id)
+        # Fill with the packages that have to be delivered together with
+        # the packages already in this truck
+        if len(delayed_packages) < self.capacity.count:
+            delayed_packages.extend(packageutil.fill_with_package_groups(delayed_packages, packages))
+        # Fill with packages with the truck requirement of this truck,
+        # along with the packages that have to be delivered with them.
+        if len(delayed_packages) < self.capacity.count:
+            truck_req_packages = packageutil.get_packages_with_truck_req(packages, self.truck_id)
+            truck_req_packages.extend(packageutil.fill_with_package_groups(truck_req_packages, packages))
             delayed_packages.extend(truck_req_packages)
         # Fill with packages going to the same locations and other packages.
-        if len(delayed_packages) < 16:
-            delayed_packages.extend(packageutil.fill_up(delayed_packages, packages, 16 - len(delayed_packages)))
+        if len(delayed_packages) < self.capacity.count:
+            delayed_packages.extend(packageutil.fill_up(delayed_packages, packages, self.capacity.count - len(delayed_packages)))
 
+        # Put back whatever doesn't fit, by amount, mass or volume
+        delayed_packages = packageutil.fit_to_capacity(delayed_packages, self.capacity, packages)
         print("Loaded packages into truck %s: %s" % (self.truck_id, delayed_packages))
-        delayed_packages_cluster = packageutil.to_location_clusters(delayed_packages)
         # Convert the package ids to location clusters and solve for TSP
-        solved = tsp.solve(deque(delayed_packages_cluster), 0, 0)
-        self.delivery_path = deque(solved[2])
+        self.delivery_path = self.solve_path(delayed_packages, current_seconds)
         # Mark all packages in this truck as En Route
         for loc_cluster in self.delivery_path:
             for package in loc_cluster:
                 package.delivery_status = DeliveryStatus.EnRoute
 
+    def next_update_time(self, current_seconds:int):
+        # Wait for the delayed packages to arrive at the warehouse
+        next_time = super().next_update_time(current_seconds)
+        if self.eta == -1 and len(self.delivery_path) <= 0:
+            return max(next_time, self.earliest_delay_time)
+        return next_time
+
     def load_packages_when(self, current_seconds:int) -> bool:
         # Load packages only when the current time is at or after the
         # earliest delay time and if the truck is at the warehouse and
         # if there are no packages in the truck.
         if current_seconds >= self.earliest_delay_time and self.current_location == 0 and len(self.delivery_path) <= 0:
             return True
-        return False
\ No newline at end of file
+        return False
+
+class PlannedTruck(AbstractTruck):
+    """
+    Loads the trips planned for it by the FleetPlanner, leaving the hub
+    as soon as the packages of its next trip are there.
+    """
+
+    def __init__(self, id, speed=18, planning_iterations=1000, capacity=16, max_mass=math.inf, max_volume=math.inf):
+        """
+        Space: O(1) Time: O(1)
+
+        :param id: The id of this truck.
+        :param speed: The speed of this truck.
+        :param planning_iterations: The maximum amount of moves made improving a path before the truck leaves.
+        :param capacity: The maximum amount of packages this truck can carry.
+        :param max_mass: The maximum mass, in kilograms, of the packages this truck can carry.
+        :param max_volume: The maximum volume, in cubic meters, of the packages this truck can carry.
+        """
+        super().__init__(id, speed, planning_iterations, capacity, max_mass, max_volume)
+
+    def load_packages(self, current_seconds:int):
+        trip = FleetPlanner().next_trip(self.truck_id)
+        # End drive if there are no more trips planned for this truck
+        if trip is None:
+            print("Truck %s finished delivery! Odometer is: %s miles" % (self.truck_id, self.odometer))
+            self.end_update()
+            return
+
+        # Take the packages of this trip out of the warehouse
+        packages = packageutil.get_packages_in(Warehouse().packages, set(trip))
+
+        print("Loaded packages into truck %s: %s" % (self.truck_id, packages))
+        # Convert the package ids to location clusters and solve for TSP
+        self.delivery_path = self.solve_path(packages, current_seconds)
+        # Mark all packages in this truck as En Route
+        for loc_cluster in self.delivery_path:
+            for package in loc_cluster:
+                package.delivery_status = DeliveryStatus.EnRoute
+
+    def next_update_time(self, current_seconds:int):
+        # Wait for the next trip to leave the warehouse
+        next_time = super().next_update_time(current_seconds)
+        next_departure = FleetPlanner().next_departure_time(self.truck_id)
+        if self.eta == -1 and len(self.delivery_path) <= 0 and next_departure != math.inf:
+            return max(next_time, next_departure)
+        return next_time
+
+    def load_packages_when(self, current_seconds:int) -> bool:
+        # Load packages only when the truck is at the warehouse with no
+        # packages in it, and the packages of its next trip are there.
+        # If there are no trips left, this also ends the drive.
+        next_departure = FleetPlanner().next_departure_time(self.truck_id)
+        if self.current_location == 0 and len(self.delivery_path) <= 0 and (current_seconds >= next_departure or next_departure == math.inf):
+            return True
+        return False
@@ -1,80 +1,376 @@
 # Mark Christian Malabanan, Student ID #001233960
 
 import math
+import time
 from src.pathfinder import Pathfinder
 from src.locationcluster import LocationCluster
+import src.heldkarp as heldkarp
+import src.localsearch as localsearch
+import src.multistart as multistart
+import src.routecache as routecache
 import src.timeutil as timeutil
 from typing import Deque
+from typing import List
 
-def solve(locations:Deque[LocationCluster], start_id:int, end_id:int):
+_tie_tolerance = 1e-9
+# Paths with at most this many locations are solved exactly, unless
+# solve() is given another threshold
+exact_threshold = 12
+# The paths solved before, used when the same locations are solved again
+route_cache = routecache.RouteCache()
+
+def solve(locations:Deque[LocationCluster], start_id:int, end_id:int, improve=False, max_iterations=None, time_budget=None, exact_threshold=None, departure_time=None, speed=18, service_time=0, starts=1, workers=None, seed=0, cache=route_cache, time_budget_ms=None, on_improvement=None):
     """
     Solves the Traveling Salesman Problem for a given list of locations.
     This uses a similar concept to insertion sort, and runs like so,
     given a queue of locations to move through and the best paths between
     each of those locations:
-        1. A location is removed from the queue and added to a path list.
-        2. The path list is passed through the overall_distance() method to
-            calculate the distance travelled if that path was taken
-        3. Keep track of the shortest distance and path list.
+        1. A location is removed from the queue.
+        2. For every position in the path list, calculate how much the
+            overall distance changes if the location is inserted there,
+            using only the locations right before and after it.
+        3. Insert the location at the position with the smallest change.
         4. Repeat this until the queue is empty.
-    This has a time complexity of O(n^3), although an optimization can be
-    implemented on calculating the overall distance to make it O(n^2) instead.
+    If there are only a few locations (at most exact_threshold) and NumPy
+    is installed, the shortest path is found exactly with the Held-Karp
+    algorithm instead (see heldkarp.solve()).
+    If improve is True, the path is then shortened further with 2-opt and
+    Or-opt moves (see localsearch.improve()). If starts is more than 1,
+    the path is instead built again from several random insertion orders
+    in parallel, and the shortest one is used (see multistart.solve()).
+
+    The paths solved are remembered in the given cache, by the set of
+    location ids, the start and end ids and the settings above. Solving
+    the same locations again, in any order, reuses the remembered path
+    until the distances in the Pathfinder change. Paths improved under a
+    time budget depend on how fast the machine is, so they're never
+    remembered; use max_iterations to get the same path every time.
+
+    This is an anytime solver: if time_budget_ms is given, improving the
+    path stops once that much time has passed since solve() was called,
+    and the best path found so far is returned. Every time a better path
+    is found, it is also given to on_improvement, starting with the first
+    path built, so a caller can use a good path before solve() returns.
+
+    If a departure time is given, the delivery deadlines of the locations
+    (their earliest_time) are respected too. If the path found above
+    reaches any location late, another path is built by inserting the
+    locations from the earliest deadline to the latest, only at positions
+    that don't make any location late (see _time_window_insertion()), and
+    the least late of the two is used. The improved path is only used if
+    it is not any later either.
 
-    Space: O(n^2) Time: O(n^3)
+    Space: O(n) Time: O(n^2), plus the time spent improving the path
 
     :param locations: A queue of locations (as LocationCluster) to solve the TSP problem for.
     :param start_id: The id of the starting location.
     :param end_id: The id of the ending location.
-    :return: An array of the shortest distance, the shortest time, and the shortest path.
+    :param improve: If True, improve the path found with local search.
+    :param max_iterations: Optional - The maximum amount of moves the local search can make.
+    :param time_budget: Optional - The maximum amount of time (in seconds) the local search can spend.
+    :param exact_threshold: Optional - The maximum amount of locations to solve exactly, at most heldkarp.max_locations. Set to 0 to always use the insertion heuristic. Defaults to the exact_threshold of this module when solve() is called.
+    :param departure_time: Optional - The time (in seconds) that the path starts at. If given, the delivery deadlines are respected.
+    :param speed: The speed, in miles per hour, that the path is travelled at.
+    :param service_time: The time (in seconds) spent at each location before leaving it.
+    :param starts: The amount of random insertion orders to try, in parallel.
+    :param workers: Optional - The amount of processes used for the starts. Defaults to the amount of CPUs.
+    :param seed: The seed of the random insertion orders.
+    :param cache: Optional - The cache to remember the solved paths in. Set to None to always solve the path again.
+    :param time_budget_ms: Optional - The maximum amount of time (in milliseconds) that solve() can spend improving the path.
+    :param on_improvement: Optional - Called with the distance and the path (like the returned path) of every better path found.
+    :return: An array of the shortest distance, the shortest time, the shortest path, and the distance of the path before it was improved.
     """
-    start_node = LocationCluster(start_id)
+    if exact_threshold is None:
+        exact_threshold = _get_exact_threshold()
+    if exact_threshold > heldkarp.max_locations:
+        raise ValueError("At most %s locations can be solved exactly, not %s." % (heldkarp.max_locations, exact_threshold))
+    deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000
     # Initialize everything
-    shortest_path = [start_node]
-    shortest_distance = 0
-    shortest_time = 0
+    clusters = []
     while len(locations) > 0:
-        # Get the location to be inserted into the path
         current_loc = locations.popleft()
         if current_loc is None:
             continue
+        clusters.append(current_loc)
+
+    # Only paths with no repeated locations are remembered, since the set
+    # of location ids has to map back to the given locations, and only if
+    # they don't depend on a time budget.
+    location_ids = [cluster.location_id for cluster in clusters]
+    key = None
+    is_repeatable = time_budget is None and time_budget_ms is None
+    if cache is not None and is_repeatable and len(set(location_ids)) == len(location_ids):
+        deadlines = None if departure_time is None else frozenset((cluster.location_id, cluster.earliest_time) for cluster in clusters)
+        key = routecache.make_key(location_ids, start_id, end_id, improve, max_iterations, exact_threshold, deadlines, departure_time, speed, service_time, starts, seed)
+        route = cache.get(key, Pathfinder().version)
+        if route is not None:
+            solved = _from_route(route, clusters, end_id)
+            if on_improvement is not None:
+                on_improvement(solved[0], solved[2])
+            return solved
+
+    solved = _solve(clusters, start_id, end_id, improve, max_iterations, time_budget, exact_threshold, departure_time, speed, service_time, starts, workers, seed, deadline, on_improvement)
+    if key is not None:
+        cache.put(key, Pathfinder().version, _to_route(solved))
+    return solved
+
+def _get_exact_threshold() -> int:
+    """
+    Space: O(1) Time: O(1)
+
+    :return: The exact_threshold of this module right now, which solve() can't read since its parameter has the same name.
+    """
+    return exact_threshold
+
+def _to_route(solved):
+    """
+    Converts a solved path to what is remembered in the route cache.
+
+    Space: O(n) Time: O(n)
+
+    :param solved: The result of solve().
+    :return: The shortest distance, the shortest time, the location ids of the shortest path, and the distance before it was improved.
+    """
+    return (solved[0], solved[1], tuple(location.location_id for location in solved[2]), solved[3])
+
+def _from_route(route, clusters:List[LocationCluster], end_id:int):
+    """
+    Converts a path remembered in the route cache back to the result of
+    solve(), using the given locations.
+
+    Space: O(n) Time: O(n)
+
+    :param route: The path remembered in the route cache.
+    :param clusters: The locations to solve the path for.
+    :param end_id: The id of the ending location.
+    :return: The result of solve().
+    """
+    distance, time, location_ids, initial_distance = route
+    by_id = {cluster.location_id: cluster for cluster in clusters}
+    path = [by_id[location_id] for location_id in location_ids[:len(clusters)]]
+    if len(location_ids) > len(clusters):
+        path.append(LocationCluster(end_id))
+    return [distance, time, path, initial_distance]
+
+def _solve(clusters:List[LocationCluster], start_id:int, end_id:int, improve, max_iterations, time_budget, exact_threshold, departure_time, speed, service_time, starts, workers, seed, deadline, on_improvement):
+    """
+    Solves the path for solve(), without looking it up in the cache.
+
+    Space: O(n) Time: O(n^2), plus the time spent improving the path
 
-        short_dist = math.inf
-        short_time = 0
-        short_path = []
-        for i in range(len(shortest_path)):
-            # Create a new copy of the shortest path so it doesn't get
-            # modified when testing different paths. Then insert the
-            # location to each index of the array.
-            array = shortest_path.copy()
-            array.insert(i + 1, current_loc)
-            # Get the overall distance of this path
-            distance = overall_distance(array, lambda location: location.location_id)
-            #time = overall_time(array, lambda location: location.location_id)
-            # Compare distances with the previous paths tested. If this
-            # path has a shorter distance, use this path.
-            if distance <= short_dist:
-                short_dist = distance
-                #short_time = time
-                short_path = array
-        # After testing all possible configurations of this path, use
-        # the shortest path found as the shortest path for the locations
-        # added so far. This will keep changing until there are no other
-        # locations to be added to the path.
-        shortest_distance = short_dist
-        #shortest_time = short_time
-        shortest_path = short_path
+    :return: The result of solve().
+    """
+    start_node = LocationCluster(start_id)
+    is_timed = departure_time is not None
+    location_ids = [cluster.location_id for cluster in clusters]
+    is_exact = heldkarp.np is not None and len(clusters) <= exact_threshold
+    if is_exact:
+        order = heldkarp.solve(location_ids, start_id, end_id)
+    else:
+        order = cheapest_insertion(location_ids, start_id)
+    shortest_path = [start_node]
+    shortest_path.extend(clusters[i] for i in order)
+    # The shortest path might not reach every location on time, so try
+    # a path built around the deadlines too and use the least late one.
+    if is_timed and get_lateness(shortest_path, departure_time, speed, service_time) > 0:
+        # Insert the locations with the earliest deadlines first
+        by_deadline = sorted(range(len(clusters)), key=lambda i: clusters[i].earliest_time)
+        deadlines = [clusters[i].earliest_time for i in by_deadline]
+        order = _time_window_insertion([location_ids[i] for i in by_deadline], deadlines, start_id, departure_time, speed, service_time)
+        order = [by_deadline[i] for i in order]
+        timed_path = [start_node]
+        timed_path.extend(clusters[i] for i in order)
+        if get_lateness(timed_path, departure_time, speed, service_time) < get_lateness(shortest_path, departure_time, speed, service_time):
+            shortest_path = timed_path
+            is_exact = False
+    shortest_distance = overall_distance(shortest_path, lambda location: location.location_id)
+    shortest_time = 0
     if end_id >= 0:
         # If an end location id is provided, add it to the path so the
         # truck goes there after delivering all the packages.
-        last_to_start = Pathfinder().get_path(shortest_path[-1].location_id, end_id)
-        shortest_distance += last_to_start.distance
-        #shortest_time += last_to_start.time
+        shortest_distance += Pathfinder().get_distance(shortest_path[-1].location_id, end_id)
         shortest_path.append(LocationCluster(end_id))
     # If there are only two locations in the path and they're the same
     # location, then return an empty path.
     if shortest_path[0].location_id == shortest_path[-1].location_id and len(shortest_path) == 2:
-        return [0, 0, []]
-    return [shortest_distance, timeutil.to_time(shortest_time), shortest_path[1:]]
+        return [0, 0, [], 0]
+
+    initial_distance = shortest_distance
+    if on_improvement is not None:
+        on_improvement(shortest_distance, shortest_path[1:])
+
+    # The rest of the time budget is what the improvement can spend
+    if deadline is not None:
+        time_left = max(deadline - time.perf_counter(), 0)
+        time_budget = time_left if time_budget is None else min(time_budget, time_left)
+    if time_budget is not None and time_budget <= 0:
+        return [shortest_distance, timeutil.to_time(shortest_time), shortest_path[1:], initial_distance]
+
+    # The improved path doesn't know about deadlines, so only use it if
+    # it isn't any later.
+    initial_path = shortest_path
+    initial_lateness = get_lateness(initial_path, departure_time, speed, service_time) if is_timed else 0
+    best = [shortest_distance, shortest_path]
+    def try_path(path_array):
+        if is_timed and get_lateness(path_array, departure_time, speed, service_time) > initial_lateness:
+            return
+        distance = overall_distance(path_array, lambda location: location.location_id)
+        if distance < best[0]:
+            best[0] = distance
+            best[1] = path_array
+            if on_improvement is not None:
+                on_improvement(distance, path_array[1:])
+
+    if starts > 1 and not is_exact:
+        order = multistart.solve(location_ids, start_id, end_id, starts, workers, seed, improve, max_iterations, time_budget)
+        improved_path = [start_node]
+        improved_path.extend(clusters[i] for i in order)
+        improved_path.extend(initial_path[len(clusters) + 1:])
+        try_path(improved_path)
+    elif improve and not is_exact:
+        # Only check every path along the way if someone is listening
+        listener = try_path if on_improvement is not None else None
+        try_path(localsearch.improve(initial_path, lambda location: location.location_id, end_id >= 0, max_iterations, time_budget, on_improvement=listener))
+    shortest_distance, shortest_path = best
+    return [shortest_distance, timeutil.to_time(shortest_time), shortest_path[1:], initial_distance]
+
+def cheapest_insertion(location_ids:List[int], start_id:int) -> List[int]:
+    """
+    Builds a path starting from the given start location by inserting
+    each location, in the given order, where it adds the least distance.
+    Inserting location x between locations a and b adds a distance of
+    d(a, x) + d(x, b) - d(a, b), or just d(a, x) at the end of the path,
+    so every position is checked in O(1) without copying the path.
+
+    Positions that tie are compared by the overall distance of the whole
+    path instead, which is how every position used to be compared, so
+    the paths found are exactly the same as before.
+
+    Space: O(n) Time: O(n^2), plus O(n) for each tied position
+
+    :param location_ids: The ids of the locations to insert into the path.
+    :param start_id: The id of the starting location.
+    :return: The order to visit the locations in, as indices of the given location ids.
+    """
+    distance = Pathfinder().get_distance
+    path = [start_id]
+    order = []
+    for index, location_id in enumerate(location_ids):
+        shortest_added = math.inf
+        candidates = []
+        for i in range(len(path)):
+            added = distance(path[i], location_id)
+            if i + 1 < len(path):
+                added += distance(location_id, path[i + 1]) - distance(path[i], path[i + 1])
+            # Allow for floating point errors, so ties are still ties
+            if added <= shortest_added + _tie_tolerance:
+                shortest_added = min(shortest_added, added)
+                candidates.append((i, added))
+        ties = [i for i, added in candidates if added <= shortest_added + _tie_tolerance]
+
+        shortest_position = ties[-1]
+        if len(ties) > 1:
+            short_dist = math.inf
+            for i in ties:
+                array = path.copy()
+                array.insert(i + 1, location_id)
+                path_distance = overall_distance(array, lambda location: location)
+                if path_distance <= short_dist:
+                    short_dist = path_distance
+                    shortest_position = i
+        path.insert(shortest_position + 1, location_id)
+        order.insert(shortest_position, index)
+    return order
+
+def _time_window_insertion(location_ids:List[int], deadlines:List[float], start_id:int, departure_time:float, speed:float, service_time:float) -> List[int]:
+    """
+    Builds a path like cheapest_insertion(), but only inserts each
+    location at the positions where it and every location after it are
+    still reached before their deadlines. If there are no such positions,
+    the location is inserted where it makes the path the least late.
+
+    To check a position in O(1) instead of going through the whole path
+    again, the arrival time and the forward slack of every location in
+    the path are kept. The forward slack of a location is how much later
+    the truck could arrive there without any location from there on
+    being late, which is the smallest time left before the deadline of
+    that location and of all the locations after it. A position is on
+    time if the inserted location is reached before its deadline and the
+    delay it adds to the next location is at most that location's slack.
+    Both arrays are updated in O(n) after each insertion.
+
+    Space: O(n) Time: O(n^2)
+
+    :param location_ids: The ids of the locations to insert into the path.
+    :param deadlines: The time (in seconds) that each location has to be reached by.
+    :param start_id: The id of the starting location.
+    :param departure_time: The time (in seconds) that the path starts at.
+    :param speed: The speed, in miles per hour, that the path is travelled at.
+    :param service_time: The time (in seconds) spent at each location before leaving it.
+    :return: The order to visit the locations in, as indices of the given location ids.
+    """
+    travel_time = lambda from_id, to_id: Pathfinder().get_distance(from_id, to_id) / speed * 60 * 60
+    distance = Pathfinder().get_distance
+    path = [start_id]
+    path_deadlines = [math.inf]
+    arrivals = [departure_time]
+    slacks = [math.inf]
+    order = []
+    for index, location_id in enumerate(location_ids):
+        least_lateness = math.inf
+        shortest_added = math.inf
+        best_position = 0
+        for i in range(len(path)):
+            leave_time = arrivals[i] + (service_time if i > 0 else 0)
+            arrival = leave_time + travel_time(path[i], location_id)
+            lateness = max(0, arrival - deadlines[index])
+            added = distance(path[i], location_id)
+            if i + 1 < len(path):
+                added += distance(location_id, path[i + 1]) - distance(path[i], path[i + 1])
+                # How much later the next location is reached, and how
+                # much of that delay goes past the deadlines from there on
+                delay = arrival + service_time + travel_time(location_id, path[i + 1]) - arrivals[i + 1]
+                lateness += max(0, delay - max(slacks[i + 1], 0))
+            # The least late position first, then the shortest one
+            if lateness < least_lateness or (lateness == least_lateness and added <= shortest_added + _tie_tolerance):
+                shortest_added = added if lateness < least_lateness else min(shortest_added, added)
+                least_lateness = lateness
+                best_position = i
+        path.insert(best_position + 1, location_id)
+        path_deadlines.insert(best_position + 1, deadlines[index])
+        order.insert(best_position, index)
+
+        # Update the arrival times from the inserted location on, then
+        # the forward slacks from the end of the path back to the start
+        arrivals.insert(best_position + 1, 0)
+        for i in range(best_position + 1, len(path)):
+            arrivals[i] = arrivals[i - 1] + (service_time if i > 1 else 0) + travel_time(path[i - 1], path[i])
+        slacks = [math.inf] * len(path)
+        slack = math.inf
+        for i in range(len(path) - 1, 0, -1):
+            slack = min(slack, path_deadlines[i] - arrivals[i])
+            slacks[i] = slack
+    return order
+
+def get_lateness(path_array:List[LocationCluster], departure_time:float, speed=18, service_time=0) -> float:
+    """
+    Calculates how late the locations in the given path are reached,
+    based on the earliest delivery time of each location.
+
+    Space: O(1) Time: O(n)
+
+    :param path_array: The path, starting from the starting location.
+    :param departure_time: The time (in seconds) that the path starts at.
+    :param speed: The speed, in miles per hour, that the path is travelled at.
+    :param service_time: The time (in seconds) spent at each location before leaving it.
+    :return: The sum of the time (in seconds) past the deadline that each location is reached at.
+    """
+    lateness = 0
+    arrival = departure_time
+    for i in range(1, len(path_array)):
+        arrival += (service_time if i > 1 else 0) + Pathfinder().get_distance(path_array[i - 1].location_id, path_array[i].location_id) / speed * 60 * 60
+        lateness += max(0, arrival - path_array[i].earliest_time)
+    return lateness
 
 def overall_distance(path_array, get_id) -> float:
     """
@@ -91,8 +387,7 @@ def overall_distance(path_array, get_id) -> float:
     while i < len(path_array) - 1:
         current_loc = get_id(path_array[i])
         next_loc = get_id(path_array[i + 1])
-        path_node = Pathfinder().get_path(current_loc, next_loc)
-        distance_sum += path_node.distance
+        distance_sum += Pathfinder().get_distance(current_loc, next_loc)
         i += 1
     return distance_sum
 
@@ -111,7 +406,6 @@ def overall_time(path_array, get_id) -> float:
     while i < len(path_array) - 1:
         current_loc = get_id(path_array[i])
         next_loc = get_id(path_array[i + 1])
-        path_node = Pathfinder().get_path(current_loc, next_loc)
-        time_sum += path_node.time
+        time_sum += Pathfinder().get_time(current_loc, next_loc)
         i += 1
     return time_sum
\ No newline at end of file
@@ -4,8 +4,15 @@ from src.borg import Borg
 from src.data import Data
 from src.hashmap import HashMap
 from typing import List
+import threading
 
 class Warehouse(Borg):
+    """
+    Keeps the ids of the packages still waiting at the hub. The trucks
+    take packages out of the list and put some back, so anything that
+    reads or changes the list in more than one step should hold the lock
+    meanwhile. Other threads can read it with snapshot() at any time.
+    """
     def __init__(self, initialize=False):
         """
         Space: O(n^2) Time: O(n^2)
@@ -15,7 +22,8 @@ class Warehouse(Borg):
         Borg.__init__(self)
         if initialize:
             hashmap:HashMap = Data().get_packages()
-            self.__packages:List[int] = sorted(hashmap.keys())
+            self.__packages:List[int] = list(hashmap.iter_keys(sort=True))
+            self.__lock = threading.RLock()
 
     def __get_packages(self):
         """
@@ -32,6 +40,25 @@ class Warehouse(Borg):
         :param value: The list of packages to set the warehouse packages to.
         :return: N/A
         """
-        self.__packages = value
+        with self.__lock:
+            self.__packages = value
+
+    def __get_lock(self):
+        """
+        Space: O(1) Time: O(1)
+
+        :return: The lock to hold while reading or changing the packages in more than one step.
+        """
+        return self.__lock
+
+    def snapshot(self) -> List[int]:
+        """
+        Space: O(n) Time: O(n)
+
+        :return: A copy of the list of package ids currently in this warehouse.
+        """
+        with self.__lock:
+            return list(self.__packages)
 
     packages = property(__get_packages, __set_packages)
+    lock = property(__get_lock)